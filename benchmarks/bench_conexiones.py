@@ -0,0 +1,111 @@
+# Benchmark: lecturas/s del dashboard mientras Streamlit confirma envíos
+#
+# Uso (desde la raíz del repo):
+#     python -m benchmarks.bench_conexiones [segundos]
+#
+# Compara la forma anterior (una conexión nueva por consulta, journal por defecto)
+# contra el pool compartido de ensayos_db (WAL + busy_timeout + reutilización por hilo).
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from ensayos_db import abrir_conexion, cerrar_conexiones, crear_tablas, obtener_conexion
+
+CONSULTA_LECTURA = """
+    SELECT r.weed_applied, e.test_date, cli.name
+    FROM resultados_malezas r
+    LEFT JOIN ensayos e ON r.ensayo_id = e.ensayo_id
+    LEFT JOIN clientes cli ON e.cliente_id = cli.cliente_id
+    WHERE r.ensayo_id = ?
+"""
+PAUSA_ESCRITOR = 0.01  # un envío cada ~10 ms, misma carga de escritura en ambos casos
+
+
+def preparar_base(ruta, ensayos=200, malezas_por_ensayo=50):
+    conn = sqlite3.connect(ruta)
+    crear_tablas(conn)
+    for i in range(ensayos):
+        cur = conn.execute("INSERT INTO clientes (name, modules_id) VALUES (?, ?)", (f"cliente {i}", f"SM{i:06d}"))
+        cur = conn.execute("INSERT INTO ensayos (cliente_id, test_date) VALUES (?, '2025-01-01')", (cur.lastrowid,))
+        conn.executemany(
+            "INSERT INTO resultados_malezas (ensayo_id, weed_applied) VALUES (?, ?)",
+            [(cur.lastrowid, j % 2) for j in range(malezas_por_ensayo)]
+        )
+    conn.commit()
+    conn.close()
+
+
+def escritor(conectar, ruta, detener, resultado):
+    conn = conectar(ruta)
+    commits = errores = 0
+    while not detener.is_set():
+        try:
+            cur = conn.execute("INSERT INTO ensayos (cliente_id, test_date) VALUES (1, '2025-01-02')")
+            conn.executemany(
+                "INSERT INTO resultados_malezas (ensayo_id, weed_applied) VALUES (?, 1)",
+                [(cur.lastrowid,)] * 200
+            )
+            conn.commit()
+            commits += 1
+        except sqlite3.OperationalError:
+            conn.rollback()
+            errores += 1
+        time.sleep(PAUSA_ESCRITOR)
+    resultado["commits"] = commits
+    resultado["errores_escritura"] = errores
+
+
+def lector(leer, ruta, detener, resultado):
+    lecturas = errores = 0
+    i = 0
+    while not detener.is_set():
+        i = i % 200 + 1
+        try:
+            leer(ruta, i)
+            lecturas += 1
+        except sqlite3.OperationalError:
+            errores += 1
+    resultado.setdefault("lecturas", []).append(lecturas)
+    resultado.setdefault("errores_lectura", []).append(errores)
+
+
+def leer_sin_pool(ruta, ensayo_id):
+    conn = sqlite3.connect(ruta)
+    conn.execute(CONSULTA_LECTURA, (ensayo_id,)).fetchall()
+    conn.close()
+
+
+def leer_con_pool(ruta, ensayo_id):
+    obtener_conexion(ruta).execute(CONSULTA_LECTURA, (ensayo_id,)).fetchall()
+
+
+def correr(nombre, conectar_escritor, leer, segundos, lectores=4):
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "bench.db")
+        preparar_base(ruta)
+        detener = threading.Event()
+        resultado = {}
+        hilos = [threading.Thread(target=escritor, args=(conectar_escritor, ruta, detener, resultado))]
+        hilos += [threading.Thread(target=lector, args=(leer, ruta, detener, resultado)) for _ in range(lectores)]
+        for h in hilos:
+            h.start()
+        time.sleep(segundos)
+        detener.set()
+        for h in hilos:
+            h.join()
+        cerrar_conexiones(ruta)
+
+    lecturas = sum(resultado["lecturas"])
+    print(f"{nombre:<28} {lecturas / segundos:>10.0f} lecturas/s "
+          f"{sum(resultado['errores_lectura']):>8} lecturas bloqueadas "
+          f"{resultado['commits'] / segundos:>8.1f} commits/s "
+          f"{resultado['errores_escritura']:>6} commits fallidos")
+
+
+if __name__ == "__main__":
+    segundos = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    correr("conexión por consulta", sqlite3.connect, leer_sin_pool, segundos)
+    correr("pool WAL (ensayos_db)", abrir_conexion, leer_con_pool, segundos)
@@ -0,0 +1,71 @@
+# Benchmark: segundos de estandarizar 'weed placement' y 'weed applied' de una planilla
+#
+# Uso (desde la raíz del repo):
+#     python -m benchmarks.bench_estandarizacion [filas ...]     (por defecto 1000 100000 1000000)
+#
+# Compara la forma anterior (Series.apply de traducir_surco y estandarizar_applied
+# en cada fila) contra traducir_por_valor / estandarizar_columna_applied de
+# verificarStem (una traducción por valor distinto) y comprueba que den lo mismo.
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from verificarStem import (TRADUCCIONES_SURCO, estandarizar_applied, estandarizar_columna_applied,
+                           traducir_por_valor, traducir_surco)
+
+
+def planilla(filas, semilla=0):
+    """Columnas crudas sintéticas, con las variantes de escritura de las planillas reales."""
+    rng = np.random.default_rng(semilla)
+    df = pd.DataFrame({
+        "weed placement": rng.choice(["Surco", "entre surcos", "ROW", "Furrow ", "interrow", "borde"], filas),
+        "weed applied": rng.choice(["1", "0", "true", "FALSE", "1.0", "si"], filas),
+    }).astype(object)
+    df.loc[rng.random(filas) < 0.05, "weed placement"] = None
+    return df
+
+
+def traducir_surco_anterior(valor):
+    # Copia de traducir_surco antes del caché (arma el diccionario en cada llamada)
+    if pd.isna(valor) or str(valor).strip() == '':
+        return None
+    valor_str = str(valor).strip().lower()
+    traducciones = dict(TRADUCCIONES_SURCO)
+    if valor_str in traducciones:
+        return traducciones[valor_str]
+    if valor_str.startswith(('surco', 'fila', 'línea', 'row', 'sulco')):
+        return 'ROW'
+    if valor_str.startswith(('entre', 'between', 'inter')):
+        return 'FURROW'
+    return str(valor).strip().upper()
+
+
+def por_fila(df):
+    placement = df["weed placement"].apply(lambda x: traducir_surco_anterior(x) if pd.notna(x) else None)
+    applied = df["weed applied"].apply(estandarizar_applied).astype("Int64")
+    return placement, applied
+
+
+def por_valor(df):
+    placement = traducir_por_valor(df["weed placement"], traducir_surco)
+    applied, _ = estandarizar_columna_applied(df["weed applied"])
+    return placement, applied
+
+
+def medir(estandarizar, df):
+    inicio = time.perf_counter()
+    resultado = estandarizar(df)
+    return time.perf_counter() - inicio, resultado
+
+
+if __name__ == "__main__":
+    tamanos = [int(n) for n in sys.argv[1:]] or [1000, 100000, 1000000]
+    print(f"{'filas':>10} {'por fila (s)':>13} {'por valor (s)':>14} {'mejora':>8}")
+    for filas in tamanos:
+        df = planilla(filas)
+        antes, (placement, applied) = medir(por_fila, df)
+        despues, (placement_nuevo, applied_nuevo) = medir(por_valor, df)
+        assert placement.tolist() == placement_nuevo.tolist() and applied.equals(applied_nuevo)
+        print(f"{filas:>10} {antes:>13.3f} {despues:>14.3f} {antes / despues:>7.1f}x")
@@ -0,0 +1,71 @@
+# Benchmark: memoria pico y segundos de verificar y estandarizar una planilla CSV
+#
+# Uso (desde la raíz del repo):
+#     python -m benchmarks.bench_ingesta [filas ...]     (por defecto 100000 1000000)
+#
+# Compara la forma anterior (pd.read_csv de la planilla entera, verificación y
+# estandarización de todo el DataFrame y huella de su CSV) contra
+# verificarStem.analizar_planilla, que hace lo mismo de a bloques, y comprueba
+# que den la misma huella. La memoria se mide con tracemalloc (numpy y pandas
+# le informan sus reservas) en una corrida aparte, porque lo hace más lento.
+import io
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from ensayos_db import huella_planilla
+from verificarStem import analizar_planilla, estandarizar_bloque, resolver_columnas, verificar_bloque
+
+
+def planilla(filas, semilla=0):
+    """CSV sintético con los encabezados y valores de las planillas reales."""
+    rng = np.random.default_rng(semilla)
+    df = pd.DataFrame({
+        "Weed Diameter": rng.uniform(0, 40, filas).round(1),
+        "tamaño": rng.choice(["3", "5", "7", "9", "15", "20", "25", ">25"], filas),
+        "height": rng.uniform(0, 30, filas).round(1),
+        "weed placement": rng.choice(["Surco", "entre surcos", "ROW", "Furrow "], filas),
+        "weed type": rng.choice(["hoja ancha", "gramínea"], filas),
+        "weed name": rng.choice(["yuyo colorado", "sorgo de alepo", "rama negra"], filas),
+        "weed applied": rng.choice(["1", "0", "true"], filas),
+    })
+    return df.to_csv(index=False).encode()
+
+
+def entera(contenido):
+    # La forma anterior: toda la planilla (cruda y estandarizada) en memoria
+    df = pd.read_csv(io.BytesIO(contenido))
+    mapeo = resolver_columnas(df.columns)
+    df = df.rename(columns={original: col for col, original in mapeo.items()})
+    errores = verificar_bloque(df)
+    return errores, huella_planilla([estandarizar_bloque(df)[0]])
+
+
+def por_bloques(contenido):
+    resumen = analizar_planilla(io.BytesIO(contenido))
+    return resumen["errores"], resumen["huella"]
+
+
+def medir(procesar, contenido):
+    inicio = time.perf_counter()
+    resultado = procesar(contenido)
+    segundos = time.perf_counter() - inicio
+    tracemalloc.start()
+    procesar(contenido)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return segundos, pico / 2**20, resultado
+
+
+if __name__ == "__main__":
+    tamanos = [int(n) for n in sys.argv[1:]] or [100000, 1000000]
+    print(f"{'filas':>10} {'entera (s)':>11} {'entera (MiB)':>13} {'bloques (s)':>12} {'bloques (MiB)':>14}")
+    for filas in tamanos:
+        contenido = planilla(filas)
+        antes, memoria_antes, esperado = medir(entera, contenido)
+        despues, memoria_despues, resultado = medir(por_bloques, contenido)
+        assert resultado == esperado, "los errores o la huella no coinciden"
+        print(f"{filas:>10} {antes:>11.2f} {memoria_antes:>13.1f} {despues:>12.2f} {memoria_despues:>14.1f}")
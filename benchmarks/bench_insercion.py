@@ -0,0 +1,88 @@
+# Benchmark: filas/s al insertar las malezas de una planilla en el envío del formulario
+#
+# Uso (desde la raíz del repo):
+#     python -m benchmarks.bench_insercion [filas ...]     (por defecto 1000 100000 1000000)
+#
+# Compara la forma anterior (iterrows + conversión celda por celda + un execute por
+# maleza) contra ensayos_db.insertar_malezas (conversión por columnas + executemany).
+# Ambas corren en una sola transacción sobre una base migrada, con los triggers
+# de malezas_flat activos, igual que en mainStrem.py.
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from ensayos_db import abrir_conexion, insertar_malezas, migrar
+from ensayos_db.diccionarios import obtener_ids
+from ensayos_db.malezas import SQL_INSERTAR
+
+
+def planilla(filas, semilla=0):
+    """Planilla estandarizada sintética, con algunos vacíos como las reales."""
+    rng = np.random.default_rng(semilla)
+    df = pd.DataFrame({
+        "weed_diameter": rng.uniform(0, 40, filas).round(1),
+        "size": rng.choice([3, 5, 7, 9, 15, 20, 25, 30], filas).astype(float),
+        "height": rng.uniform(0, 30, filas).round(1),
+        "weed_placement": rng.choice(["ROW", "FURROW"], filas),
+        "weed_type": rng.choice(["HA", "G"], filas),
+        "weed_name": rng.choice(["AMARANTHUS", "CONYZA", "SORGHUM", "CORN"], filas),
+        "weed_applied": rng.choice([0, 1], filas),
+    })
+    df.loc[rng.random(filas) < 0.05, "height"] = np.nan
+    df.loc[rng.random(filas) < 0.05, "weed_name"] = None
+    return df
+
+
+def _id_texto(cursor, columna, valor):
+    return obtener_ids(cursor, columna, [valor])[valor] if valor is not None else None
+
+
+def insertar_por_fila(cursor, df, ensayo_id, uploader):
+    # Copia del bucle que tenía mainStrem.py antes de insertar_malezas
+    # (con los textos pasados a ids de diccionario fila por fila)
+    uploader = _id_texto(cursor, 'uploader', uploader)
+    for _, row in df.iterrows():
+        weed_diameter = float(row.get('weed_diameter')) if pd.notnull(row.get('weed_diameter')) else None
+        size = float(row.get('size')) if pd.notnull(row.get('size')) else None
+        height = float(row.get('height')) if pd.notnull(row.get('height')) else None
+        weed_placement = str(row.get('weed_placement')) if pd.notnull(row.get('weed_placement')) else None
+        weed_type = str(row.get('weed_type')) if pd.notnull(row.get('weed_type')) else None
+        weed_name = str(row.get('weed_name')) if pd.notnull(row.get('weed_name')) else None
+        weed_applied = str(row.get('weed_applied')) if pd.notnull(row.get('weed_applied')) else None
+        weed_placement = _id_texto(cursor, 'weed_placement', weed_placement)
+        weed_type = _id_texto(cursor, 'weed_type', weed_type)
+        weed_name = _id_texto(cursor, 'weed_name', weed_name)
+        cursor.execute(SQL_INSERTAR, (ensayo_id, uploader, weed_diameter, size, height,
+                                      weed_placement, weed_type, weed_name, weed_applied))
+
+
+def insertar_en_bloque(cursor, df, ensayo_id, uploader):
+    insertar_malezas(cursor, df, ensayo_id, uploader)
+
+
+def medir(insertar, df):
+    with tempfile.TemporaryDirectory() as carpeta:
+        conn = abrir_conexion(os.path.join(carpeta, "bench.db"))
+        migrar(conn)
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO ensayos (test_date) VALUES ('2025-01-01')")
+        inicio = time.perf_counter()
+        insertar(cursor, df, cursor.lastrowid, "bench")
+        conn.commit()
+        segundos = time.perf_counter() - inicio
+        conn.close()
+    return segundos
+
+
+if __name__ == "__main__":
+    tamanos = [int(n) for n in sys.argv[1:]] or [1000, 100000, 1000000]
+    print(f"{'filas':>10} {'por fila (filas/s)':>20} {'en bloque (filas/s)':>20} {'mejora':>8}")
+    for filas in tamanos:
+        df = planilla(filas)
+        antes = medir(insertar_por_fila, df)
+        despues = medir(insertar_en_bloque, df)
+        print(f"{filas:>10} {filas / antes:>20.0f} {filas / despues:>20.0f} {antes / despues:>7.1f}x")
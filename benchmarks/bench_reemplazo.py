@@ -0,0 +1,51 @@
+# Benchmark: segundos de reemplazar un envío por la cola de escritura
+#
+# Uso (desde la raíz del repo):
+#     python -m benchmarks.bench_reemplazo [filas ...]     (por defecto 5000 20000 50000 120000)
+#
+# Reemplazar un envío borra el ensayo anterior con todas sus malezas y vuelve a
+# insertarlas, con los triggers de malezas_flat y malezas_cubo activos. Compara
+# el trabajo corrido en una tanda (dentro de un SAVEPOINT, ver escritura.py)
+# contra el mismo trabajo con aislado=True (sin SAVEPOINT), que es como lo encola
+# mainStrem.py. Los tiempos se miden desde que se encola hasta que está confirmado.
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_insercion import planilla
+from ensayos_db import ColaEscritura, abrir_conexion, borrar_ensayos, insertar_malezas, migrar
+
+
+def enviar(conn, df):
+    # Lo que hace guardar_envio en mainStrem.py, sin las tablas de un solo registro
+    cursor = conn.cursor()
+    borrar_ensayos(conn, desde="2025-01-01", hasta="2025-01-01")
+    cursor.execute("INSERT INTO ensayos (test_date) VALUES ('2025-01-01')")
+    insertar_malezas(cursor, df, cursor.lastrowid, "bench")
+
+
+def medir(df, aislado):
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "bench.db")
+        conn = abrir_conexion(ruta)
+        migrar(conn)
+        conn.close()
+        cola = ColaEscritura(ruta).iniciar()
+        try:
+            cola.ejecutar(lambda conn: enviar(conn, df))
+            inicio = time.perf_counter()
+            cola.ejecutar(lambda conn: enviar(conn, df), aislado=aislado)
+            return time.perf_counter() - inicio
+        finally:
+            cola.detener()
+
+
+if __name__ == "__main__":
+    tamanos = [int(n) for n in sys.argv[1:]] or [5000, 20000, 50000, 120000]
+    print(f"{'filas':>10} {'en tanda (s)':>13} {'aislado (s)':>12} {'mejora':>8}")
+    for filas in tamanos:
+        df = planilla(filas)
+        en_tanda = medir(df, aislado=False)
+        aislado = medir(df, aislado=True)
+        print(f"{filas:>10} {en_tanda:>13.2f} {aislado:>12.2f} {en_tanda / aislado:>7.1f}x")
@@ -0,0 +1,77 @@
+# Benchmark: segundos de verificar_tipo_dato sobre las columnas de una planilla
+#
+# Uso (desde la raíz del repo):
+#     python -m benchmarks.bench_verificacion [filas ...]     (por defecto 1000 100000 1000000)
+#
+# Compara la forma anterior (items() + str().strip().lower() + float() en cada
+# valor) contra verificarStem.verificar_tipo_dato (pd.to_numeric y pertenencia
+# sobre los valores distintos) y comprueba que reporten los mismos errores.
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from verificarStem import verificar_tipo_dato
+
+COLUMNAS = ['weed diameter', 'size', 'height', 'weed placement']
+
+VALIDOS_PLACEMENT = {
+    'surco', 'entre surco', 'entre surcos', 'fila', 'entre filas', 'línea', 'entre líneas',
+    'row', 'furrow', 'between rows', 'interrow',
+}
+
+
+def planilla(filas, semilla=0):
+    """Planilla cruda sintética: números como texto, vacíos y algunos valores inválidos."""
+    rng = np.random.default_rng(semilla)
+    df = pd.DataFrame({
+        "weed diameter": rng.uniform(0, 40, filas).round(1).astype(object),
+        "size": rng.choice(["3", "5", "7", "9", "15", "20", "25", ">25", " 30 "], filas).astype(object),
+        "height": rng.uniform(0, 30, filas).round(1),
+        "weed placement": rng.choice(["Surco", "entre surcos", "ROW", "Furrow ", "interrow"], filas).astype(object),
+    })
+    df.loc[rng.random(filas) < 0.05, "height"] = np.nan
+    df.loc[rng.random(filas) < 0.001, "weed diameter"] = "s/d"
+    df.loc[rng.random(filas) < 0.001, "size"] = "grande"
+    df.loc[rng.random(filas) < 0.001, "weed placement"] = "borde"
+    return df
+
+
+def verificar_por_valor(df, col_original, col_normalizado):
+    # Copia de los bucles que tenía verificarStem.verificar_tipo_dato
+    errores = []
+    if col_normalizado in ['weed diameter', 'size', 'height']:
+        for idx, valor in df[col_original].items():
+            if pd.notna(valor):
+                valor_str = str(valor).strip().lower()
+                if col_normalizado == 'size' and valor_str == '>25':
+                    continue
+                try:
+                    float(valor_str)
+                except (ValueError, TypeError):
+                    errores.append(f"'{col_original}' (fila {idx}): '{valor}' no es un número válido.")
+    elif col_normalizado == 'weed placement':
+        for idx, valor in df[col_original].items():
+            if pd.notna(valor):
+                if str(valor).strip().lower() not in VALIDOS_PLACEMENT:
+                    errores.append(f"'{col_original}' (fila {idx}): valor inválido '{valor}'.")
+    return errores
+
+
+def medir(verificar, df):
+    inicio = time.perf_counter()
+    errores = [verificar(df, col, col) for col in COLUMNAS]
+    return time.perf_counter() - inicio, errores
+
+
+if __name__ == "__main__":
+    tamanos = [int(n) for n in sys.argv[1:]] or [1000, 100000, 1000000]
+    print(f"{'filas':>10} {'por valor (s)':>14} {'vectorizado (s)':>16} {'mejora':>8} {'errores':>8}")
+    for filas in tamanos:
+        df = planilla(filas)
+        antes, esperados = medir(verificar_por_valor, df)
+        despues, errores = medir(verificar_tipo_dato, df)
+        assert errores == esperados, "los errores reportados no coinciden"
+        cantidad = sum(len(lista) for lista in errores)
+        print(f"{filas:>10} {antes:>14.3f} {despues:>16.3f} {antes / despues:>7.1f}x {cantidad:>8}")
@@ -1,14 +1,34 @@
 # Punto de entrada principal de la aplicación Dash
+#
+# Se lanza desde esta carpeta (cd dash_app && python app.py), como importa sus
+# módulos (from database import ...). El paquete ensayos_db está en la raíz del
+# repo: se agrega la raíz a sys.path antes de importar los módulos que lo usan.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from dash import Dash, html, dcc, dash_table
-from database import obtener_datos_malezas, obtener_datos_mapa, obtener_datos_aplico
+from database import DB_PATH, obtener_datos_mapa, obtener_valores_filtros, obtener_rango_fechas
+from ensayos_db import senal_instantanea
 from visualization import crear_mapa, crear_grafico
 from components import filtros_layout
+from filters import FILTROS_DINAMICOS
 from callbacks import register_callbacks
 
-# Obtener datos iniciales
-df_malezas = obtener_datos_malezas()
+# Cada cuánto el navegador pregunta si hubo cambios (ms). Es barato: mientras no
+# se publique otra instantánea de la base la respuesta sale de memoria
+INTERVALO_ACTUALIZACION_MS = 2 * 1000
+
+# Señal de publicaciones de la instantánea que lee el dashboard: avanza después
+# de cada tanda de escrituras en la base (envíos y borrados desde Streamlit)
+senal = senal_instantanea(DB_PATH)
+
+# Obtener datos iniciales. Las malezas no se cargan en memoria: cada gráfico
+# consulta solo las filas que pasan los filtros
 df_mapa = obtener_datos_mapa()
-df_aplico = obtener_datos_aplico()
+valores_filtros = obtener_valores_filtros(FILTROS_DINAMICOS.values())
+fecha_min, fecha_max = obtener_rango_fechas()
 
 # Crear la aplicación Dash
 app = Dash(__name__)
@@ -27,6 +47,7 @@ app.layout = html.Div([
     
     html.H2("Tabla de ubicaciones"),
     dash_table.DataTable(
+        id='tabla-ubicaciones',
         data=df_mapa.to_dict('records'),
         columns=[{"name": i, "id": i} for i in df_mapa.columns],
         page_size=6
@@ -35,7 +56,11 @@ app.layout = html.Div([
     # Sección de análisis con filtros
     html.H1("Análisis de Aplicación"),
     html.Hr(),
-    filtros_layout(df_aplico, df_malezas),
+    filtros_layout(valores_filtros, fecha_min, fecha_max),
+    dcc.Interval(id='intervalo-actualizacion', interval=INTERVALO_ACTUALIZACION_MS),
+    dcc.Store(id='version-graficos'),
+    dcc.Store(id='version-opciones', data=senal.generacion),
+    dcc.Store(id='version-mapa', data=senal.generacion),
     
     # Gráficos en filas
     html.Div([
@@ -93,7 +118,7 @@ app.layout = html.Div([
 ])
 
 # Registrar todos los callbacks
-register_callbacks(app, df_malezas)
+register_callbacks(app, senal)
 
 # Ejecutar la aplicación
 if __name__ == '__main__':
@@ -1,10 +1,67 @@
 # Lógica de callbacks de Dash
-from dash import Output, Input, State, no_update
-from filters import aplicar_filtros
-from visualization import crear_grafico
+from dash import Output, Input, State, no_update, ctx
+from database import (obtener_datos_mapa, obtener_malezas_filtradas, obtener_agregados,
+                      obtener_agregados_cubo, obtener_valores_filtros, obtener_rango_fechas,
+                      buscar_nombres_maleza, obtener_nombres_maleza)
+from filters import construir_filtros_sql, crear_opciones_filtro, FILTROS_DINAMICOS
+from visualization import crear_grafico_agregado, crear_mapa
 from datetime import datetime
 
-def register_callbacks(app, df_malezas):
+# Dimensión de cada gráfico, en el orden de los Output de actualizar_graficos
+GRAFICOS = ['speed', 'sensitivity', 'size', 'weed_placement', 'tile',
+            'wind_speed', 'weed_type', 'weed_name', 'crop_specie', 'weed_diameter']
+
+def _congelar(valor):
+    # Las listas de los dropdowns pasan a tuplas para poder usarlas como clave de caché
+    return tuple(valor) if isinstance(valor, list) else valor
+
+def _con_archivo(valor):
+    return 'archivo' in (valor or [])
+
+def _caja_visible(relayout):
+    """
+    (lat_min, lat_max, lon_min, lon_max) de la zona visible del mapa según su
+    relayoutData, redondeada para que los cachés se reutilicen. None si el mapa no
+    informa la zona o abarca todas las longitudes.
+    """
+    derivado = (relayout or {}).get('map._derived')
+    if not derivado:
+        return None
+    lons = [punto[0] for punto in derivado['coordinates']]
+    lats = [punto[1] for punto in derivado['coordinates']]
+    if max(lons) - min(lons) >= 360:
+        return None
+    return (round(min(lats), 3) - 0.001, round(max(lats), 3) + 0.001,
+            max(round(min(lons), 3) - 0.001, -180.0), min(round(max(lons), 3) + 0.001, 180.0))
+
+def register_callbacks(app, senal):
+    # Cachés válidos hasta la próxima escritura en la base (ver ensayos_db.cambios)
+    mapa_cacheado = senal.cacheado(obtener_datos_mapa)
+
+    @senal.cacheado
+    def opciones_cacheadas(incluir_archivo):
+        valores = obtener_valores_filtros(FILTROS_DINAMICOS.values(), incluir_archivo)
+        return (
+            [crear_opciones_filtro(valores[columna], columna) for columna in FILTROS_DINAMICOS.values()],
+            *obtener_rango_fechas(incluir_archivo)
+        )
+
+    busqueda_cacheada = senal.cacheado(buscar_nombres_maleza)
+
+    @senal.cacheado(tamano_max=32)
+    def graficos_filtrados(filtros, incluir_archivo):
+        # SQLite filtra y agrupa: por gráfico llegan solo la cantidad y la media de cada barra.
+        # Se suma malezas_cubo salvo que algún rango no coincida con sus tramos.
+        filtro_cubo = construir_filtros_sql(*filtros, cubo=True)
+        if filtro_cubo is not None:
+            agregar, (condicion, params) = obtener_agregados_cubo, filtro_cubo
+        else:
+            agregar, (condicion, params) = obtener_agregados, construir_filtros_sql(*filtros)
+        return tuple(
+            crear_grafico_agregado(dimension, agregar(dimension, condicion, params, incluir_archivo))
+            for dimension in GRAFICOS
+        )
+
     @app.callback(
         [Output('grafico-velocidad', 'figure'),
          Output('grafico-sensibilidad', 'figure'),
@@ -15,7 +72,8 @@ def register_callbacks(app, df_malezas):
          Output('grafico-tipo', 'figure'),
          Output('grafico-nombre', 'figure'),
          Output('grafico-especie', 'figure'),
-         Output('grafico-diameter', 'figure')],
+         Output('grafico-diameter', 'figure'),
+         Output('version-graficos', 'data')],
         [Input('filtro-tile', 'value'),
          Input('filtro-sens', 'value'),
          Input('filtro-size', 'value'),
@@ -28,10 +86,19 @@ def register_callbacks(app, df_malezas):
          Input('filtro-fecha-desde', 'date'),
          Input('filtro-fecha-hasta', 'date'),
          Input('filtro-modulo', 'value'),
-         Input('filtro-weed_diameter', 'value')]
+         Input('filtro-weed_diameter', 'value'),
+         Input('incluir-archivo', 'value'),
+         Input('intervalo-actualizacion', 'n_intervals')],
+        State('version-graficos', 'data')
     )
     def actualizar_graficos(tile, sens, size, placement, weed_type, weed_name, 
-                          crop, wind, speed, start_date, end_date, modulo, weed_diameter):
+                          crop, wind, speed, start_date, end_date, modulo, weed_diameter,
+                          incluir_archivo, n_intervals, version_cliente):
+        # Sin escrituras nuevas en la base, el intervalo no recalcula nada
+        generacion = senal.generacion
+        if ctx.triggered_id == 'intervalo-actualizacion' and generacion == version_cliente:
+            return (no_update,) * 11
+
         # Clean filter values by removing None or empty strings
         def clean_filter(value):
             if value is None:
@@ -43,27 +110,86 @@ def register_callbacks(app, df_malezas):
         wind = clean_filter(wind)
         speed = clean_filter(speed)
 
-        df_filtrado = aplicar_filtros(
-            df_malezas, tile, sens, size, placement, weed_type, weed_name, crop,
-            wind, speed, start_date, end_date, modulo, weed_diameter
-        )
-        
-        fig_velocidad = crear_grafico('speed', df_filtrado.copy())
-        fig_sensibilidad = crear_grafico('sensitivity', df_filtrado.copy())
-        fig_tamano = crear_grafico('size', df_filtrado.copy())
-        fig_ubicacion = crear_grafico('weed_placement', df_filtrado.copy())
-        fig_baldosa = crear_grafico('tile', df_filtrado.copy())
-        fig_velocidad_viento = crear_grafico('wind_speed', df_filtrado.copy())
-        fig_tipo = crear_grafico('weed_type', df_filtrado.copy())
-        fig_nombre = crear_grafico('weed_name', df_filtrado.copy())
-        fig_especie = crear_grafico('crop_specie', df_filtrado.copy())
-        fig_diametro = crear_grafico('weed_diameter', df_filtrado.copy())
+        filtros = [tile, sens, size, placement, weed_type, weed_name, crop,
+                   wind, speed, start_date, end_date, modulo, weed_diameter]
+        figuras = graficos_filtrados(tuple(_congelar(valor) for valor in filtros),
+                                     _con_archivo(incluir_archivo))
+
+        return (*figuras, generacion)
+
+    @app.callback(
+        [Output(id_filtro, 'options') for id_filtro in FILTROS_DINAMICOS] +
+        [Output('filtro-fecha-desde', 'min_date_allowed'),
+         Output('filtro-fecha-desde', 'max_date_allowed'),
+         Output('filtro-fecha-desde', 'date'),
+         Output('filtro-fecha-hasta', 'min_date_allowed'),
+         Output('filtro-fecha-hasta', 'max_date_allowed'),
+         Output('filtro-fecha-hasta', 'date'),
+         Output('version-opciones', 'data')],
+        [Input('intervalo-actualizacion', 'n_intervals'),
+         Input('incluir-archivo', 'value')],
+        [State('version-opciones', 'data'),
+         State('filtro-fecha-desde', 'date'),
+         State('filtro-fecha-desde', 'min_date_allowed'),
+         State('filtro-fecha-hasta', 'date'),
+         State('filtro-fecha-hasta', 'max_date_allowed')],
+        prevent_initial_call=True
+    )
+    def actualizar_opciones(n_intervals, incluir_archivo, version_cliente, fecha_desde, fecha_min_anterior,
+                            fecha_hasta, fecha_max_anterior):
+        generacion = senal.generacion
+        if ctx.triggered_id == 'intervalo-actualizacion' and generacion == version_cliente:
+            return (no_update,) * (len(FILTROS_DINAMICOS) + 7)
+
+        opciones, fecha_min, fecha_max = opciones_cacheadas(_con_archivo(incluir_archivo))
+
+        # Si el usuario no había movido el rango de fechas, se extiende a los ensayos nuevos
+        if fecha_desde == fecha_min_anterior:
+            fecha_desde = fecha_min
+        if fecha_hasta == fecha_max_anterior:
+            fecha_hasta = fecha_max
 
         return (
-            fig_velocidad, fig_sensibilidad, fig_tamano, fig_ubicacion,
-            fig_baldosa, fig_velocidad_viento, fig_tipo, fig_nombre, fig_especie, fig_diametro
+            *opciones,
+            fecha_min, fecha_max, fecha_desde,
+            fecha_min, fecha_max, fecha_hasta,
+            generacion
         )
 
+    @app.callback(
+        [Output('mapa-clientes', 'figure'),
+         Output('tabla-ubicaciones', 'data'),
+         Output('version-mapa', 'data')],
+        [Input('intervalo-actualizacion', 'n_intervals'),
+         Input('incluir-archivo', 'value'),
+         Input('mapa-clientes', 'relayoutData')],
+        State('version-mapa', 'data'),
+        prevent_initial_call=True
+    )
+    def actualizar_mapa(n_intervals, incluir_archivo, relayout, version_cliente):
+        # El mapa y la tabla muestran solo los ensayos de la zona visible
+        generacion = senal.generacion
+        if ctx.triggered_id == 'intervalo-actualizacion' and generacion == version_cliente:
+            return no_update, no_update, no_update
+        if ctx.triggered_id == 'mapa-clientes' and 'map._derived' not in (relayout or {}):
+            # Un relayout sin zona (p. ej. autosize) no cambia lo que hay que mostrar
+            return no_update, no_update, no_update
+
+        df_mapa = mapa_cacheado(_con_archivo(incluir_archivo), _caja_visible(relayout))
+        return crear_mapa(df_mapa), df_mapa.to_dict('records'), generacion
+
+    @app.callback(
+        Output('filtro-name', 'options'),
+        Input('filtro-name', 'search_value'),
+        State('filtro-name', 'value')
+    )
+    def buscar_nombres(texto, seleccionados):
+        # Solo llegan al navegador los nombres que coinciden con lo escrito; los ya
+        # seleccionados se mantienen aunque no coincidan
+        nombres = dict(busqueda_cacheada(texto or ""))
+        nombres.update(obtener_nombres_maleza(seleccionados or []))
+        return crear_opciones_filtro(nombres, 'weed_name')
+
     @app.callback(
         Output("download-malezas-filtradas", "data"),
         Input("btn-descargar-malezas", "n_clicks"),
@@ -79,14 +205,16 @@ def register_callbacks(app, df_malezas):
          State('filtro-fecha-desde', 'date'),
          State('filtro-fecha-hasta', 'date'),
          State('filtro-modulo', 'value'),
-         State('filtro-weed_diameter', 'value')],
+         State('filtro-weed_diameter', 'value'),
+         State('incluir-archivo', 'value')],
         prevent_initial_call=True
     )
-    def descargar_malezas_filtradas(n_clicks, tile, sens, size, placement, weed_type, weed_name, crop, wind, speed, start_date, end_date, modulo, weed_diameter):
+    def descargar_malezas_filtradas(n_clicks, tile, sens, size, placement, weed_type, weed_name, crop, wind, speed, start_date, end_date, modulo, weed_diameter, incluir_archivo):
         if n_clicks is None:
             return no_update
         
-        df_filtrado = aplicar_filtros(df_malezas, tile, sens, size, placement, weed_type, weed_name, crop, wind, speed, start_date, end_date, modulo, weed_diameter)
+        df_filtrado = obtener_malezas_filtradas(*construir_filtros_sql(tile, sens, size, placement, weed_type, weed_name, crop, wind, speed, start_date, end_date, modulo, weed_diameter),
+                                                _con_archivo(incluir_archivo))
         
         columnas_malezas = [
             'ensayo_id', 'weed_diameter', 'size', 'height', 'weed_placement',
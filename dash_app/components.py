@@ -2,7 +2,7 @@
 from dash import html, dcc
 from filters import crear_opciones_filtro
 
-def filtros_layout(df_aplico, df_malezas):
+def filtros_layout(valores_filtros, fecha_min, fecha_max):
     return html.Div([
     html.H3("Filtros"),
     
@@ -12,7 +12,7 @@ def filtros_layout(df_aplico, df_malezas):
             html.Label("Baldosa"),
             dcc.Dropdown(
                 id='filtro-tile',
-                options=crear_opciones_filtro(df_malezas, 'tile'),
+                options=crear_opciones_filtro([], 'tile'),
                 multi=True,
                 placeholder="Seleccione baldosa(s)"
             )
@@ -22,7 +22,7 @@ def filtros_layout(df_aplico, df_malezas):
             html.Label("Sensibilidad"),
             dcc.Dropdown(
                 id='filtro-sens',
-                options=crear_opciones_filtro(df_malezas, 'sensitivity'),
+                options=crear_opciones_filtro([], 'sensitivity'),
                 multi=True,
                 placeholder="Seleccione sensibilidad(es)"
             )
@@ -32,7 +32,7 @@ def filtros_layout(df_aplico, df_malezas):
             html.Label("Tamaño maleza"),
             dcc.Dropdown(
                 id='filtro-size',
-                options=crear_opciones_filtro(df_malezas, 'size'),
+                options=crear_opciones_filtro([], 'size'),
                 multi=True,
                 placeholder="Seleccione tamaño(s)"
             )
@@ -42,7 +42,7 @@ def filtros_layout(df_aplico, df_malezas):
             html.Label("Ubicación maleza"),
             dcc.Dropdown(
                 id='filtro-placement',
-                options=crear_opciones_filtro(df_malezas,'weed_placement'),
+                options=crear_opciones_filtro(valores_filtros['weed_placement'], 'weed_placement'),
                 multi=True,
                 placeholder="Seleccione ubicación(es)"
             )
@@ -55,7 +55,7 @@ def filtros_layout(df_aplico, df_malezas):
             html.Label("Tipo de maleza"),
             dcc.Dropdown(
                 id='filtro-type',
-                options=crear_opciones_filtro(df_malezas, 'weed_type'),
+                options=crear_opciones_filtro(valores_filtros['weed_type'], 'weed_type'),
                 multi=True,
                 placeholder="Seleccione tipo(s)"
             )
@@ -65,9 +65,10 @@ def filtros_layout(df_aplico, df_malezas):
             html.Label("Nombre maleza"),
             dcc.Dropdown(
                 id='filtro-name',
-                options=crear_opciones_filtro(df_malezas, 'weed_name'),
+                # Las opciones las llena la búsqueda mientras se escribe (ver callbacks)
+                options=[],
                 multi=True,
-                placeholder="Seleccione nombre(s)"
+                placeholder="Escriba para buscar nombre(s)"
             )
         ], style={'width': '23%', 'display': 'inline-block', 'margin': '5px'}),
 
@@ -75,7 +76,7 @@ def filtros_layout(df_aplico, df_malezas):
             html.Label("Especie cultivo"),
             dcc.Dropdown(
                 id='filtro-crop',
-                options=crear_opciones_filtro(df_malezas, 'crop_specie'),
+                options=crear_opciones_filtro(valores_filtros['crop_specie'], 'crop_specie'),
                 multi=True,
                 placeholder="Seleccione especie(s)"
             )
@@ -85,7 +86,7 @@ def filtros_layout(df_aplico, df_malezas):
             html.Label("Velocidad de avance"),
             dcc.Dropdown(
                 id='filtro-speed',
-                options=crear_opciones_filtro(df_malezas, 'speed'),
+                options=crear_opciones_filtro([], 'speed'),
                 multi=True,
                 placeholder="Seleccione velocidad(es)"
             )
@@ -98,7 +99,7 @@ def filtros_layout(df_aplico, df_malezas):
             html.Label("Velocidad viento"),
             dcc.Dropdown(
                 id='filtro-wind',
-                options=crear_opciones_filtro(df_malezas, 'wind_speed'),
+                options=crear_opciones_filtro([], 'wind_speed'),
                 multi=True,
                 placeholder="Seleccione velocidad(es)"
             )
@@ -108,8 +109,7 @@ def filtros_layout(df_aplico, df_malezas):
             html.Label("Módulo"),
             dcc.Dropdown(
                 id='filtro-modulo',
-                options=[{'label': str(m), 'value': m} 
-                         for m in sorted(df_malezas['modules_id'].dropna().unique())],
+                options=crear_opciones_filtro(valores_filtros['modules_id'], 'modules_id'),
                 multi=True,
                 placeholder="Seleccione módulo(s)"
             )
@@ -119,7 +119,7 @@ def filtros_layout(df_aplico, df_malezas):
             html.Label("Diametro maleza"),
             dcc.Dropdown(
                 id='filtro-weed_diameter',
-                options=crear_opciones_filtro(df_malezas, 'weed_diameter'),
+                options=crear_opciones_filtro([], 'weed_diameter'),
                 multi=True,
                 placeholder="Seleccione diámetro(s)"
             )
@@ -132,9 +132,9 @@ def filtros_layout(df_aplico, df_malezas):
         html.Label("Fecha desde: "),
         dcc.DatePickerSingle(
             id='filtro-fecha-desde',
-            min_date_allowed=df_malezas['fecha_ensayo'].min(),
-            max_date_allowed=df_malezas['fecha_ensayo'].max(),
-            date=df_malezas['fecha_ensayo'].min(),                display_format='YYYY-MM-DD'
+            min_date_allowed=fecha_min,
+            max_date_allowed=fecha_max,
+            date=fecha_min,                display_format='YYYY-MM-DD'
         )
     ], style={'width': '23%', 'display': 'inline-block', 'margin': '5px'}),
     
@@ -142,11 +142,20 @@ def filtros_layout(df_aplico, df_malezas):
         html.Label("Fecha hasta: "),
         dcc.DatePickerSingle(
             id='filtro-fecha-hasta',
-            min_date_allowed=df_malezas['fecha_ensayo'].min(),
-            max_date_allowed=df_malezas['fecha_ensayo'].max(),
-            date=df_malezas['fecha_ensayo'].max(),
+            min_date_allowed=fecha_min,
+            max_date_allowed=fecha_max,
+            date=fecha_max,
             display_format='YYYY-MM-DD'
         )
+    ], style={'width': '23%', 'display': 'inline-block', 'margin': '5px'}),
+
+    # Los ensayos archivados (ensayos_db.archivo) solo se leen si se pide
+    html.Div([
+        dcc.Checklist(
+            id='incluir-archivo',
+            options=[{'label': ' Incluir ensayos archivados', 'value': 'archivo'}],
+            value=[]
+        )
     ], style={'width': '23%', 'display': 'inline-block', 'margin': '5px'})
 
 
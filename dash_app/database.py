@@ -1,92 +1,263 @@
 # Conexión y consultas a SQLite
-import sqlite3
 import pandas as pd
+from ensayos_db import (obtener_instantanea, adjuntar_archivo, fuente, DICCIONARIOS, tramos_en_rango,
+                        buscar_especies, ensayos_en_caja)
+from filters import RANGOS_GRAFICOS
 
 DB_PATH = "/home/user/Documentos/Proyecto_main/ensayos.db"
 
-def _run_query(query):
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    return df
+# Tipos fijos para las columnas numéricas de malezas: un resultado filtrado sin
+# valores (p. ej. ensayos sin pulverizadora) no debe volverse 'object'
+TIPOS_MALEZAS = {
+    'weed_diameter': 'float64',
+    'size': 'float64',
+    'height': 'float64',
+    'weed_applied': 'float64',
+    'speed': 'float64',
+    'sensitivity': 'float64',
+    'tile': 'float64',
+    'wind_speed': 'float64',
+}
 
-def obtener_datos_malezas():
-    query = """ 
+def _run_query(query, params=None, dtype=None):
+    # Se lee la instantánea de solo lectura de la base (ver ensayos_db/instantanea.py),
+    # no el archivo en el que escribe Streamlit. La primera consulta del proceso
+    # migra la base y publica la instantánea
+    conn = obtener_instantanea(DB_PATH)
+    return pd.read_sql_query(query, conn, params=params, dtype=dtype)
+
+def _desde(tabla, incluir_archivo):
+    # Solo la base caliente, salvo que se pida sumar los ensayos archivados
+    return fuente(obtener_instantanea(DB_PATH), tabla, incluir_archivo)
+
+def _consultar_malezas(condicion="", params=(), incluir_archivo=False):
+    # malezas_flat ya tiene todas las dimensiones (se mantiene con triggers): una sola lectura
+    query = f""" 
         SELECT 
-            r.ensayo_id,
-            r.uploader,
-            r.weed_diameter,
-            r.size,
-            r.height,
-            r.weed_placement,
-            r.weed_type,
-            r.weed_name,
-            r.weed_applied,
-            p.speed,
-            m.sens AS sensitivity,
-            m.tile,
-            c.crop_specie,
-            ca.wind_speed,
-            e.test_date AS fecha_ensayo,
-            cli.name AS cliente,
-            cli.modules_id,
-            u.farm
-        FROM resultados_malezas r
-        LEFT JOIN ensayos e ON r.ensayo_id = e.ensayo_id
-        LEFT JOIN clientes cli ON e.cliente_id = cli.cliente_id
-        LEFT JOIN ubicacion u ON e.ensayo_id = u.ensayo_id
-        LEFT JOIN pulverizadora p ON e.ensayo_id = p.ensayo_id
-        LEFT JOIN modelo_deteccion m ON e.ensayo_id = m.ensayo_id
-        LEFT JOIN condiciones_ambientales ca ON e.ensayo_id = ca.ensayo_id
-        LEFT JOIN cultivo c ON e.ensayo_id = c.ensayo_id
-        WHERE r.weed_applied IS NOT NULL
+            ensayo_id,
+            uploader,
+            weed_diameter,
+            size,
+            height,
+            weed_placement,
+            weed_type,
+            weed_name,
+            weed_applied,
+            speed,
+            sensitivity,
+            tile,
+            crop_specie,
+            wind_speed,
+            fecha_ensayo,
+            cliente,
+            modules_id,
+            farm
+        FROM {_desde('malezas_flat', incluir_archivo)}
+        WHERE weed_applied IS NOT NULL {condicion}
     """
-    df = _run_query(query)
+    df = _run_query(query, params, dtype=TIPOS_MALEZAS)
     df['size'] = df['size'].replace(0, float('nan'))
     return df
 
-def obtener_datos_mapa():
+def obtener_datos_malezas():
+    return _consultar_malezas()
+
+def obtener_malezas_filtradas(condicion, params, incluir_archivo=False):
+    """
+    Malezas que cumplen `condicion` (ver filters.construir_filtros_sql): el filtrado
+    lo hace SQLite y a pandas solo llegan las filas que se van a graficar.
+    """
+    return _consultar_malezas(f"AND ({condicion})", params, incluir_archivo)
+
+def obtener_valores_filtros(columnas, incluir_archivo=False):
+    """
+    Valores distintos de cada columna de filtro, sin traer las filas a memoria.
+    Las columnas con diccionario devuelven {id: texto} leído de su tabla.
+    """
+    valores = {}
+    for columna in columnas:
+        if columna in DICCIONARIOS:
+            df = _run_query(f"SELECT id, valor FROM {DICCIONARIOS[columna]}")
+            valores[columna] = dict(zip(df['id'], df['valor']))
+            continue
+        query = f"""
+            SELECT DISTINCT {columna}
+            FROM {_desde('malezas_flat', incluir_archivo)}
+            WHERE weed_applied IS NOT NULL AND {columna} IS NOT NULL
+        """
+        valores[columna] = _run_query(query)[columna].tolist()
+    return valores
+
+def buscar_nombres_maleza(texto, limite=50):
+    """
+    {id: nombre} de los nombres de maleza que coinciden con `texto` (índice FTS5
+    del diccionario). El diccionario de la base caliente incluye los del archivo.
+    """
+    return dict(buscar_especies(obtener_instantanea(DB_PATH), texto, limite))
+
+def obtener_nombres_maleza(ids):
+    """{id: nombre} de los ids de maleza dados."""
+    if not ids:
+        return {}
+    query = f"SELECT id, valor FROM {DICCIONARIOS['weed_name']} WHERE id IN ({', '.join('?' * len(ids))})"
+    df = _run_query(query, list(ids))
+    return dict(zip(df['id'], df['valor']))
+
+def obtener_rango_fechas(incluir_archivo=False):
+    query = f"""
+        SELECT MIN(fecha_ensayo) AS desde, MAX(fecha_ensayo) AS hasta
+        FROM {_desde('malezas_flat', incluir_archivo)}
+        WHERE weed_applied IS NOT NULL
+    """
+    fila = _run_query(query).iloc[0]
+    return fila['desde'], fila['hasta']
+
+def _expresion_rango(dimension):
+    """Expresión SQL que asigna a cada fila la etiqueta de su barra en el gráfico de `dimension`."""
+    if dimension in RANGOS_GRAFICOS:
+        bordes, etiquetas = RANGOS_GRAFICOS[dimension]
+        # Igual que en pandas, un tamaño 0 equivale a vacío
+        columna = "NULLIF(size, 0)" if dimension == 'size' else dimension
+        casos = []
+        for minimo, maximo, etiqueta in zip(bordes, bordes[1:], etiquetas):
+            if maximo == float('inf'):
+                casos.append(f"WHEN {columna} >= {minimo} THEN '{etiqueta}'")
+            else:
+                casos.append(f"WHEN {columna} >= {minimo} AND {columna} < {maximo} THEN '{etiqueta}'")
+        return f"CASE {' '.join(casos)} END"
+    if dimension in ('sensitivity', 'tile'):
+        return f"CAST(CAST({dimension} AS INTEGER) AS TEXT)"
+    return dimension
+
+def obtener_agregados(dimension, condicion="1", params=(), incluir_archivo=False):
+    """
+    Cantidad de malezas y proporción aplicada por barra del gráfico de `dimension`,
+    calculadas en SQLite: a pandas llegan unas pocas filas en vez de todas las malezas.
+
+    Returns:
+        DataFrame: columnas rango, count, media (sin las filas fuera de todo rango)
+    """
+    if dimension in DICCIONARIOS:
+        # Se agrupa por el id entero y el texto se busca después en el diccionario
+        query = f"""
+            SELECT d.valor AS rango, a.count, a.media
+            FROM (
+                SELECT {dimension}_id AS clave, COUNT(*) AS count, AVG(weed_applied) AS media
+                FROM {_desde('malezas_flat', incluir_archivo)}
+                WHERE weed_applied IS NOT NULL AND {dimension}_id IS NOT NULL AND ({condicion})
+                GROUP BY clave
+            ) a
+            JOIN {DICCIONARIOS[dimension]} d ON d.id = a.clave
+            ORDER BY rango
+        """
+        return _run_query(query, params, dtype={'count': 'int64', 'media': 'float64'})
+
+    query = f"""
+        SELECT rango, COUNT(*) AS count, AVG(weed_applied) AS media
+        FROM (
+            SELECT {_expresion_rango(dimension)} AS rango, weed_applied
+            FROM {_desde('malezas_flat', incluir_archivo)}
+            WHERE weed_applied IS NOT NULL AND ({condicion})
+        )
+        WHERE rango IS NOT NULL
+        GROUP BY rango
+        ORDER BY rango
+    """
+    return _run_query(query, params, dtype={'count': 'int64', 'media': 'float64'})
+
+def _expresion_rango_cubo(dimension):
+    """Como _expresion_rango, pero sobre malezas_cubo: cada barra es un conjunto de tramos."""
+    if dimension in RANGOS_GRAFICOS:
+        bordes, etiquetas = RANGOS_GRAFICOS[dimension]
+        casos = []
+        for minimo, maximo, etiqueta in zip(bordes, bordes[1:], etiquetas):
+            tramos = tramos_en_rango(dimension, minimo, maximo)
+            casos.append(f"WHEN {dimension}_tramo BETWEEN {tramos[0]} AND {tramos[-1]} THEN '{etiqueta}'")
+        return f"CASE {' '.join(casos)} END"
+    if dimension in ('sensitivity', 'tile'):
+        return f"CAST({dimension} AS TEXT)"
+    return dimension
+
+def obtener_agregados_cubo(dimension, condicion="1", params=(), incluir_archivo=False):
+    """
+    Lo mismo que obtener_agregados, sumando las filas de malezas_cubo (una por
+    ensayo y combinación de dimensiones) en lugar de recorrer las malezas.
+    `condicion` sale de construir_filtros_sql(..., cubo=True).
+    """
+    if dimension in DICCIONARIOS:
+        query = f"""
+            SELECT d.valor AS rango, a.count, a.media
+            FROM (
+                SELECT {dimension}_id AS clave, SUM(malezas) AS count,
+                       CAST(SUM(aplicadas) AS REAL) / SUM(malezas) AS media
+                FROM {_desde('malezas_cubo', incluir_archivo)}
+                WHERE {dimension}_id IS NOT NULL AND ({condicion})
+                GROUP BY clave
+            ) a
+            JOIN {DICCIONARIOS[dimension]} d ON d.id = a.clave
+            ORDER BY rango
+        """
+        return _run_query(query, params, dtype={'count': 'int64', 'media': 'float64'})
+
+    query = f"""
+        SELECT rango, SUM(malezas) AS count, CAST(SUM(aplicadas) AS REAL) / SUM(malezas) AS media
+        FROM (
+            SELECT {_expresion_rango_cubo(dimension)} AS rango, malezas, aplicadas
+            FROM {_desde('malezas_cubo', incluir_archivo)}
+            WHERE ({condicion})
+        )
+        WHERE rango IS NOT NULL
+        GROUP BY rango
+        ORDER BY rango
+    """
+    return _run_query(query, params, dtype={'count': 'int64', 'media': 'float64'})
+
+def obtener_datos_mapa(incluir_archivo=False, caja=None):
+    """
+    Ubicaciones de los ensayos para el mapa y su tabla. Con `caja`
+    (lat_min, lat_max, lon_min, lon_max) solo las que caen dentro, por el índice
+    R*Tree (ver ensayos_db/espacial.py).
+    """
+    if caja is not None:
+        conn = obtener_instantanea(DB_PATH)
+        esquemas = ["main", "archivo"] if incluir_archivo and adjuntar_archivo(conn) else ["main"]
+        filas = [fila for esquema in esquemas for fila in ensayos_en_caja(conn, *caja, esquema)]
+        df = pd.DataFrame(filas, columns=['ensayo_id', 'latitude', 'longitude', 'farm', 'cliente'])
+        return df.drop(columns='ensayo_id')
     query = """ 
         SELECT 
             u.latitude, 
             u.longitude, 
             u.farm, 
             c.name AS cliente
-        FROM ubicacion u
-        LEFT JOIN ensayos e ON u.ensayo_id = e.ensayo_id
-        LEFT JOIN clientes c ON e.cliente_id = c.cliente_id
+        FROM {esquema}ubicacion u
+        LEFT JOIN {esquema}ensayos e ON u.ensayo_id = e.ensayo_id
+        LEFT JOIN {esquema}clientes c ON e.cliente_id = c.cliente_id
     """
-    return _run_query(query)
+    if incluir_archivo and adjuntar_archivo(obtener_instantanea(DB_PATH)):
+        # Cada ensayo se une con los clientes de su propia base
+        return _run_query(query.format(esquema="main.") + " UNION ALL " + query.format(esquema="archivo."))
+    return _run_query(query.format(esquema=""))
 
 def obtener_datos_aplico():
     query = """ 
         SELECT 
-            p.speed,
-            m.sens AS sensitivity,
-            m.tile,
-            r.weed_applied,
-            r.weed_diameter,
-            r.size,
-            r.weed_placement,
-            r.weed_name,
-            r.weed_type,
-            c.crop_specie,
-            ca.wind_speed
-        FROM pulverizadora p
-        JOIN ensayos e ON p.ensayo_id = e.ensayo_id
-        JOIN resultados_malezas r ON e.ensayo_id = r.ensayo_id
-        LEFT JOIN modelo_deteccion m ON e.ensayo_id = m.ensayo_id
-        LEFT JOIN condiciones_ambientales ca ON e.ensayo_id = ca.ensayo_id
-        LEFT JOIN cultivo c ON e.ensayo_id = c.ensayo_id
-        WHERE r.weed_applied IS NOT NULL 
-        AND (p.speed IS NOT NULL OR m.sens IS NOT NULL)
+            speed,
+            sensitivity,
+            tile,
+            weed_applied,
+            weed_diameter,
+            size,
+            weed_placement,
+            weed_name,
+            weed_type,
+            crop_specie,
+            wind_speed
+        FROM malezas_flat
+        WHERE weed_applied IS NOT NULL 
+        AND (speed IS NOT NULL OR sensitivity IS NOT NULL)
     """ 
+    # sensitivity y tile ya vienen como enteros 1-3 (tablas STRICT con CHECK)
     df = _run_query(query)
-    # Limpieza de columnas (igual que en tu código)
-    df.loc[:, 'sensitivity'] = pd.to_numeric(df['sensitivity'], errors='coerce')
-    df = df.loc[df['sensitivity'].isin([1, 2, 3]) | df['sensitivity'].isna()]
-    if 'tile' in df.columns:
-        df.loc[:, 'tile'] = pd.to_numeric(df['tile'], errors='coerce')
-        df = df.loc[df['tile'].isin([1, 2, 3]) | df['tile'].isna()]
     df['size'] = df['size'].replace(0, float('nan'))
     return df
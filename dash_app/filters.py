@@ -1,125 +1,163 @@
 # Lógica para aplicar filtros y generar opciones
 import pandas as pd
+from ensayos_db import tramos_en_rango
 
-def aplicar_filtros(df, tile=None, sens=None, size=None, placement=None,
-                   weed_type=None, weed_name=None, crop=None, wind=None, speed=None, fecha_inicio=None, fecha_fin=None, modulo=None, weed_diameter=None):
-    df_filtrado = df.copy()
-    
-    def parse_range(rango):
-        """Helper function to parse range strings safely"""
-        if not rango:
-            return None
-        
-        parts = rango.split('-')
-        if len(parts) == 2:
-            try:
-                min_val = float(parts[0])
-                max_val = float(parts[1])
-                return (min_val, max_val)
-            except (ValueError, TypeError):
-                return None
-        elif rango.startswith('>'):
-            try:
-                min_val = float(rango[1:])
-                return (min_val, float('inf'))
-            except (ValueError, TypeError):
-                return None
+# Filtros cuyas opciones salen de los datos (id del dropdown -> columna). Las del
+# nombre de maleza no se listan enteras: salen de la búsqueda de especies
+FILTROS_DINAMICOS = {
+    'filtro-placement': 'weed_placement',
+    'filtro-type': 'weed_type',
+    'filtro-crop': 'crop_specie',
+    'filtro-modulo': 'modules_id',
+}
+
+# Rangos [min, max) de cada opción de los filtros de tamaño y diámetro
+BINS_TAMANO = {
+    '3': (2, 3.5),
+    '5': (3.5, 5.5),
+    '7': (5.5, 7.5),
+    '9': (7.5, 9.5),
+    '15': (9.5, 15.5),
+    '20': (15.5, 20.5),
+    '25': (20.5, 25.5),
+    '>25': (26, 1000),
+}
+BINS_DIAMETRO = {
+    '0-15': (0, 15),
+    '15-30': (15, 30),
+    '>=30': (30, 1000),
+}
+
+# Rangos de los gráficos por variable numérica: (bordes [min, max), etiquetas).
+# Los usan tanto pd.cut como el CASE de las agregaciones en SQL.
+RANGOS_GRAFICOS = {
+    'speed': ([0, 5, 10, 15, 20, 25], ["0-5", "5-10", "10-15", "15-20", "20-25"]),
+    'wind_speed': ([0, 5, 10, 15, 20, 25], ["0-5", "5-10", "10-15", "15-20", "20-25"]),
+    'size': ([0, 3.5, 5.5, 7.5, 9.5, 15.5, 20.5, 25.5, float('inf')],
+             ["3", "5", "7", "9", "15", "20", "25", ">25"]),
+    'weed_diameter': ([0, 15, 30, float('inf')], ["0-15", "15-30", ">=30"]),
+}
+
+def parse_range(rango):
+    """Helper function to parse range strings safely"""
+    if not rango:
         return None
     
+    parts = rango.split('-')
+    if len(parts) == 2:
+        try:
+            min_val = float(parts[0])
+            max_val = float(parts[1])
+            return (min_val, max_val)
+        except (ValueError, TypeError):
+            return None
+    elif rango.startswith('>'):
+        try:
+            min_val = float(rango[1:])
+            return (min_val, float('inf'))
+        except (ValueError, TypeError):
+            return None
+    return None
+
+def construir_filtros_sql(tile=None, sens=None, size=None, placement=None,
+                          weed_type=None, weed_name=None, crop=None, wind=None, speed=None,
+                          fecha_inicio=None, fecha_fin=None, modulo=None, weed_diameter=None,
+                          cubo=False):
+    """
+    Traduce los filtros del dashboard a una condición SQL parametrizada sobre
+    malezas_flat, para que SQLite devuelva solo las filas que coinciden. Ubicación,
+    tipo y nombre de maleza llegan como ids de diccionario.
+
+    Con cubo=True la condición es sobre malezas_cubo: los rangos numéricos se
+    traducen a sus tramos (ver ensayos_db.cubo).
+
+    Returns:
+        tuple: (condición para el WHERE, lista de parámetros). Sin filtros la condición
+        es '1'. Con cubo=True devuelve None si algún rango no coincide con los tramos.
+    """
+    condiciones = []
+    params = []
+    fuera_del_cubo = []
+
+    def en_lista(columna, valores):
+        condiciones.append(f"{columna} IN ({', '.join('?' * len(valores))})")
+        params.extend(valores)
+
+    def en_rangos(columna, rangos):
+        if cubo:
+            tramos = [tramos_en_rango(columna, min_val, max_val) for min_val, max_val in rangos]
+            if None in tramos:
+                fuera_del_cubo.append(columna)
+                return
+            en_lista(f'{columna}_tramo', sorted({tramo for lista in tramos for tramo in lista}))
+            return
+        alternativas = []
+        for min_val, max_val in rangos:
+            if max_val == float('inf'):
+                alternativas.append(f"{columna} >= ?")
+                params.append(min_val)
+            else:
+                alternativas.append(f"({columna} >= ? AND {columna} < ?)")
+                params.extend((min_val, max_val))
+        condiciones.append("(" + " OR ".join(alternativas) + ")")
+
     if tile:
-        df_filtrado = df_filtrado.loc[df_filtrado['tile'].isin(tile)]
+        en_lista('tile', tile)
     if sens:
-        df_filtrado = df_filtrado.loc[df_filtrado['sensitivity'].isin(sens)]
+        en_lista('sensitivity', sens)
 
     if size:
-        tamano_bins = []
-        for rango in size:
-            if rango == '3':
-                tamano_bins.append((2, 3.5))
-            elif rango == '5':
-                tamano_bins.append((3.5, 5.5))
-            elif rango == '7':
-                tamano_bins.append((5.5, 7.5))
-            elif rango == '9':
-                tamano_bins.append((7.5, 9.5))
-            elif rango == '15':
-                tamano_bins.append((9.5, 15.5))
-            elif rango == '20':
-                tamano_bins.append((15.5, 20.5))
-            elif rango == '25':
-                tamano_bins.append((20.5, 25.5))
-            elif rango == '>25':
-                tamano_bins.append((26, 1000))
-
-        df_filtrado['size'] = pd.to_numeric(df_filtrado['size'], errors='coerce')
-        df_filtrado = df_filtrado[df_filtrado['size'].notna()]
-
+        # Con el filtro activo se descartan tamaños vacíos (0 equivale a vacío)
+        condiciones.append("size_tramo IS NOT NULL" if cubo else "size IS NOT NULL AND size <> 0")
+        tamano_bins = [BINS_TAMANO[rango] for rango in size if rango in BINS_TAMANO]
         if tamano_bins:
-            df_filtrado = df_filtrado[df_filtrado['size'].apply(
-                lambda x: any(min_val <= x < max_val for min_val, max_val in tamano_bins)
-            )]
+            en_rangos('size', tamano_bins)
 
     if placement:
-        df_filtrado = df_filtrado.loc[df_filtrado['weed_placement'].isin(placement)]
+        en_lista('weed_placement_id', placement)
     if weed_type:
-        df_filtrado = df_filtrado.loc[df_filtrado['weed_type'].isin(weed_type)]
+        en_lista('weed_type_id', weed_type)
     if weed_name:
-        df_filtrado = df_filtrado.loc[df_filtrado['weed_name'].isin(weed_name)]
+        en_lista('weed_name_id', weed_name)
     if crop:
-        df_filtrado = df_filtrado.loc[df_filtrado['crop_specie'].isin(crop)]
+        en_lista('crop_specie', crop)
+
     if wind:
-        wind_bins = []
-        for rango in wind:
-            parsed = parse_range(rango)
-            if parsed:
-                wind_bins.append(parsed)
-        
+        wind_bins = [parsed for parsed in map(parse_range, wind) if parsed]
         if wind_bins:
-            df_filtrado = df_filtrado.loc[df_filtrado['wind_speed'].apply(
-                lambda x: any(min_val <= x < max_val for min_val, max_val in wind_bins) if pd.notna(x) else False)]
+            en_rangos('wind_speed', wind_bins)
     if speed:
-        speed_bins = []
-        for rango in speed:
-            parsed = parse_range(rango)
-            if parsed:
-                speed_bins.append(parsed)
-        
+        speed_bins = [parsed for parsed in map(parse_range, speed) if parsed]
         if speed_bins:
-            df_filtrado = df_filtrado.loc[df_filtrado['speed'].apply(
-                lambda x: any(min_val <= x < max_val for min_val, max_val in speed_bins) if pd.notna(x) else False)]
-            
-    if weed_diameter:
-        diameter_bins = []
-        for rango in weed_diameter:
-            if rango == '0-15':
-                diameter_bins.append((0, 15))
-            elif rango == '15-30':
-                diameter_bins.append((15, 30))
-            elif rango == '>=30':
-                diameter_bins.append((30, 1000))
-
-        df_filtrado['weed_diameter'] = pd.to_numeric(df_filtrado['weed_diameter'], errors='coerce')
-        df_filtrado = df_filtrado[df_filtrado['weed_diameter'].notna()]
+            en_rangos('speed', speed_bins)
 
+    if weed_diameter:
+        condiciones.append("weed_diameter_tramo IS NOT NULL" if cubo else "weed_diameter IS NOT NULL")
+        diameter_bins = [BINS_DIAMETRO[rango] for rango in weed_diameter if rango in BINS_DIAMETRO]
         if diameter_bins:
-            df_filtrado = df_filtrado[df_filtrado['weed_diameter'].apply(
-                lambda x: any(min_val <= x < max_val for min_val, max_val in diameter_bins)
-            )]
+            en_rangos('weed_diameter', diameter_bins)
 
-    # Nuevos filtros
     if fecha_inicio and fecha_fin:
-        df_filtrado = df_filtrado.loc[
-            (df_filtrado['fecha_ensayo'] >= fecha_inicio) & 
-            (df_filtrado['fecha_ensayo'] <= fecha_fin)
-        ]
+        condiciones.append("fecha_ensayo >= ? AND fecha_ensayo <= ?")
+        params.extend((fecha_inicio, fecha_fin))
     if modulo:
-        df_filtrado = df_filtrado.loc[df_filtrado['modules_id'].isin(modulo)]
+        en_lista('modules_id', modulo)
 
-    return df_filtrado
+    if fuera_del_cubo:
+        return None
+    return (" AND ".join(condiciones) or "1"), params
 
-def crear_opciones_filtro(df, columna):
+def crear_opciones_filtro(valores, columna):
+    """
+    Opciones de un dropdown. `valores` son los valores distintos de la columna, o
+    {id: texto} para las columnas con diccionario (se ignoran en los filtros con
+    rangos fijos).
+    """
+    if isinstance(valores, dict):
+        return [{'label': str(texto), 'value': id_valor}
+                for id_valor, texto in sorted(valores.items(), key=lambda item: item[1])]
 
-    valores_unicos = df[columna].dropna().unique()
+    valores_unicos = pd.Series(valores).dropna().unique()
 
     if columna == 'sensitivity':
         return [{'label': '1', 'value': 1}, 
@@ -2,6 +2,7 @@
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
+from filters import RANGOS_GRAFICOS
 
 def crear_mapa(df_mapa):
     fig = px.scatter_map(
@@ -13,85 +14,43 @@ def crear_mapa(df_mapa):
         zoom=4,
         height=500
     )
-    fig.update_layout(margin={"r":0, "t":0, "l":0, "b":0})
+    # uirevision fijo: al recargar los puntos de la zona visible el mapa no vuelve a centrarse
+    fig.update_layout(margin={"r":0, "t":0, "l":0, "b":0}, uirevision='mapa')
     return fig
 
-def crear_grafico(tipo_grafico, df, variable_analisis='weed_applied'):
-    if tipo_grafico == 'speed':
-        df = df.copy()
-        df.loc[:, 'rango'] = pd.cut(df['speed'], bins=[0, 5, 10, 15, 20, 25], 
-                                labels=["0-5", "5-10", "10-15", "15-20", "20-25"], right=False)
-        titulo = f"Por velocidad de avance (km/h)"
-        etiqueta_x = "Rango de velocidad"
-
-    elif tipo_grafico == 'sensitivity':
-        df = df.dropna(subset=['sensitivity']).copy()
-        df.loc[:, 'rango'] = df['sensitivity'].astype(int).astype(str)
-        titulo = f"Por sensibilidad (1-3)"
-        etiqueta_x = "Nivel de sensibilidad"
-
-
-    elif tipo_grafico == 'size':
-        df = df.copy()
-        df.loc[:, 'rango'] = pd.cut(df['size'], 
-                                bins=[0, 3.5, 5.5, 7.5, 9.5, 15.5, 20.5, 25.5, float('inf')], 
-                                labels=["3", "5", "7", "9", "15", "20", "25", ">25"], 
-                                right=False)
-        titulo = f"Por tamaño de maleza (cm)"
-        etiqueta_x = "Rango de tamaño"
-        # Asegurar el orden correcto
-        orden_tamano = ["3", "5", "7", "9", "15", "20", "25", ">25"]
-        df.loc[:, 'rango'] = pd.Categorical(df['rango'], categories=orden_tamano, ordered=True)
-
+# Título y etiqueta del eje x de cada gráfico
+TITULOS = {
+    'speed': ("Por velocidad de avance (km/h)", "Rango de velocidad"),
+    'sensitivity': ("Por sensibilidad (1-3)", "Nivel de sensibilidad"),
+    'size': ("Por tamaño de maleza (cm)", "Rango de tamaño"),
+    'weed_placement': ("Por ubicación de maleza", "Ubicación"),
+    'tile': ("Por baldosa (1-3)", "Nivel de baldosa"),
+    'wind_speed': ("Por velocidad del viento (km/h)", "Rango de velocidad"),
+    'weed_type': ("Por tipo de maleza", "Tipo de maleza"),
+    'weed_name': ("Por nombre de maleza", "Nombre de maleza"),
+    'crop_specie': ("Por especie de cultivo", "Especie de cultivo"),
+    'weed_diameter': ("Por diámetro de maleza (cm)", "Rango de diámetro"),
+}
+
+# Gráficos por categoría que muestran siempre los mismos niveles (los que faltan en 0)
+NIVELES_COMPLETOS = {
+    'sensitivity': ['1', '2', '3'],
+    'tile': ['1', '2', '3'],
+    'weed_type': ['HA', 'G'],
+    'weed_placement': ['ROW', 'FURROW'],
+}
 
-    elif tipo_grafico == 'weed_placement':
-        df = df.dropna(subset=['weed_placement']).copy() 
-        df.loc[:, 'rango'] = df['weed_placement'].astype(str) 
-        titulo = f"Por ubicación de maleza"
-        etiqueta_x = "Ubicación"
-
-    elif tipo_grafico == 'tile':
-        df = df.dropna(subset=['tile']).copy()
-        df.loc[:, 'rango'] = df['tile'].astype(int).astype(str)
-        titulo = f"Por baldosa (1-3)"
-        etiqueta_x = "Nivel de baldosa"
-
-    elif tipo_grafico == 'wind_speed':
-        df = df.copy()
-        df.loc[:, 'rango'] = pd.cut(df['wind_speed'], bins=[0, 5, 10, 15, 20, 25], 
-                                  labels=["0-5", "5-10", "10-15", "15-20", "20-25"], right=False) 
-        titulo = f"Por velocidad del viento (km/h)"
-        etiqueta_x = "Rango de velocidad"
-
-    elif tipo_grafico == 'weed_type':
-        df = df.dropna(subset=['weed_type']).copy()  
-        df.loc[:, 'rango'] = df['weed_type'].astype(str)
-        titulo = f"Por tipo de maleza"
-        etiqueta_x = "Tipo de maleza"
-
-    elif tipo_grafico == 'weed_name':
-        df = df.dropna(subset=['weed_name']).copy()
-        df.loc[:, 'rango'] = df['weed_name'].astype(str)
-        titulo = f"Por nombre de maleza"
-        etiqueta_x = "Nombre de maleza"
-        
-    elif tipo_grafico == 'crop_specie':
-        df = df.dropna(subset=['crop_specie']).copy()
-        df.loc[:, 'rango'] = df['crop_specie'].astype(str)
-        titulo = f"Por especie de cultivo"
-        etiqueta_x = "Especie de cultivo"
-
-    elif tipo_grafico == 'weed_diameter':
+def crear_grafico(tipo_grafico, df, variable_analisis='weed_applied'):
+    if tipo_grafico in RANGOS_GRAFICOS:
+        bordes, etiquetas = RANGOS_GRAFICOS[tipo_grafico]
         df = df.copy()
-        df.loc[:, 'rango'] = pd.cut(df['weed_diameter'], 
-                                bins=[0, 15, 30, float('inf')], 
-                                labels=["0-15", "15-30", ">=30"], 
-                                right=False)
-        titulo = f"Por diámetro de maleza (cm)"
-        etiqueta_x = "Rango de diámetro"
-        # Asegurar el orden correcto
-        orden_diameter = ["0-15", "15-30", ">=30"]
-        df.loc[:, 'rango'] = pd.Categorical(df['rango'], categories=orden_diameter, ordered=True)
+        df.loc[:, 'rango'] = pd.cut(df[tipo_grafico], bins=bordes, labels=etiquetas, right=False)
+    else:
+        df = df.dropna(subset=[tipo_grafico]).copy()
+        rango = df[tipo_grafico]
+        if tipo_grafico in ('sensitivity', 'tile'):
+            rango = rango.astype(int)
+        df.loc[:, 'rango'] = rango.astype(str)
 
     df = df.dropna(subset=['rango', variable_analisis]).copy()
 
@@ -101,21 +60,31 @@ def crear_grafico(tipo_grafico, df, variable_analisis='weed_applied'):
         metricas = df.groupby('rango', observed=False)[variable_analisis].mean()
     
     counts = df.groupby('rango', observed=False).size()
-    
-    if tipo_grafico == 'sensitivity':
-        niveles_completos = ['1', '2', '3']
-        metricas = metricas.reindex(niveles_completos, fill_value=0)
-        counts = counts.reindex(niveles_completos, fill_value=0)
-    elif tipo_grafico == 'weed_type':
-        niveles_completos = ['HA', 'G']
-        metricas = metricas.reindex(niveles_completos, fill_value=0)
-        counts = counts.reindex(niveles_completos, fill_value=0)
-    elif tipo_grafico == 'tile':
-        niveles_completos = ['1', '2', '3']
-        metricas = metricas.reindex(niveles_completos, fill_value=0)
-        counts = counts.reindex(niveles_completos, fill_value=0)
-    elif tipo_grafico == 'weed_placement':
-        niveles_completos = ['ROW', 'FURROW']
+
+    return _crear_figura(tipo_grafico, metricas, counts, variable_analisis)
+
+def crear_grafico_agregado(tipo_grafico, agregados):
+    """
+    Mismo gráfico que crear_grafico('...', df) para weed_applied, a partir de las
+    agregaciones ya calculadas en SQL (ver database.obtener_agregados).
+    """
+    agregados = agregados.set_index('rango')
+    metricas = agregados['media'] * 100
+    counts = agregados['count']
+
+    # Como pd.cut con observed=False: los rangos sin malezas aparecen vacíos
+    if tipo_grafico in RANGOS_GRAFICOS:
+        etiquetas = RANGOS_GRAFICOS[tipo_grafico][1]
+        metricas = metricas.reindex(etiquetas)
+        counts = counts.reindex(etiquetas, fill_value=0)
+
+    return _crear_figura(tipo_grafico, metricas, counts, 'weed_applied')
+
+def _crear_figura(tipo_grafico, metricas, counts, variable_analisis):
+    titulo, etiqueta_x = TITULOS[tipo_grafico]
+
+    if tipo_grafico in NIVELES_COMPLETOS:
+        niveles_completos = NIVELES_COMPLETOS[tipo_grafico]
         metricas = metricas.reindex(niveles_completos, fill_value=0)
         counts = counts.reindex(niveles_completos, fill_value=0)
     
@@ -125,21 +94,9 @@ def crear_grafico(tipo_grafico, df, variable_analisis='weed_applied'):
         'count': counts.values
     })
 
-    if tipo_grafico == 'size':
-        orden_tamano = ["3", "5", "7", "9", "15", "20", "25", ">25"]
-        plot_data['rango'] = pd.Categorical(plot_data['rango'], categories=orden_tamano, ordered=True)
-        plot_data = plot_data.sort_values('rango')
-    elif tipo_grafico == 'speed':
-        orden_speed = ["0-5", "5-10", "10-15", "15-20", "20-25"]
-        plot_data['rango'] = pd.Categorical(plot_data['rango'], categories=orden_speed, ordered=True)
-        plot_data = plot_data.sort_values('rango')
-    elif tipo_grafico == 'wind_speed':
-        orden_wind = ["0-5", "5-10", "10-15", "15-20", "20-25"]
-        plot_data['rango'] = pd.Categorical(plot_data['rango'], categories=orden_wind, ordered=True)
-        plot_data = plot_data.sort_values('rango')
-    elif tipo_grafico == 'weed_diameter':
-        orden_diameter = ["0-15", "15-30", ">=30"]
-        plot_data['rango'] = pd.Categorical(plot_data['rango'], categories=orden_diameter, ordered=True)
+    if tipo_grafico in RANGOS_GRAFICOS:
+        orden = RANGOS_GRAFICOS[tipo_grafico][1]
+        plot_data['rango'] = pd.Categorical(plot_data['rango'], categories=orden, ordered=True)
         plot_data = plot_data.sort_values('rango')
     
     fig = go.Figure()
@@ -3,44 +3,38 @@ from dash import Dash, html, dash_table, dcc, callback, Input, Output, State, no
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import sqlite3
+from ensayos_db import obtener_conexion, asegurar_esquema
 from datetime import datetime
 
 # Función para obtener datos de malezas
 def obtener_datos_malezas():
-    conn = sqlite3.connect("ensayos.db")
+    conn = obtener_conexion("ensayos.db")
+    asegurar_esquema("ensayos.db")
+    # malezas_flat se mantiene con triggers: evita el LEFT JOIN de 8 tablas en cada carga
     query = """
     SELECT 
-        r.ensayo_id,
-        r.uploader,
-        r.weed_diameter,
-        r.size,
-        r.height,
-        r.weed_placement,
-        r.weed_type,
-        r.weed_name,
-        r.weed_applied,
-        p.speed,
-        m.sens AS sensitivity,
-        m.tile,
-        c.crop_specie,
-        ca.wind_speed,
-        e.test_date AS fecha_ensayo,
-        cli.name AS cliente,
-        cli.modules_id,
-        u.farm
-    FROM resultados_malezas r
-    LEFT JOIN ensayos e ON r.ensayo_id = e.ensayo_id
-    LEFT JOIN clientes cli ON e.cliente_id = cli.cliente_id
-    LEFT JOIN ubicacion u ON e.ensayo_id = u.ensayo_id
-    LEFT JOIN pulverizadora p ON e.ensayo_id = p.ensayo_id
-    LEFT JOIN modelo_deteccion m ON e.ensayo_id = m.ensayo_id
-    LEFT JOIN condiciones_ambientales ca ON e.ensayo_id = ca.ensayo_id
-    LEFT JOIN cultivo c ON e.ensayo_id = c.ensayo_id
-    WHERE r.weed_applied IS NOT NULL
+        ensayo_id,
+        uploader,
+        weed_diameter,
+        size,
+        height,
+        weed_placement,
+        weed_type,
+        weed_name,
+        weed_applied,
+        speed,
+        sensitivity,
+        tile,
+        crop_specie,
+        wind_speed,
+        fecha_ensayo,
+        cliente,
+        modules_id,
+        farm
+    FROM malezas_flat
+    WHERE weed_applied IS NOT NULL
     """
     df = pd.read_sql_query(query, conn)
-    conn.close()
 
     # Convertir 0 en 'size' a NaN (vacío)
     df['size'] = df['size'].replace(0, float('nan'))
@@ -48,7 +42,7 @@ def obtener_datos_malezas():
 
 # Función para obtener datos del mapa
 def obtener_datos_mapa():
-    conn = sqlite3.connect("ensayos.db")
+    conn = obtener_conexion("ensayos.db")
     query = """
         SELECT 
             u.latitude, 
@@ -60,45 +54,32 @@ def obtener_datos_mapa():
         LEFT JOIN clientes c ON e.cliente_id = c.cliente_id
     """
     df = pd.read_sql_query(query, conn)
-    conn.close()
     return df
 
 # Función para obtener datos de aplicación
 def obtener_datos_aplico():
-    conn = sqlite3.connect("ensayos.db")
+    conn = obtener_conexion("ensayos.db")
+    asegurar_esquema("ensayos.db")
+    # resultados_malezas guarda ids de diccionario: los textos salen de malezas_flat
     query = """
                 SELECT 
-                    p.speed,
-                    m.sens AS sensitivity,
-                    m.tile,
-                    r.weed_applied,
-                    r.weed_diameter,
-                    r.size,
-                    r.weed_placement,
-                    r.weed_name,
-                    r.weed_type,
-                    c.crop_specie,
-                    ca.wind_speed
-                FROM pulverizadora p
-                JOIN ensayos e ON p.ensayo_id = e.ensayo_id
-                JOIN resultados_malezas r ON e.ensayo_id = r.ensayo_id
-                LEFT JOIN modelo_deteccion m ON e.ensayo_id = m.ensayo_id
-                LEFT JOIN condiciones_ambientales ca ON e.ensayo_id = ca.ensayo_id
-                LEFT JOIN cultivo c ON e.ensayo_id = c.ensayo_id
-                WHERE r.weed_applied IS NOT NULL 
-                AND (p.speed IS NOT NULL OR m.sens IS NOT NULL)
+                    speed,
+                    sensitivity,
+                    tile,
+                    weed_applied,
+                    weed_diameter,
+                    size,
+                    weed_placement,
+                    weed_name,
+                    weed_type,
+                    crop_specie,
+                    wind_speed
+                FROM malezas_flat
+                WHERE weed_applied IS NOT NULL 
+                AND (speed IS NOT NULL OR sensitivity IS NOT NULL)
     """
+    # sensitivity y tile ya vienen como enteros 1-3 (tablas STRICT con CHECK)
     df = pd.read_sql_query(query, conn)
-    conn.close()
-    
-    # Convertir sensibilidad a entero y filtrar solo valores 1, 2, 3
-    df = df.copy()
-    df.loc[:, 'sensitivity'] = pd.to_numeric(df['sensitivity'], errors='coerce')
-    df = df.loc[df['sensitivity'].isin([1, 2, 3]) | df['sensitivity'].isna()]
-
-    if 'tile' in df.columns:
-        df.loc[:, 'tile'] = pd.to_numeric(df['tile'], errors='coerce')
-        df = df.loc[df['tile'].isin([1, 2, 3]) | df['tile'].isna()]
 
     # Convertir 0 en 'size' a NaN (vacío)
     df['size'] = df['size'].replace(0, float('nan'))
@@ -0,0 +1,19 @@
+# Acceso compartido a ensayos.db para la app Streamlit y el dashboard Dash
+from .conexion import DB_PATH, obtener_conexion, abrir_conexion, transaccion, cerrar_conexiones
+from .esquema import crear_tablas
+from .migraciones import migrar, asegurar_esquema, VERSION_ESQUEMA
+from .cambios import SenalCambios, senal_cambios
+from .malezas import insertar_malezas, insertar_malezas_en_bloques
+from .clientes import obtener_cliente_id, olvidar_clientes
+from .diccionarios import DICCIONARIOS
+from .cubo import tramos_en_rango
+from .busqueda import buscar_ensayos, buscar_especies
+from .espacial import ensayos_en_caja, ensayos_cercanos
+from .borrado import borrar_ensayos, contar_ensayos, vaciar_base
+from .archivo import archivar, adjuntar_archivo, fuente, vaciar_todo
+from .instantanea import (publicador_instantanea, senal_instantanea, obtener_instantanea,
+                          ruta_instantanea)
+from .respaldo import respaldar, verificar_respaldo
+from .envios import huella_planilla, huella_envio, ensayo_por_huella
+from .escritura import ColaEscritura, cola_escritura
+from .explorador import columnas_tabla, pagina_tabla, contar_filas, OPERADORES_FILTRO, FILAS_POR_PAGINA
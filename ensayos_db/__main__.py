@@ -0,0 +1,164 @@
+# Comandos de mantenimiento de ensayos.db
+#
+# Uso (desde la raíz del repo):
+#     python -m ensayos_db migrar [--db ruta]
+#     python -m ensayos_db planes [--db ruta]
+#     python -m ensayos_db reconstruir-flat [--db ruta]
+#     python -m ensayos_db verificar-flat [--db ruta]
+#     python -m ensayos_db reconstruir-cubo [--db ruta]
+#     python -m ensayos_db verificar-cubo [--db ruta]
+#     python -m ensayos_db reconstruir-busqueda [--db ruta]
+#     python -m ensayos_db verificar-busqueda [--db ruta]
+#     python -m ensayos_db archivar --antes-de AAAA-MM-DD [--db ruta]
+#     python -m ensayos_db publicar-instantanea [--db ruta]
+#     python -m ensayos_db respaldar [--carpeta dir] [--conservar N] [--db ruta]
+import argparse
+import sys
+
+from . import archivo, busqueda, cubo, hechos, instantanea, respaldo
+from .conexion import DB_PATH, abrir_conexion
+from .migraciones import migrar, version_actual
+from .planes import verificar_planes
+
+
+def comando_migrar(conn, args):
+    antes = version_actual(conn)
+    aplicadas = migrar(conn)
+    print(f"{args.db}: versión {antes} -> {version_actual(conn)} (aplicadas: {aplicadas or 'ninguna'})")
+    return 0
+
+
+def comando_planes(conn, args):
+    fallidas = 0
+    for nombre, indices, usa_indices, plan in verificar_planes(conn):
+        estado = "OK   " if usa_indices else "FALTA"
+        print(f"[{estado}] {nombre}: espera {', '.join(indices)}")
+        for linea in plan:
+            print(f"          {linea}")
+        fallidas += not usa_indices
+    return 1 if fallidas else 0
+
+
+def comando_reconstruir_flat(conn, args):
+    migrar(conn)
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        filas = hechos.reconstruir(conn)
+    print(f"malezas_flat reconstruida: {filas} filas")
+    return 0
+
+
+def comando_verificar_flat(conn, args):
+    faltantes, sobrantes = hechos.verificar(conn)
+    if faltantes or sobrantes:
+        print(f"malezas_flat inconsistente: {faltantes} filas faltan o difieren, {sobrantes} sobran "
+              f"(corregir con: python -m ensayos_db reconstruir-flat)")
+        return 1
+    print("malezas_flat consistente con las tablas normalizadas")
+    return 0
+
+
+def comando_reconstruir_cubo(conn, args):
+    migrar(conn)
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        filas = cubo.reconstruir(conn)
+    print(f"malezas_cubo reconstruido: {filas} filas")
+    return 0
+
+
+def comando_verificar_cubo(conn, args):
+    faltantes, sobrantes = cubo.verificar(conn)
+    if faltantes or sobrantes:
+        print(f"malezas_cubo inconsistente: {faltantes} filas faltan o difieren, {sobrantes} sobran "
+              f"(corregir con: python -m ensayos_db reconstruir-cubo)")
+        return 1
+    print("malezas_cubo consistente con malezas_flat")
+    return 0
+
+
+def comando_reconstruir_busqueda(conn, args):
+    migrar(conn)
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        ensayos = busqueda.reconstruir(conn)
+    print(f"índices de búsqueda reconstruidos: {ensayos} ensayos")
+    return 0
+
+
+def comando_verificar_busqueda(conn, args):
+    faltantes, sobrantes = busqueda.verificar(conn)
+    if faltantes or sobrantes:
+        print(f"busqueda_ensayos inconsistente: {faltantes} documentos faltan o difieren, {sobrantes} sobran "
+              f"(corregir con: python -m ensayos_db reconstruir-busqueda)")
+        return 1
+    print("busqueda_ensayos consistente con las tablas de los ensayos")
+    return 0
+
+
+def comando_archivar(conn, args):
+    migrar(conn)
+    cantidad = archivo.archivar(conn, args.antes_de)
+    print(f"{cantidad} ensayos anteriores a {args.antes_de} movidos a {archivo.ruta_archivo(conn)}")
+    return 0
+
+
+def comando_publicar_instantanea(conn, args):
+    destino = instantanea.PublicadorInstantanea(args.db).publicar()
+    print(f"instantánea de {args.db} publicada en {destino}")
+    return 0
+
+
+def comando_respaldar(conn, args):
+    esquemas = ["main"] + ([archivo.ESQUEMA] if archivo.adjuntar_archivo(conn) else [])
+    for esquema in esquemas:
+        ruta, rotados = respaldo.respaldar(conn, args.carpeta, esquema, args.conservar)
+        print(f"respaldo verificado: {ruta} ({len(rotados)} respaldos viejos borrados)")
+    return 0
+
+
+COMANDOS = {
+    "migrar": (comando_migrar, "aplica las migraciones pendientes"),
+    "planes": (comando_planes, "verifica con EXPLAIN QUERY PLAN que las consultas usen los índices"),
+    "reconstruir-flat": (comando_reconstruir_flat, "vuelve a llenar malezas_flat desde las tablas normalizadas"),
+    "verificar-flat": (comando_verificar_flat, "compara malezas_flat con el join de las tablas normalizadas"),
+    "reconstruir-cubo": (comando_reconstruir_cubo, "vuelve a llenar malezas_cubo desde malezas_flat"),
+    "verificar-cubo": (comando_verificar_cubo, "compara malezas_cubo con malezas_flat agrupada"),
+    "reconstruir-busqueda": (comando_reconstruir_busqueda, "vuelve a armar los índices FTS5 de ensayos y especies"),
+    "verificar-busqueda": (comando_verificar_busqueda, "compara busqueda_ensayos con los datos de cada ensayo"),
+    "archivar": (comando_archivar, "mueve los ensayos anteriores a una fecha al archivo <db>_archivo.db"),
+    "publicar-instantanea": (comando_publicar_instantanea,
+                             "publica la copia de solo lectura <db>_instantanea.db que lee el dashboard"),
+    "respaldar": (comando_respaldar, "respalda en caliente la base (y su archivo) y rota los respaldos viejos"),
+}
+
+# Argumentos propios de cada comando, además de --db
+ARGUMENTOS = {
+    "archivar": [("--antes-de", {"required": True, "help": "fecha de corte AAAA-MM-DD (exclusiva)"})],
+    "respaldar": [
+        ("--carpeta", {"help": "carpeta de los respaldos (por defecto respaldos/ junto a la base)"}),
+        ("--conservar", {"type": int, "default": respaldo.RESPALDOS_A_CONSERVAR,
+                         "help": "cantidad de respaldos a conservar (por defecto %(default)s)"}),
+    ],
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ensayos_db")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+    for nombre, (_, ayuda) in COMANDOS.items():
+        sub = subparsers.add_parser(nombre, help=ayuda)
+        sub.add_argument("--db", default=DB_PATH, help="archivo de la base (por defecto %(default)s)")
+        for argumento, opciones in ARGUMENTOS.get(nombre, []):
+            sub.add_argument(argumento, **opciones)
+    args = parser.parse_args(argv)
+
+    conn = abrir_conexion(args.db)
+    try:
+        return COMANDOS[args.comando][0](conn, args)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
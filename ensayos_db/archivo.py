@@ -0,0 +1,149 @@
+# Archivo de ensayos viejos en un segundo archivo (base caliente / base fría)
+#
+# Los ensayos con test_date anterior a un corte se mueven a ensayos_archivo.db
+# (junto a la base principal). El archivo es una base más, migrada con las
+# mismas migraciones: al copiarle las filas sus propios triggers arman su
+# malezas_flat y su malezas_cubo. Las consultas leen solo la base caliente salvo
+# que pidan incluir el archivo, que entonces se adjunta con ATTACH.
+import os
+import sqlite3
+from datetime import date
+
+from .borrado import CASCADA, borrar_ensayos, vaciar_base
+from .conexion import abrir_conexion
+from .diccionarios import DICCIONARIOS
+from .migraciones import migrar
+
+ESQUEMA = "archivo"
+
+
+def archivo_de(ruta):
+    """Archivo de la base fría de la base `ruta`: <base>_archivo.db en la misma carpeta."""
+    return os.path.splitext(ruta)[0] + "_archivo.db"
+
+
+def ruta_archivo(conn):
+    """Archivo de la base fría de `conn`."""
+    return archivo_de(conn.execute("PRAGMA database_list").fetchone()[2])
+
+
+def adjuntar_archivo(conn, ruta=None):
+    """
+    Adjunta el archivo a `conn` como el esquema 'archivo' (una vez por conexión).
+    Devuelve False si todavía no se archivó nada: no se crea un archivo vacío.
+    """
+    if any(fila[1] == ESQUEMA for fila in conn.execute("PRAGMA database_list")):
+        return True
+    ruta = ruta or ruta_archivo(conn)
+    if not os.path.exists(ruta):
+        return False
+    # Un archivo de una versión anterior se migra antes: fuente() une sus tablas con las de la base
+    archivo = abrir_conexion(ruta)
+    try:
+        migrar(archivo)
+    finally:
+        archivo.close()
+    conn.execute(f"ATTACH DATABASE ? AS {ESQUEMA}", (ruta,))
+    return True
+
+
+def fuente(conn, tabla, incluir_archivo=False):
+    """
+    Expresión para el FROM de `tabla`: solo la base caliente o, con incluir_archivo,
+    la unión con la misma tabla del archivo.
+    """
+    if incluir_archivo and adjuntar_archivo(conn):
+        return f"(SELECT * FROM main.{tabla} UNION ALL SELECT * FROM {ESQUEMA}.{tabla})"
+    return tabla
+
+
+def archivar(conn, antes_de, ruta=None):
+    """
+    Mueve al archivo los ensayos con test_date anterior a `antes_de` (fecha ISO),
+    con todos sus datos, en una sola transacción que confirma. ATTACH no puede ir
+    dentro de una transacción: `conn` no debe tener una abierta.
+
+    Returns:
+        int: cantidad de ensayos archivados
+    """
+    # Una fecha mal escrita compararía como texto y podría archivar todo
+    antes_de = date.fromisoformat(str(antes_de)).isoformat()
+    ruta = ruta or ruta_archivo(conn)
+    archivo = abrir_conexion(ruta)
+    try:
+        migrar(archivo)
+    finally:
+        archivo.close()
+    adjuntar_archivo(conn, ruta)
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("""
+            CREATE TEMP TABLE ensayos_a_archivar AS
+            SELECT ensayo_id FROM main.ensayos WHERE test_date < ?
+        """, (antes_de,))
+        # Los ids de los diccionarios son los mismos en ambas bases
+        for tabla in DICCIONARIOS.values():
+            conn.execute(f"INSERT OR IGNORE INTO {ESQUEMA}.{tabla} SELECT * FROM main.{tabla}")
+        conn.execute(f"""
+            INSERT INTO {ESQUEMA}.clientes (cliente_id, name, sprai_id, modules_id)
+            SELECT cliente_id, name, sprai_id, modules_id FROM main.clientes
+            WHERE cliente_id IN (
+                SELECT cliente_id FROM main.ensayos
+                WHERE ensayo_id IN (SELECT ensayo_id FROM ensayos_a_archivar)
+            )
+            ON CONFLICT DO NOTHING
+        """)
+        # El cliente se busca por identidad: el archivo puede tenerlo con un id anterior.
+        # Los ensayos y sus tablas se copian con INSERT sin OR IGNORE: después se
+        # borran de la base, y una fila que no se copió se perdería. Un conflicto
+        # aborta el archivado entero
+        copiados = conn.execute(f"""
+            INSERT INTO {ESQUEMA}.ensayos (ensayo_id, cliente_id, test_date, test_time)
+            SELECT e.ensayo_id, a.cliente_id, e.test_date, e.test_time
+            FROM main.ensayos e
+            LEFT JOIN main.clientes c ON e.cliente_id = c.cliente_id
+            LEFT JOIN {ESQUEMA}.clientes a
+                ON c.cliente_id IS NOT NULL
+                AND a.name IS c.name AND a.sprai_id IS c.sprai_id AND a.modules_id IS c.modules_id
+            WHERE e.ensayo_id IN (SELECT ensayo_id FROM ensayos_a_archivar)
+        """).rowcount
+        # resultados_malezas va última: sus triggers en el archivo leen las demás tablas
+        for tabla in CASCADA:
+            if tabla == "ensayos":
+                continue
+            conn.execute(f"""
+                INSERT INTO {ESQUEMA}.{tabla} SELECT * FROM main.{tabla}
+                WHERE ensayo_id IN (SELECT ensayo_id FROM ensayos_a_archivar)
+            """)
+        pendientes = conn.execute("SELECT COUNT(*) FROM ensayos_a_archivar").fetchone()[0]
+        if copiados != pendientes:
+            raise sqlite3.IntegrityError(
+                f"se copiaron {copiados} de {pendientes} ensayos al archivo: no se borra ninguno"
+            )
+        conn.execute("DROP TABLE ensayos_a_archivar")
+
+        archivados, _ = borrar_ensayos(conn, antes_de=antes_de)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return archivados
+
+
+def vaciar_todo(conn):
+    """
+    vaciar_base en el archivo y en la base: borra todos los ensayos, también los
+    archivados. El archivo se vacía y confirma con su propia conexión; la base
+    queda sin confirmar, como con vaciar_base. Debe correr solo, no en una tanda.
+    """
+    ruta = ruta_archivo(conn)
+    if os.path.exists(ruta):
+        archivo = abrir_conexion(ruta)
+        try:
+            migrar(archivo)
+            vaciar_base(archivo)
+            archivo.commit()
+        finally:
+            archivo.close()
+    vaciar_base(conn)
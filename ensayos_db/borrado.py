@@ -0,0 +1,119 @@
+# Borrado de ensayos con ON DELETE CASCADE
+#
+# Las tablas hijas de ensayos (y ensayos respecto de clientes) declaran sus
+# claves foráneas con ON DELETE CASCADE y las conexiones las hacen cumplir
+# (PRAGMA foreign_keys, ver conexion.py). Borrar un ensayo, una temporada o un
+# cliente es un solo DELETE sobre ensayos: SQLite quita las filas de las tablas
+# hijas y los triggers de malezas_flat y malezas_cubo las sacan de los agregados.
+import sqlite3
+
+from . import busqueda, cubo, estricto, hechos
+from .clientes import olvidar_clientes
+from .esquema import TABLAS
+
+# tabla -> columnas cuya clave foránea borra en cascada
+CASCADA = {tabla: ("ensayo_id",) for tabla in TABLAS if tabla not in ("clientes", "ensayos")}
+CASCADA["ensayos"] = ("cliente_id",)
+
+
+def activar_cascada(conn):
+    """
+    Reconstruye las tablas de CASCADA con ON DELETE CASCADE (las claves foráneas
+    tienen que estar desactivadas, como en migrar). Las filas hijas de ensayos que
+    ya no existen se borran y los ensayos de clientes inexistentes quedan sin cliente,
+    así la base cumple las claves foráneas antes de empezar a exigirlas.
+    """
+    for nombre in [*hechos.TRIGGERS, *cubo.TRIGGERS]:
+        conn.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+    for tabla, columnas in CASCADA.items():
+        estricto.reemplazar_tabla(
+            conn, tabla, estricto.definicion_estricta(conn, tabla, f"{tabla}_nueva", en_cascada=columnas)
+        )
+
+    for tabla in CASCADA:
+        if tabla == "ensayos":
+            continue
+        conn.execute(f"DELETE FROM {tabla} WHERE ensayo_id NOT IN (SELECT ensayo_id FROM ensayos)")
+    conn.execute("""
+        UPDATE ensayos SET cliente_id = NULL
+        WHERE cliente_id NOT IN (SELECT cliente_id FROM clientes)
+    """)
+    if conn.execute("PRAGMA foreign_key_check").fetchone():
+        raise sqlite3.IntegrityError("quedan filas que no cumplen las claves foráneas")
+
+    hechos.reconstruir(conn)
+    cubo.reconstruir(conn)
+
+
+def _condicion(ensayo_id=None, desde=None, hasta=None, cliente_id=None, modulo=None, antes_de=None):
+    condiciones = []
+    params = []
+    if ensayo_id is not None:
+        condiciones.append("ensayo_id = ?")
+        params.append(ensayo_id)
+    if desde is not None:
+        condiciones.append("test_date >= ?")
+        params.append(desde)
+    if hasta is not None:
+        condiciones.append("test_date <= ?")
+        params.append(hasta)
+    if antes_de is not None:
+        condiciones.append("test_date < ?")
+        params.append(antes_de)
+    if cliente_id is not None:
+        condiciones.append("cliente_id = ?")
+        params.append(cliente_id)
+    if modulo is not None:
+        condiciones.append("cliente_id IN (SELECT cliente_id FROM clientes WHERE modules_id = ?)")
+        params.append(modulo)
+    if not condiciones:
+        # Sin criterios se borraría todo: para eso está vaciar_base
+        raise ValueError("indicar al menos un criterio (ensayo, fechas, cliente o módulo)")
+    return " AND ".join(condiciones), params
+
+
+def contar_ensayos(conn, **criterios):
+    """Cantidad de ensayos que borraría borrar_ensayos con los mismos criterios."""
+    condicion, params = _condicion(**criterios)
+    return conn.execute(f"SELECT COUNT(*) FROM ensayos WHERE {condicion}", params).fetchone()[0]
+
+
+def borrar_ensayos(conn, ensayo_id=None, desde=None, hasta=None, cliente_id=None, modulo=None,
+                   antes_de=None):
+    """
+    Borra los ensayos que cumplen todos los criterios dados (fechas ISO; desde y
+    hasta inclusive, antes_de exclusiva) con todos sus datos, y los clientes que quedan sin ensayos. Corre dentro de la
+    transacción del llamador: no confirma. Si borra clientes vacía el caché de
+    clientes ahí mismo, así ningún envío posterior reutiliza un cliente_id borrado.
+
+    Returns:
+        tuple: (ensayos borrados, clientes borrados)
+    """
+    condicion, params = _condicion(ensayo_id, desde, hasta, cliente_id, modulo, antes_de)
+    borrados = conn.execute(f"DELETE FROM ensayos WHERE {condicion} RETURNING cliente_id", params).fetchall()
+    clientes = 0
+    for cliente in {fila[0] for fila in borrados} - {None}:
+        clientes += conn.execute("""
+            DELETE FROM clientes
+            WHERE cliente_id = ? AND NOT EXISTS (SELECT 1 FROM ensayos WHERE cliente_id = ?)
+        """, (cliente, cliente)).rowcount
+    if clientes:
+        olvidar_clientes()
+    return len(borrados), clientes
+
+
+def vaciar_base(conn):
+    """
+    Borra todos los ensayos y clientes. En lugar de dejar que los triggers quiten
+    cada maleza de malezas_flat y malezas_cubo (y cada documento de la búsqueda),
+    los quita y vacía las tablas de una vez (los diccionarios y las secuencias se
+    conservan). No confirma; vacía el caché de clientes.
+    """
+    for nombre in [*hechos.TRIGGERS, *cubo.TRIGGERS, *busqueda.TRIGGERS]:
+        conn.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+    for tabla in [busqueda.TABLA_ENSAYOS, "malezas_cubo", "malezas_flat", *CASCADA, "clientes"]:
+        conn.execute(f"DELETE FROM {tabla}")
+    hechos.crear_estructura(conn)
+    cubo.crear_estructura(conn)
+    busqueda.crear_estructura(conn)
+    olvidar_clientes()
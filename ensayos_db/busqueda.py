@@ -0,0 +1,222 @@
+# Búsqueda de texto completo (FTS5) de ensayos y especies de malezas
+#
+# busqueda_ensayos tiene un documento por ensayo (rowid = ensayo_id) con el
+# cliente, la finca, el lote, los técnicos, el herbicida y los nombres de las
+# malezas del ensayo. Los triggers rearman el documento de un ensayo cuando
+# cambia cualquiera de esas tablas. Los nombres de maleza se toman de
+# malezas_flat (todas las malezas, también las que no tienen weed_applied, que
+# malezas_cubo no cuenta) y el documento se rearma solo cuando llega la primera
+# maleza de una especie al ensayo o se va la última: el índice de malezas_flat
+# por (ensayo_id, weed_name_id) hace barata esa pregunta, así un envío rearma el
+# documento una vez por especie y no una vez por maleza.
+#
+# busqueda_especies indexa el diccionario nombres_maleza (contenido externo:
+# FTS5 lee los textos de la tabla del diccionario).
+#
+# Las búsquedas no distinguen mayúsculas ni acentos y cada palabra vale como
+# prefijo: "amar ju" encuentra los ensayos de Juan con Amaranthus.
+from .diccionarios import DICCIONARIOS
+
+TABLA_ENSAYOS = "busqueda_ensayos"
+TABLA_ESPECIES = "busqueda_especies"
+
+# columna del documento -> expresión sobre los alias de SELECT_DOCUMENTO
+CAMPOS = {
+    "cliente": "c.name",
+    "farm": "u.farm",
+    "field_location": "u.field_location",
+    "trial_testers": "p.trial_testers",
+    "herbicide": "h.herbicide",
+    "weed_name": """(
+        SELECT group_concat(n.valor, ' ')
+        FROM (SELECT DISTINCT weed_name_id FROM malezas_flat WHERE ensayo_id = e.ensayo_id) k
+        JOIN nombres_maleza n ON n.id = k.weed_name_id
+    )""",
+}
+
+# Prefijos de 2 y 3 letras indexados: la búsqueda mientras se escribe no recorre todo el índice
+OPCIONES_FTS = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'"
+
+SQL_TABLAS = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_ENSAYOS} USING fts5({', '.join(CAMPOS)}, {OPCIONES_FTS})",
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_ESPECIES} USING fts5(
+        valor, content = '{DICCIONARIOS['weed_name']}', content_rowid = 'id', {OPCIONES_FTS}
+    )""",
+]
+
+SELECT_DOCUMENTO = f"""
+    SELECT e.ensayo_id, {', '.join(CAMPOS.values())}
+    FROM ensayos e
+    LEFT JOIN clientes c ON e.cliente_id = c.cliente_id
+    LEFT JOIN ubicacion u ON e.ensayo_id = u.ensayo_id
+    LEFT JOIN personal p ON e.ensayo_id = p.ensayo_id
+    LEFT JOIN herbicida h ON e.ensayo_id = h.ensayo_id
+"""
+
+
+def _rearmar(condicion):
+    # Documento de los ensayos que cumplen `condicion` (sobre e): se borra y se vuelve a insertar
+    return f"""
+        DELETE FROM {TABLA_ENSAYOS} WHERE rowid IN (SELECT e.ensayo_id FROM ensayos e WHERE {condicion});
+        INSERT INTO {TABLA_ENSAYOS} (rowid, {', '.join(CAMPOS)}) {SELECT_DOCUMENTO} WHERE {condicion};"""
+
+
+def _quitar(ensayo_id):
+    return f"DELETE FROM {TABLA_ENSAYOS} WHERE rowid = {ensayo_id};"
+
+
+def _misma_especie(fila):
+    return f"""NOT EXISTS (
+        SELECT 1 FROM malezas_flat
+        WHERE ensayo_id = {fila}.ensayo_id AND weed_name_id = {fila}.weed_name_id AND id <> {fila}.id
+    )"""
+
+
+def _triggers():
+    triggers = {
+        "trg_busqueda_ensayos_ins": f"""
+            AFTER INSERT ON ensayos BEGIN {_rearmar('e.ensayo_id = NEW.ensayo_id')} END""",
+        "trg_busqueda_ensayos_upd": f"""
+            AFTER UPDATE ON ensayos BEGIN
+                {_quitar('OLD.ensayo_id')}
+                {_rearmar('e.ensayo_id = NEW.ensayo_id')}
+            END""",
+        "trg_busqueda_ensayos_del": f"""
+            AFTER DELETE ON ensayos BEGIN {_quitar('OLD.ensayo_id')} END""",
+        "trg_busqueda_clientes_upd": f"""
+            AFTER UPDATE OF name ON clientes BEGIN {_rearmar('e.cliente_id = NEW.cliente_id')} END""",
+        # Una especie nueva en el ensayo (o la última que se va) cambia el documento
+        "trg_busqueda_flat_ins": f"""
+            AFTER INSERT ON malezas_flat
+            WHEN NEW.weed_name_id IS NOT NULL AND {_misma_especie('NEW')} BEGIN
+                {_rearmar('e.ensayo_id = NEW.ensayo_id')}
+            END""",
+        "trg_busqueda_flat_del": f"""
+            AFTER DELETE ON malezas_flat
+            WHEN OLD.weed_name_id IS NOT NULL AND {_misma_especie('OLD')} BEGIN
+                {_rearmar('e.ensayo_id = OLD.ensayo_id')}
+            END""",
+        f"trg_{TABLA_ESPECIES}_ins": f"""
+            AFTER INSERT ON {DICCIONARIOS['weed_name']} BEGIN
+                INSERT INTO {TABLA_ESPECIES} (rowid, valor) VALUES (NEW.id, NEW.valor);
+            END""",
+        f"trg_{TABLA_ESPECIES}_del": f"""
+            AFTER DELETE ON {DICCIONARIOS['weed_name']} BEGIN
+                INSERT INTO {TABLA_ESPECIES} ({TABLA_ESPECIES}, rowid, valor) VALUES ('delete', OLD.id, OLD.valor);
+            END""",
+    }
+    for tabla in ["ubicacion", "personal", "herbicida"]:
+        triggers[f"trg_busqueda_{tabla}_ins"] = f"""
+            AFTER INSERT ON {tabla} BEGIN {_rearmar('e.ensayo_id = NEW.ensayo_id')} END"""
+        triggers[f"trg_busqueda_{tabla}_upd"] = f"""
+            AFTER UPDATE ON {tabla} BEGIN
+                {_rearmar('e.ensayo_id = OLD.ensayo_id')}
+                {_rearmar('e.ensayo_id = NEW.ensayo_id')}
+            END"""
+        triggers[f"trg_busqueda_{tabla}_del"] = f"""
+            AFTER DELETE ON {tabla} BEGIN {_rearmar('e.ensayo_id = OLD.ensayo_id')} END"""
+    return triggers
+
+
+TRIGGERS = _triggers()
+
+
+def crear_estructura(conn):
+    """Crea las tablas FTS5 y los triggers que las mantienen (idempotente)."""
+    for sql in SQL_TABLAS:
+        conn.execute(sql)
+    for nombre, cuerpo in TRIGGERS.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+        conn.execute(f"CREATE TRIGGER {nombre} {cuerpo}")
+
+
+def reconstruir(conn):
+    """
+    Vuelve a armar los documentos de todos los ensayos y el índice de especies.
+
+    Returns:
+        int: cantidad de ensayos indexados
+    """
+    crear_estructura(conn)
+    conn.execute(f"DELETE FROM {TABLA_ENSAYOS}")
+    conn.execute(f"INSERT INTO {TABLA_ENSAYOS} (rowid, {', '.join(CAMPOS)}) {SELECT_DOCUMENTO}")
+    conn.execute(f"INSERT INTO {TABLA_ESPECIES} ({TABLA_ESPECIES}) VALUES ('rebuild')")
+    return conn.execute(f"SELECT COUNT(*) FROM {TABLA_ENSAYOS}").fetchone()[0]
+
+
+def verificar(conn):
+    """
+    Compara los documentos de busqueda_ensayos con los que arma SELECT_DOCUMENTO.
+
+    Returns:
+        tuple: (documentos que faltan o difieren, documentos sobrantes)
+    """
+    documentos = f"SELECT rowid, {', '.join(CAMPOS)} FROM {TABLA_ENSAYOS}"
+    faltantes = conn.execute(
+        f"SELECT COUNT(*) FROM ({SELECT_DOCUMENTO} EXCEPT {documentos})"
+    ).fetchone()[0]
+    sobrantes = conn.execute(
+        f"SELECT COUNT(*) FROM ({documentos} EXCEPT {SELECT_DOCUMENTO})"
+    ).fetchone()[0]
+    return faltantes, sobrantes
+
+
+def expresion_busqueda(texto):
+    """
+    Consulta FTS5 para lo que escribió el usuario: cada palabra entre comillas
+    (los signos no se interpretan como operadores) y como prefijo. None si no hay
+    palabras.
+    """
+    palabras = (texto or "").split()
+    if not palabras:
+        return None
+    return " ".join('"' + palabra.replace('"', '""') + '"*' for palabra in palabras)
+
+
+def buscar_ensayos(conn, texto, limite=50):
+    """
+    Ensayos cuyo cliente, finca, lote, técnicos, herbicida o malezas coinciden con
+    `texto`, de los más parecidos a los menos. Sin texto, los más recientes.
+
+    Returns:
+        list: tuplas (ensayo_id, test_date, test_time, cliente, farm)
+    """
+    consulta = expresion_busqueda(texto)
+    if consulta is None:
+        return conn.execute("""
+            SELECT e.ensayo_id, e.test_date, e.test_time, c.name, u.farm
+            FROM ensayos e
+            LEFT JOIN clientes c ON e.cliente_id = c.cliente_id
+            LEFT JOIN ubicacion u ON e.ensayo_id = u.ensayo_id
+            ORDER BY e.test_date DESC, e.test_time DESC
+            LIMIT ?
+        """, (limite,)).fetchall()
+    return conn.execute(f"""
+        SELECT e.ensayo_id, e.test_date, e.test_time, c.name, u.farm
+        FROM (
+            SELECT rowid AS ensayo_id, rank FROM {TABLA_ENSAYOS}
+            WHERE {TABLA_ENSAYOS} MATCH ? ORDER BY rank LIMIT ?
+        ) b
+        JOIN ensayos e ON e.ensayo_id = b.ensayo_id
+        LEFT JOIN clientes c ON e.cliente_id = c.cliente_id
+        LEFT JOIN ubicacion u ON e.ensayo_id = u.ensayo_id
+        ORDER BY b.rank, e.test_date DESC
+    """, (consulta, limite)).fetchall()
+
+
+def buscar_especies(conn, texto, limite=50):
+    """
+    Nombres de maleza que coinciden con `texto`, de los más parecidos a los menos.
+    Sin texto, los primeros en orden alfabético.
+
+    Returns:
+        list: tuplas (id, nombre)
+    """
+    consulta = expresion_busqueda(texto)
+    tabla = DICCIONARIOS["weed_name"]
+    if consulta is None:
+        return conn.execute(f"SELECT id, valor FROM {tabla} ORDER BY valor LIMIT ?", (limite,)).fetchall()
+    return conn.execute(f"""
+        SELECT rowid, valor FROM {TABLA_ESPECIES}
+        WHERE {TABLA_ESPECIES} MATCH ? ORDER BY rank LIMIT ?
+    """, (consulta, limite)).fetchall()
@@ -0,0 +1,123 @@
+# Señal de cambios entre procesos basada en PRAGMA data_version
+#
+# PRAGMA data_version cambia cada vez que otra conexión (de este u otro proceso,
+# p. ej. un envío o un borrado desde Streamlit) confirma una escritura en la base.
+# SenalCambios lo consulta en un hilo propio con una conexión dedicada (el valor
+# solo es comparable dentro de una misma conexión) y, cuando cambia, incrementa
+# su generación, vacía los cachés asociados y avisa a los suscriptores.
+import functools
+import os
+import threading
+from collections import OrderedDict
+
+from .conexion import DB_PATH, abrir_conexion
+
+INTERVALO_SONDEO = 0.5  # segundos: los cachés se invalidan en menos de un segundo
+
+
+class SenalCambios:
+    def __init__(self, ruta=None, intervalo=INTERVALO_SONDEO):
+        self.ruta = ruta or DB_PATH
+        self.intervalo = intervalo
+        self.generacion = 0
+        self._conn = None
+        self._version = self._leer_version()
+        self._suscriptores = []
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def _leer_version(self):
+        # Las subclases pueden vigilar otra cosa (ver instantanea.SenalInstantanea)
+        if self._conn is None:
+            self._conn = abrir_conexion(self.ruta)
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def comprobar(self):
+        """
+        Consulta data_version y, si cambió, avanza la generación y avisa a los suscriptores.
+
+        Returns:
+            bool: True si hubo una escritura desde la última comprobación
+        """
+        with self._lock:
+            version = self._leer_version()
+            if version == self._version:
+                return False
+            self._version = version
+            self.generacion += 1
+            suscriptores = list(self._suscriptores)
+        for funcion in suscriptores:
+            funcion(self.generacion)
+        return True
+
+    def suscribir(self, funcion):
+        """Registra `funcion(generacion)` para que se llame después de cada escritura."""
+        with self._lock:
+            self._suscriptores.append(funcion)
+        return funcion
+
+    def iniciar(self):
+        """Arranca el hilo de sondeo (idempotente)."""
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._sondear, name="senal-cambios", daemon=True)
+            self._hilo.start()
+        return self
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+            self._hilo = None
+        if self._conn is not None:
+            self._conn.close()
+
+    def _sondear(self):
+        while not self._detener.wait(self.intervalo):
+            self.comprobar()
+
+    def cacheado(self, funcion=None, tamano_max=128):
+        """
+        Decorador: memoriza los resultados de `funcion` por argumentos hasta la
+        próxima escritura en la base. Los argumentos deben ser hashables.
+        """
+        if funcion is None:
+            return functools.partial(self.cacheado, tamano_max=tamano_max)
+
+        cache = OrderedDict()
+        cache_lock = threading.Lock()
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            clave = (self.generacion, args, tuple(sorted(kwargs.items())))
+            with cache_lock:
+                if clave in cache:
+                    cache.move_to_end(clave)
+                    return cache[clave]
+            resultado = funcion(*args, **kwargs)
+            with cache_lock:
+                cache[clave] = resultado
+                while len(cache) > tamano_max:
+                    cache.popitem(last=False)
+            return resultado
+
+        @self.suscribir
+        def vaciar(generacion):
+            with cache_lock:
+                cache.clear()
+
+        envoltura.cache_clear = vaciar
+        return envoltura
+
+
+_senales = {}
+_senales_lock = threading.Lock()
+
+
+def senal_cambios(ruta=None):
+    """Devuelve la señal compartida del proceso para `ruta`, ya iniciada."""
+    clave = os.path.abspath(ruta or DB_PATH)
+    with _senales_lock:
+        if clave not in _senales:
+            _senales[clave] = SenalCambios(clave).iniciar()
+        return _senales[clave]
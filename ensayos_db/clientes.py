@@ -0,0 +1,90 @@
+# Alta de clientes sin duplicados
+#
+# Un cliente se identifica por (name, sprai_id, modules_id). Cada envío reutiliza
+# la fila existente en lugar de insertar una nueva, así clientes no crece con
+# cada ensayo. Los ids ya confirmados se guardan en un caché del proceso.
+import threading
+
+SQL_INDICE_UNICO = """
+    CREATE UNIQUE INDEX IF NOT EXISTS ux_clientes_identidad
+    ON clientes(name, sprai_id, modules_id)"""
+
+SQL_BUSCAR = """
+    SELECT cliente_id FROM clientes
+    WHERE name IS ? AND sprai_id IS ? AND modules_id IS ?"""
+
+SQL_INSERTAR = """
+    INSERT INTO clientes (name, sprai_id, modules_id) VALUES (?, ?, ?)
+    ON CONFLICT(name, sprai_id, modules_id) DO NOTHING"""
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _archivo(cursor):
+    # El caché se separa por archivo de base (ensayos.db, copias de prueba, etc.)
+    return cursor.execute("PRAGMA database_list").fetchone()[2]
+
+
+def obtener_cliente_id(cursor, name, sprai_id, modules_id):
+    """
+    Devuelve el cliente_id de (name, sprai_id, modules_id), insertándolo si no existe.
+    Corre dentro de la transacción del envío: no confirma.
+    """
+    identidad = (name, sprai_id, modules_id)
+    clave = (_archivo(cursor),) + identidad
+    with _cache_lock:
+        if clave in _cache:
+            return _cache[clave]
+
+    fila = cursor.execute(SQL_BUSCAR, identidad).fetchone()
+    if fila:
+        # Solo se cachean filas ya confirmadas: un alta nueva puede deshacerse con rollback
+        with _cache_lock:
+            _cache[clave] = fila[0]
+        return fila[0]
+
+    cursor.execute(SQL_INSERTAR, identidad)
+    if cursor.rowcount:
+        return cursor.lastrowid
+    # Otro proceso lo dio de alta entre la búsqueda y el INSERT
+    return cursor.execute(SQL_BUSCAR, identidad).fetchone()[0]
+
+
+def olvidar_clientes():
+    """Vacía el caché. borrar_ensayos y vaciar_base lo llaman cuando borran clientes."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def deduplicar(conn):
+    """
+    Une los clientes repetidos: los ensayos pasan al cliente_id más bajo de cada
+    identidad y se borran las filas sobrantes.
+
+    Returns:
+        int: cantidad de filas de clientes borradas
+    """
+    conn.execute("""
+        CREATE TEMP TABLE clientes_duplicados AS
+        SELECT c.cliente_id AS duplicado, g.conservado
+        FROM clientes c
+        JOIN (
+            SELECT name, sprai_id, modules_id, MIN(cliente_id) AS conservado
+            FROM clientes
+            GROUP BY name, sprai_id, modules_id
+            HAVING COUNT(*) > 1
+        ) g ON c.name IS g.name AND c.sprai_id IS g.sprai_id AND c.modules_id IS g.modules_id
+        WHERE c.cliente_id <> g.conservado
+    """)
+    conn.execute("""
+        UPDATE ensayos SET cliente_id = (
+            SELECT conservado FROM clientes_duplicados WHERE duplicado = ensayos.cliente_id
+        )
+        WHERE cliente_id IN (SELECT duplicado FROM clientes_duplicados)
+    """)
+    borradas = conn.execute(
+        "DELETE FROM clientes WHERE cliente_id IN (SELECT duplicado FROM clientes_duplicados)"
+    ).rowcount
+    conn.execute("DROP TABLE clientes_duplicados")
+    return borradas
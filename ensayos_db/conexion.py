@@ -0,0 +1,160 @@
+# Gestión de conexiones SQLite compartida (WAL, busy_timeout y reutilización por hilo)
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DB_PATH = os.environ.get("ENSAYOS_DB", "ensayos.db")
+
+# Parámetros de la conexión
+BUSY_TIMEOUT_MS = 5000            # espera ante bloqueos antes de "database is locked"
+CACHE_SIZE_KIB = 20000            # ~20 MB de caché de páginas por conexión
+MMAP_SIZE = 256 * 1024 * 1024     # lecturas mapeadas en memoria (256 MB)
+TAMANO_MAX_POOL = 8               # conexiones ociosas que se conservan por archivo
+
+
+def abrir_conexion(ruta=None):
+    """
+    Abre una conexión nueva ya configurada para uso concurrente.
+
+    - journal_mode=WAL: los lectores (Dash) no bloquean al escritor (Streamlit) ni viceversa
+    - busy_timeout: ante un bloqueo espera en vez de fallar inmediatamente
+    - synchronous=NORMAL: seguro en WAL y evita un fsync por commit
+    - cache_size / mmap_size: menos lecturas de disco en las consultas del dashboard
+    - foreign_keys: hace cumplir las claves foráneas y el ON DELETE CASCADE (ver borrado.py)
+
+    Args:
+        ruta: archivo de la base de datos (por defecto DB_PATH)
+    """
+    conn = sqlite3.connect(
+        ruta or DB_PATH,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones para un archivo. Cada hilo recibe siempre la misma conexión
+    (Streamlit y Dash atienden cada pedido en un hilo) y, cuando el hilo termina,
+    su conexión vuelve al pool para que la reutilice el siguiente hilo.
+
+    Args:
+        abrir: función que abre una conexión nueva a `ruta`
+        version: función de `ruta` que cambia cuando las conexiones abiertas dejan
+            de servir (p. ej. se publicó otra instantánea, ver instantanea.py); cada
+            hilo reabre la suya la próxima vez que la pide
+    """
+
+    def __init__(self, ruta, tamano_max=TAMANO_MAX_POOL, abrir=abrir_conexion, version=None):
+        self.ruta = ruta
+        self.tamano_max = tamano_max
+        self._abrir = abrir
+        self._version = version or (lambda ruta: None)
+        self._versiones = {}
+        self._libres = []
+        self._asignadas = {}
+        self._lock = threading.Lock()
+
+    def conexion_del_hilo(self):
+        hilo = threading.current_thread()
+        version = self._version(self.ruta)
+        with self._lock:
+            conn = self._asignadas.get(hilo)
+            if conn is not None and self._versiones[conn] == version:
+                return conn
+            if conn is not None:
+                self._cerrar(self._asignadas.pop(hilo))
+            self._recuperar_huerfanas()
+            conn = None
+            while self._libres and conn is None:
+                conn = self._libres.pop()
+                if self._versiones[conn] != version:
+                    self._cerrar(conn)
+                    conn = None
+        if conn is None:
+            conn = self._abrir(self.ruta)
+        with self._lock:
+            self._asignadas[hilo] = conn
+            self._versiones[conn] = version
+        return conn
+
+    def liberar(self):
+        """Devuelve al pool la conexión del hilo actual."""
+        with self._lock:
+            conn = self._asignadas.pop(threading.current_thread(), None)
+            if conn is not None:
+                self._devolver(conn)
+
+    def cerrar_todas(self):
+        with self._lock:
+            for conn in list(self._asignadas.values()) + self._libres:
+                conn.close()
+            self._asignadas.clear()
+            self._libres.clear()
+            self._versiones.clear()
+
+    def _recuperar_huerfanas(self):
+        # Conexiones de hilos que ya terminaron vuelven a quedar libres
+        for hilo in [h for h in self._asignadas if not h.is_alive()]:
+            self._devolver(self._asignadas.pop(hilo))
+
+    def _devolver(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        if len(self._libres) < self.tamano_max:
+            self._libres.append(conn)
+        else:
+            self._cerrar(conn)
+
+    def _cerrar(self, conn):
+        self._versiones.pop(conn, None)
+        conn.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _pool(ruta):
+    ruta = os.path.abspath(ruta or DB_PATH)
+    with _pools_lock:
+        if ruta not in _pools:
+            _pools[ruta] = PoolConexiones(ruta)
+        return _pools[ruta]
+
+
+def obtener_conexion(ruta=None):
+    """
+    Devuelve la conexión reutilizable del hilo actual para `ruta`.
+    No debe cerrarse: pertenece al pool.
+    """
+    return _pool(ruta).conexion_del_hilo()
+
+
+def cerrar_conexiones(ruta=None):
+    """Cierra todas las conexiones del pool de `ruta` (p. ej. antes de reemplazar el archivo)."""
+    _pool(ruta).cerrar_todas()
+
+
+@contextmanager
+def transaccion(ruta=None):
+    """
+    Ejecuta un bloque dentro de una transacción sobre la conexión del hilo:
+    commit si termina bien, rollback si lanza una excepción.
+    """
+    conn = obtener_conexion(ruta)
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
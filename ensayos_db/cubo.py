@@ -0,0 +1,177 @@
+# Cubo de agregados malezas_cubo, mantenido por triggers sobre malezas_flat
+#
+# Todos los gráficos del dashboard son "cantidad y proporción aplicada por barra
+# de X". malezas_cubo guarda, por ensayo y combinación de dimensiones, cuántas
+# malezas hay (malezas) y cuántas se aplicaron (aplicadas), así un gráfico suma
+# unas pocas filas por ensayo en lugar de recorrer todas las malezas.
+#
+# Las variables numéricas se guardan como tramo: el índice del intervalo entre
+# los bordes de TRAMOS en que cae el valor (0 = debajo del primer borde). Los
+# bordes son la unión de los de los gráficos y los de los filtros, así cada
+# barra y cada opción de filtro es una unión exacta de tramos.
+
+# columna de malezas_flat -> bordes de sus tramos
+TRAMOS = {
+    "speed": [0, 5, 10, 15, 20, 25],
+    "wind_speed": [0, 5, 10, 15, 20, 25],
+    "size": [0, 2, 3.5, 5.5, 7.5, 9.5, 15.5, 20.5, 25.5, 26, 1000],
+    "weed_diameter": [0, 15, 30, 1000],
+}
+
+# Dimensiones que se copian tal cual de malezas_flat
+DIMENSIONES = [
+    "ensayo_id", "fecha_ensayo", "modules_id", "crop_specie", "sensitivity", "tile",
+    "weed_placement_id", "weed_type_id", "weed_name_id",
+]
+
+CLAVE = DIMENSIONES + [f"{columna}_tramo" for columna in TRAMOS]
+COLUMNAS = CLAVE + ["malezas", "aplicadas"]
+
+SQL_TABLA = """
+CREATE TABLE IF NOT EXISTS malezas_cubo (
+    ensayo_id INTEGER,
+    fecha_ensayo TEXT,
+    modules_id TEXT,
+    crop_specie TEXT,
+    sensitivity INTEGER,
+    tile INTEGER,
+    weed_placement_id INTEGER,
+    weed_type_id INTEGER,
+    weed_name_id INTEGER,
+    speed_tramo INTEGER,
+    wind_speed_tramo INTEGER,
+    size_tramo INTEGER,
+    weed_diameter_tramo INTEGER,
+    malezas INTEGER NOT NULL,
+    aplicadas INTEGER NOT NULL
+) STRICT"""
+
+# Los triggers buscan la fila de la maleza por su clave: el ensayo y las
+# dimensiones propias de cada maleza bastan para llegar a una o dos filas
+SQL_INDICE = """
+CREATE INDEX IF NOT EXISTS idx_malezas_cubo_clave ON malezas_cubo(
+    ensayo_id, weed_name_id, weed_type_id, weed_placement_id, size_tramo, weed_diameter_tramo
+)"""
+
+
+def expresion_tramo(columna, fila=None):
+    """Expresión SQL con el tramo del valor de `columna` (NULL si el valor es NULL)."""
+    valor = f"{fila}.{columna}" if fila else columna
+    if columna == "size":
+        # Como en los gráficos, un tamaño 0 equivale a vacío
+        valor = f"NULLIF({valor}, 0)"
+    return "(" + " + ".join(f"({valor} >= {borde})" for borde in TRAMOS[columna]) + ")"
+
+
+def tramos_en_rango(columna, minimo, maximo):
+    """
+    Tramos de `columna` cuya unión es exactamente [minimo, maximo). Devuelve None
+    si algún extremo no es un borde de TRAMOS (el rango no se puede resolver en el cubo).
+    """
+    bordes = TRAMOS[columna]
+    if minimo not in bordes or (maximo != float("inf") and maximo not in bordes):
+        return None
+    desde = bordes.index(minimo) + 1
+    hasta = len(bordes) if maximo == float("inf") else bordes.index(maximo)
+    return list(range(desde, hasta + 1))
+
+
+def _valores(fila=None):
+    prefijo = f"{fila}." if fila else ""
+    return [f"{prefijo}{columna}" for columna in DIMENSIONES] + [
+        expresion_tramo(columna, fila) for columna in TRAMOS
+    ]
+
+
+def _misma_clave(fila):
+    return " AND ".join(f"{columna} IS {valor}" for columna, valor in zip(CLAVE, _valores(fila)))
+
+
+def _sumar(fila):
+    # Dentro de un trigger, changes() cuenta las filas del UPDATE anterior del mismo trigger
+    return f"""
+        UPDATE malezas_cubo SET malezas = malezas + 1, aplicadas = aplicadas + {fila}.weed_applied
+        WHERE {fila}.weed_applied IS NOT NULL AND {_misma_clave(fila)};
+        INSERT INTO malezas_cubo ({', '.join(COLUMNAS)})
+        SELECT {', '.join(_valores(fila))}, 1, {fila}.weed_applied
+        WHERE {fila}.weed_applied IS NOT NULL AND changes() = 0;"""
+
+
+def _restar(fila):
+    return f"""
+        UPDATE malezas_cubo SET malezas = malezas - 1, aplicadas = aplicadas - {fila}.weed_applied
+        WHERE {fila}.weed_applied IS NOT NULL AND {_misma_clave(fila)};
+        DELETE FROM malezas_cubo WHERE malezas = 0 AND {_misma_clave(fila)};"""
+
+
+def _triggers():
+    # Una actualización que no cambia la clave ni weed_applied (p. ej. el nombre del cliente) no toca el cubo
+    sin_cambios = " AND ".join(
+        f"{viejo} IS {nuevo}" for viejo, nuevo in zip(_valores("OLD"), _valores("NEW"))
+    )
+    return {
+        "trg_cubo_ins": f"""
+            AFTER INSERT ON malezas_flat WHEN NEW.weed_applied IS NOT NULL BEGIN
+                {_sumar('NEW')}
+            END""",
+        "trg_cubo_upd": f"""
+            AFTER UPDATE ON malezas_flat
+            WHEN NOT ({sin_cambios} AND OLD.weed_applied IS NEW.weed_applied) BEGIN
+                {_restar('OLD')}
+                {_sumar('NEW')}
+            END""",
+        "trg_cubo_del": f"""
+            AFTER DELETE ON malezas_flat WHEN OLD.weed_applied IS NOT NULL BEGIN
+                {_restar('OLD')}
+            END""",
+    }
+
+
+TRIGGERS = _triggers()
+
+# Fuente de verdad: malezas_flat agrupada por la clave del cubo
+SELECT_AGRUPADO = f"""
+    SELECT {', '.join(_valores())}, COUNT(*), SUM(weed_applied)
+    FROM malezas_flat
+    WHERE weed_applied IS NOT NULL
+    GROUP BY {', '.join(_valores())}
+"""
+
+
+def crear_estructura(conn):
+    """Crea malezas_cubo, su índice y los triggers que lo mantienen (idempotente)."""
+    conn.execute(SQL_TABLA)
+    conn.execute(SQL_INDICE)
+    for nombre, cuerpo in TRIGGERS.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+        conn.execute(f"CREATE TRIGGER {nombre} {cuerpo}")
+
+
+def reconstruir(conn):
+    """
+    Vuelve a llenar malezas_cubo desde malezas_flat.
+
+    Returns:
+        int: cantidad de filas en malezas_cubo
+    """
+    crear_estructura(conn)
+    conn.execute("DELETE FROM malezas_cubo")
+    conn.execute(f"INSERT INTO malezas_cubo ({', '.join(COLUMNAS)}) {SELECT_AGRUPADO}")
+    return conn.execute("SELECT COUNT(*) FROM malezas_cubo").fetchone()[0]
+
+
+def verificar(conn):
+    """
+    Compara malezas_cubo contra malezas_flat agrupada.
+
+    Returns:
+        tuple: (filas que faltan o difieren en malezas_cubo, filas sobrantes en malezas_cubo)
+    """
+    columnas = ", ".join(COLUMNAS)
+    faltantes = conn.execute(
+        f"SELECT COUNT(*) FROM ({SELECT_AGRUPADO} EXCEPT SELECT {columnas} FROM malezas_cubo)"
+    ).fetchone()[0]
+    sobrantes = conn.execute(
+        f"SELECT COUNT(*) FROM (SELECT {columnas} FROM malezas_cubo EXCEPT {SELECT_AGRUPADO})"
+    ).fetchone()[0]
+    return faltantes, sobrantes
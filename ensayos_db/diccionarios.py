@@ -0,0 +1,111 @@
+# Diccionarios de los textos repetidos de resultados_malezas
+#
+# weed_name, weed_type, weed_placement y uploader se guardan una sola vez en una
+# tabla chica (id, valor) y resultados_malezas guarda el id entero. malezas_flat
+# conserva el texto para mostrarlo y además los ids, que son los que usan los
+# filtros y las agrupaciones del dashboard.
+from .esquema import INDICES
+
+# columna de texto -> tabla de diccionario (la columna codificada es <columna>_id)
+DICCIONARIOS = {
+    "uploader": "uploaders",
+    "weed_placement": "ubicaciones_maleza",
+    "weed_type": "tipos_maleza",
+    "weed_name": "nombres_maleza",
+}
+
+SQL_RESULTADOS_CODIFICADOS = """
+CREATE TABLE {tabla} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ensayo_id INTEGER,
+    uploader_id INTEGER,
+    weed_diameter REAL,
+    size REAL,
+    height REAL,
+    weed_placement_id INTEGER,
+    weed_type_id INTEGER,
+    weed_name_id INTEGER,
+    weed_applied INTEGER,
+    FOREIGN KEY (ensayo_id) REFERENCES ensayos(ensayo_id),
+    FOREIGN KEY (uploader_id) REFERENCES uploaders(id),
+    FOREIGN KEY (weed_placement_id) REFERENCES ubicaciones_maleza(id),
+    FOREIGN KEY (weed_type_id) REFERENCES tipos_maleza(id),
+    FOREIGN KEY (weed_name_id) REFERENCES nombres_maleza(id)
+)"""
+
+
+def crear_diccionarios(conn):
+    for tabla in DICCIONARIOS.values():
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {tabla} (
+                id INTEGER PRIMARY KEY,
+                valor TEXT NOT NULL UNIQUE
+            )""")
+
+
+def obtener_ids(cursor, columna, valores):
+    """
+    Devuelve {valor: id} para los `valores` de `columna`, dando de alta los nuevos.
+    Corre dentro de la transacción del llamador: no confirma.
+    """
+    tabla = DICCIONARIOS[columna]
+    valores = list(set(valores))
+    cursor.executemany(f"INSERT OR IGNORE INTO {tabla} (valor) VALUES (?)", [(v,) for v in valores])
+    ids = {}
+    # De a lotes para no pasar el límite de parámetros de SQLite
+    for inicio in range(0, len(valores), 500):
+        lote = valores[inicio:inicio + 500]
+        ids.update(cursor.execute(
+            f"SELECT valor, id FROM {tabla} WHERE valor IN ({', '.join('?' * len(lote))})", lote
+        ).fetchall())
+    return ids
+
+
+def codificada(conn):
+    columnas = [fila[1] for fila in conn.execute("PRAGMA table_info(resultados_malezas)")]
+    return "weed_name_id" in columnas
+
+
+def codificar_resultados(conn):
+    """
+    Pasa resultados_malezas de textos a ids de diccionario (idempotente). Reconstruye
+    la tabla conservando ids y secuencia; los triggers de malezas_flat sobre ella se
+    vuelven a crear aparte (ver migraciones).
+    """
+    crear_diccionarios(conn)
+    if codificada(conn):
+        return
+    for columna, tabla in DICCIONARIOS.items():
+        conn.execute(f"""
+            INSERT OR IGNORE INTO {tabla} (valor)
+            SELECT DISTINCT {columna} FROM resultados_malezas WHERE {columna} IS NOT NULL
+        """)
+
+    conn.execute(SQL_RESULTADOS_CODIFICADOS.format(tabla="resultados_malezas_codificados"))
+    conn.execute(f"""
+        INSERT INTO resultados_malezas_codificados (
+            id, ensayo_id, uploader_id, weed_diameter, size, height,
+            weed_placement_id, weed_type_id, weed_name_id, weed_applied
+        )
+        SELECT
+            r.id, r.ensayo_id,
+            (SELECT id FROM uploaders WHERE valor = r.uploader),
+            r.weed_diameter, r.size, r.height,
+            (SELECT id FROM ubicaciones_maleza WHERE valor = r.weed_placement),
+            (SELECT id FROM tipos_maleza WHERE valor = r.weed_type),
+            (SELECT id FROM nombres_maleza WHERE valor = r.weed_name),
+            r.weed_applied
+        FROM resultados_malezas r
+    """)
+
+    secuencia = conn.execute(
+        "SELECT seq FROM sqlite_sequence WHERE name = 'resultados_malezas'"
+    ).fetchone()
+    conn.execute("DROP TABLE resultados_malezas")
+    conn.execute("ALTER TABLE resultados_malezas_codificados RENAME TO resultados_malezas")
+    if secuencia:
+        # Los ids borrados no se reutilizan, igual que antes de reconstruir la tabla
+        conn.execute(
+            "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'resultados_malezas'", secuencia
+        )
+    conn.execute(INDICES["idx_resultados_malezas_ensayo"])
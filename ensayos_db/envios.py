@@ -0,0 +1,62 @@
+# Envíos idempotentes: huella de cada envío en ensayos.hash_envio
+#
+# La huella es el SHA-256 de la planilla estandarizada (como CSV) junto con los
+# datos que identifican el ensayo: cliente, fecha, hora, finca y lote. La
+# planilla se hashea aparte (huella_planilla), de a bloques, para no tenerla
+# entera en memoria. El índice
+# único sobre hash_envio hace que reconocer un envío repetido (doble clic en
+# "Enviar", la misma planilla subida otra vez) sea una búsqueda en el índice, y
+# que aunque dos procesos envíen lo mismo a la vez solo uno pueda insertarlo.
+#
+# Los ensayos archivados no conservan la huella: la comprobación cubre la base
+# caliente y archivar nunca choca con el índice único del archivo.
+import hashlib
+import json
+
+COLUMNA = "hash_envio"
+
+SQL_INDICE = f"CREATE UNIQUE INDEX IF NOT EXISTS ux_ensayos_{COLUMNA} ON ensayos({COLUMNA})"
+
+
+def crear_estructura(conn):
+    """Agrega ensayos.hash_envio y su índice único (idempotente)."""
+    columnas = [fila[1] for fila in conn.execute("PRAGMA table_info(ensayos)")]
+    if COLUMNA not in columnas:
+        conn.execute(f"ALTER TABLE ensayos ADD COLUMN {COLUMNA} TEXT")
+    conn.execute(SQL_INDICE)
+
+
+def huella_planilla(bloques):
+    """
+    SHA-256 de la planilla estandarizada, recibida como DataFrames consecutivos:
+    es el de su CSV entero (encabezado una vez), sin juntar los bloques.
+
+    Returns:
+        str: SHA-256 en hexadecimal
+    """
+    huella = hashlib.sha256()
+    for numero, bloque in enumerate(bloques):
+        huella.update(bloque.to_csv(index=False, header=numero == 0).encode())
+    return huella.hexdigest()
+
+
+def huella_envio(identidad, planilla):
+    """
+    Huella del envío: `identidad` es la secuencia de datos que identifican el
+    ensayo (se comparan como texto) y `planilla` la huella_planilla de la
+    planilla estandarizada.
+
+    Returns:
+        str: SHA-256 en hexadecimal
+    """
+    huella = hashlib.sha256()
+    huella.update(json.dumps([None if valor is None else str(valor) for valor in identidad]).encode())
+    huella.update(b"\0")
+    huella.update(planilla.encode())
+    return huella.hexdigest()
+
+
+def ensayo_por_huella(conn, huella):
+    """ensayo_id del envío con esa huella, o None si no se envió todavía."""
+    fila = conn.execute(f"SELECT ensayo_id FROM ensayos WHERE {COLUMNA} = ?", (huella,)).fetchone()
+    return fila[0] if fila else None
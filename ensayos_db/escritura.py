@@ -0,0 +1,167 @@
+# Cola de escritura con un único hilo escritor por base
+#
+# Al final de una jornada de campo varios evaluadores envían a la vez y cada
+# sesión de Streamlit escribiría desde su propio hilo: las transacciones compiten
+# por el bloqueo de escritura y, pasado busy_timeout, alguna falla con "database
+# is locked". Con la cola, las sesiones no escriben: encolan una función
+# trabajo(conn) y esperan. Un solo hilo con su propia conexión toma los trabajos
+# en tandas (los que se acumularon mientras confirmaba la anterior, hasta
+# TAMANO_MAX_TANDA), los corre dentro de una transacción BEGIN IMMEDIATE, cada
+# uno en su SAVEPOINT, y confirma la tanda con un solo commit. Si un trabajo
+# falla se deshace solo ese trabajo; su excepción (o su resultado) vuelve a la
+# sesión que lo encoló cuando la tanda ya está confirmada.
+#
+# Los trabajos no deben confirmar ni deshacer por su cuenta. Los que necesitan
+# manejar la transacción ellos mismos (archivar hace ATTACH, que no puede ir
+# dentro de una) se encolan con aislado=True y corren solos.
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+from .clientes import olvidar_clientes
+from .conexion import DB_PATH, abrir_conexion
+
+TAMANO_MAX_TANDA = 32
+
+_FIN = object()
+
+
+class _Trabajo:
+    def __init__(self, funcion, aislado):
+        self.funcion = funcion
+        self.aislado = aislado
+        self.futuro = Future()
+
+
+class ColaEscritura:
+    """
+    Serializa las escrituras de un proceso sobre la base `ruta` en un hilo propio
+    y las confirma en tandas.
+    """
+
+    def __init__(self, ruta=None, tamano_max_tanda=TAMANO_MAX_TANDA):
+        self.ruta = os.path.abspath(ruta or DB_PATH)
+        self.tamano_max_tanda = tamano_max_tanda
+        self._cola = queue.Queue()
+        self._conn = None
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    def iniciar(self):
+        """Arranca el hilo escritor (idempotente)."""
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._escribir, name="cola-escritura", daemon=True)
+                self._hilo.start()
+        return self
+
+    def enviar(self, funcion, aislado=False):
+        """
+        Encola `funcion(conn)` y devuelve un Future con su resultado, que se completa
+        cuando la tanda está confirmada (o con la excepción si el trabajo falló).
+        """
+        trabajo = _Trabajo(funcion, aislado)
+        self._cola.put(trabajo)
+        return trabajo.futuro
+
+    def ejecutar(self, funcion, aislado=False, timeout=None):
+        """Encola `funcion(conn)`, espera a que se confirme y devuelve su resultado."""
+        return self.enviar(funcion, aislado).result(timeout)
+
+    def detener(self):
+        """Termina el hilo después de los trabajos ya encolados."""
+        with self._lock:
+            hilo, self._hilo = self._hilo, None
+        if hilo is not None:
+            self._cola.put(_FIN)
+            hilo.join()
+
+    def _escribir(self):
+        pendiente = None
+        while True:
+            trabajo = pendiente if pendiente is not None else self._cola.get()
+            pendiente = None
+            if trabajo is _FIN:
+                break
+            if self._conn is None:
+                self._conn = abrir_conexion(self.ruta)
+            if trabajo.aislado:
+                self._correr_aislado(trabajo)
+                continue
+            # Tanda: lo que ya está en la cola, sin esperar; un aislado o el fin cortan la tanda
+            tanda = [trabajo]
+            while len(tanda) < self.tamano_max_tanda:
+                try:
+                    siguiente = self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if siguiente is _FIN or siguiente.aislado:
+                    pendiente = siguiente
+                    break
+                tanda.append(siguiente)
+            self._correr_tanda(tanda)
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _correr_tanda(self, tanda):
+        conn = self._conn
+        resultados = []
+        try:
+            # IMMEDIATE toma el bloqueo de escritura al empezar (espera busy_timeout si otro proceso escribe)
+            conn.execute("BEGIN IMMEDIATE")
+            for trabajo in tanda:
+                conn.execute("SAVEPOINT trabajo")
+                try:
+                    resultado = trabajo.funcion(conn)
+                except Exception as error:
+                    conn.execute("ROLLBACK TO trabajo")
+                    conn.execute("RELEASE trabajo")
+                    # El trabajo deshecho pudo cachear un cliente que ya no existe
+                    olvidar_clientes()
+                    resultados.append((trabajo, None, error))
+                else:
+                    conn.execute("RELEASE trabajo")
+                    resultados.append((trabajo, resultado, None))
+            conn.commit()
+        except Exception as error:
+            if conn.in_transaction:
+                conn.rollback()
+            # Un trabajo de la tanda pudo cachear un cliente que la tanda no llegó a confirmar
+            olvidar_clientes()
+            for trabajo in tanda:
+                trabajo.futuro.set_exception(error)
+            return
+        for trabajo, resultado, error in resultados:
+            if error is None:
+                trabajo.futuro.set_result(resultado)
+            else:
+                trabajo.futuro.set_exception(error)
+
+    def _correr_aislado(self, trabajo):
+        conn = self._conn
+        try:
+            resultado = trabajo.funcion(conn)
+            conn.commit()
+        except Exception as error:
+            if conn.in_transaction:
+                conn.rollback()
+            # Igual que en una tanda: el trabajo pudo cachear un cliente que no se confirmó
+            olvidar_clientes()
+            trabajo.futuro.set_exception(error)
+        else:
+            trabajo.futuro.set_result(resultado)
+
+
+_colas = {}
+_lock = threading.Lock()
+
+
+def cola_escritura(ruta=None):
+    """Devuelve la cola de escritura compartida del proceso para la base `ruta`, ya iniciada."""
+    clave = os.path.abspath(ruta or DB_PATH)
+    with _lock:
+        if clave not in _colas:
+            _colas[clave] = ColaEscritura(clave).iniciar()
+        return _colas[clave]
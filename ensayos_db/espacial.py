@@ -0,0 +1,145 @@
+# Índice espacial R*Tree de las ubicaciones de los ensayos
+#
+# ubicacion_rtree guarda un punto (caja de lado 0) por ensayo con coordenadas,
+# mantenido por triggers sobre ubicacion. Con él "los ensayos dentro de esta
+# caja" (lo visible en el mapa) y "los k ensayos más cercanos a este punto"
+# (ensayos anteriores cerca de una finca nueva) recorren solo las ramas del
+# árbol que tocan la caja en lugar de toda la tabla.
+#
+# El R*Tree guarda las coordenadas como float de 32 bits, redondeadas hacia
+# afuera: las consultas vuelven a filtrar con los valores exactos de ubicacion.
+import math
+
+TABLA = "ubicacion_rtree"
+RADIO_TIERRA_KM = 6371.0
+RADIO_INICIAL_KM = 25.0       # primera caja de la búsqueda de cercanos; se agranda x4 hasta tener k
+RADIO_MAXIMO_KM = math.pi * RADIO_TIERRA_KM
+
+SQL_TABLA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA} USING rtree(
+    ensayo_id, lat_min, lat_max, lon_min, lon_max
+)"""
+
+_PUNTO = "SELECT NEW.ensayo_id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude " \
+         "WHERE NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL"
+
+TRIGGERS = {
+    "trg_rtree_ubicacion_ins": f"""
+        AFTER INSERT ON ubicacion BEGIN
+            INSERT INTO {TABLA} {_PUNTO};
+        END""",
+    "trg_rtree_ubicacion_upd": f"""
+        AFTER UPDATE OF ensayo_id, latitude, longitude ON ubicacion BEGIN
+            DELETE FROM {TABLA} WHERE ensayo_id = OLD.ensayo_id;
+            INSERT INTO {TABLA} {_PUNTO};
+        END""",
+    "trg_rtree_ubicacion_del": f"""
+        AFTER DELETE ON ubicacion BEGIN
+            DELETE FROM {TABLA} WHERE ensayo_id = OLD.ensayo_id;
+        END""",
+}
+
+# Ensayos dentro de una caja, con los datos que muestran el mapa y su tabla
+SQL_EN_CAJA = """
+    SELECT u.ensayo_id, u.latitude, u.longitude, u.farm, c.name AS cliente
+    FROM {esquema}.{tabla} r
+    JOIN {esquema}.ubicacion u ON u.ensayo_id = r.ensayo_id
+    LEFT JOIN {esquema}.ensayos e ON e.ensayo_id = u.ensayo_id
+    LEFT JOIN {esquema}.clientes c ON c.cliente_id = e.cliente_id
+    WHERE r.lat_max >= :lat_min AND r.lat_min <= :lat_max
+      AND r.lon_max >= :lon_min AND r.lon_min <= :lon_max
+      AND u.latitude BETWEEN :lat_min AND :lat_max
+      AND u.longitude BETWEEN :lon_min AND :lon_max
+"""
+
+
+def crear_estructura(conn):
+    """Crea ubicacion_rtree y los triggers que la mantienen (idempotente)."""
+    conn.execute(SQL_TABLA)
+    for nombre, cuerpo in TRIGGERS.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+        conn.execute(f"CREATE TRIGGER {nombre} {cuerpo}")
+
+
+def reconstruir(conn):
+    """
+    Vuelve a llenar ubicacion_rtree desde ubicacion.
+
+    Returns:
+        int: cantidad de ensayos con coordenadas
+    """
+    crear_estructura(conn)
+    conn.execute(f"DELETE FROM {TABLA}")
+    conn.execute(f"""
+        INSERT INTO {TABLA}
+        SELECT ensayo_id, latitude, latitude, longitude, longitude FROM ubicacion
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+    """)
+    return conn.execute(f"SELECT COUNT(*) FROM {TABLA}").fetchone()[0]
+
+
+def caja_alrededor(latitud, longitud, radio_km):
+    """
+    Caja (lat_min, lat_max, lon_min, lon_max) que contiene todos los puntos a
+    `radio_km` o menos del punto. Cerca de los polos o con radios grandes abarca
+    todas las longitudes; no cruza el antimeridiano.
+    """
+    angulo = radio_km / RADIO_TIERRA_KM
+    lat_min = max(latitud - math.degrees(angulo), -90.0)
+    lat_max = min(latitud + math.degrees(angulo), 90.0)
+    coseno = math.cos(math.radians(latitud))
+    if lat_min == -90.0 or lat_max == 90.0 or math.sin(angulo) >= coseno:
+        return lat_min, lat_max, -180.0, 180.0
+    delta = math.degrees(math.asin(math.sin(angulo) / coseno))
+    return lat_min, lat_max, max(longitud - delta, -180.0), min(longitud + delta, 180.0)
+
+
+def distancia_km(lat1, lon1, lat2, lon2):
+    """Distancia sobre la superficie terrestre (fórmula del haversine)."""
+    fi1, fi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((fi2 - fi1) / 2) ** 2
+         + math.cos(fi1) * math.cos(fi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * RADIO_TIERRA_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def ensayos_en_caja(conn, lat_min, lat_max, lon_min, lon_max, esquema="main"):
+    """
+    Ensayos con coordenadas dentro de la caja, de `esquema` ('main' o el archivo adjunto).
+
+    Returns:
+        list: tuplas (ensayo_id, latitude, longitude, farm, cliente)
+    """
+    caja = {"lat_min": lat_min, "lat_max": lat_max, "lon_min": lon_min, "lon_max": lon_max}
+    return conn.execute(SQL_EN_CAJA.format(esquema=esquema, tabla=TABLA), caja).fetchall()
+
+
+def _por_distancia(filas, latitud, longitud):
+    return sorted(
+        ((*fila, distancia_km(latitud, longitud, fila[1], fila[2])) for fila in filas),
+        key=lambda fila: fila[-1]
+    )
+
+
+def ensayos_cercanos(conn, latitud, longitud, k=5, esquema="main"):
+    """
+    Los `k` ensayos más cercanos al punto. Busca en cajas cada vez más grandes
+    hasta juntar k candidatos; como fuera del círculo inscripto en la caja puede
+    quedar uno más cerca que el k-ésimo candidato, la última caja se agranda
+    hasta la distancia de ese candidato.
+
+    Returns:
+        list: tuplas (ensayo_id, latitude, longitude, farm, cliente, distancia_km), de la más cercana
+    """
+    radio = RADIO_INICIAL_KM
+    while True:
+        filas = ensayos_en_caja(conn, *caja_alrededor(latitud, longitud, radio), esquema)
+        if len(filas) >= k or radio >= RADIO_MAXIMO_KM:
+            break
+        radio *= 4
+    cercanos = _por_distancia(filas, latitud, longitud)
+    if len(cercanos) >= k and cercanos[k - 1][-1] > radio:
+        # El margen de un metro cubre el redondeo del k-ésimo, que queda justo en el borde
+        radio = cercanos[k - 1][-1] + 0.001
+        filas = ensayos_en_caja(conn, *caja_alrededor(latitud, longitud, radio), esquema)
+        cercanos = _por_distancia(filas, latitud, longitud)
+    return cercanos[:k]
@@ -0,0 +1,150 @@
+# Definición del esquema de ensayos.db (compartido por Streamlit y Dash)
+
+# Esquema base (versión 1). Los cambios posteriores se aplican en migraciones.py
+TABLAS = {
+    
+    # Tabla clientes
+    "clientes": """
+    CREATE TABLE IF NOT EXISTS clientes (
+        cliente_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        sprai_id VARCHAR,
+        modules_id VARCHAR
+    )""",
+    
+    # Tabla ensayos
+    "ensayos": """
+    CREATE TABLE IF NOT EXISTS ensayos (
+        ensayo_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        cliente_id INTEGER,
+        test_date DATE,
+        test_time TIME,
+        FOREIGN KEY (cliente_id) REFERENCES clientes(cliente_id)
+    )""",
+    
+    # Tabla ubicacion
+    "ubicacion": """
+    CREATE TABLE IF NOT EXISTS ubicacion (
+        ensayo_id INTEGER PRIMARY KEY,
+        farm TEXT,
+        farm_address TEXT,
+        field_location TEXT,
+        latitude REAL,
+        longitude REAL,
+        soil_type TEXT,
+        FOREIGN KEY (ensayo_id) REFERENCES ensayos(ensayo_id)
+    )""",
+    
+    # Tabla condiciones_ambientales
+    "condiciones_ambientales": """
+    CREATE TABLE IF NOT EXISTS condiciones_ambientales (
+        ensayo_id INTEGER PRIMARY KEY,
+        ambient_temperature REAL,
+        wind_speed REAL,
+        relative_humidity REAL,
+        wind_direction TEXT,
+        ambient_light_intensity REAL,
+        cloudiness REAL,
+        FOREIGN KEY (ensayo_id) REFERENCES ensayos(ensayo_id)
+    )""",
+    
+    # Tabla cultivo
+    "cultivo": """
+    CREATE TABLE IF NOT EXISTS cultivo (
+        ensayo_id INTEGER PRIMARY KEY,
+        crop_specie TEXT,
+        tillage TEXT,
+        row_spacing REAL,
+        crop_population INTEGER,
+        crop_stage TEXT,
+        FOREIGN KEY (ensayo_id) REFERENCES ensayos(ensayo_id)
+    )""",
+    
+    # Tabla pulverizadora
+    "pulverizadora": """
+    CREATE TABLE IF NOT EXISTS pulverizadora (
+        ensayo_id INTEGER PRIMARY KEY,
+        sprayer_manufacturer TEXT,
+        sprayer_model_number TEXT,
+        sprayer_year INTEGER,
+        nozzle_nomenclature TEXT,
+        nozzle_droplet_classification TEXT,
+        nozzle_spacing REAL,
+        boom_height REAL,
+        speed REAL,
+        spray_pressure REAL,
+        flow_rate REAL,
+        FOREIGN KEY (ensayo_id) REFERENCES ensayos(ensayo_id)
+    )""",
+    
+    # Tabla colorante
+    "colorante": """
+    CREATE TABLE IF NOT EXISTS colorante (
+        ensayo_id INTEGER PRIMARY KEY,
+        dye_used TEXT,
+        dye_manufacturer TEXT,
+        dye_concentration_ll REAL,
+        dye_concentration_gl REAL,
+        FOREIGN KEY (ensayo_id) REFERENCES ensayos(ensayo_id)
+    )""",
+    
+    # Tabla personal
+    "personal": """
+    CREATE TABLE IF NOT EXISTS personal (
+        ensayo_id INTEGER PRIMARY KEY,
+        machine_operator TEXT,
+        trial_testers TEXT,
+        FOREIGN KEY (ensayo_id) REFERENCES ensayos(ensayo_id)
+    )""",
+    
+    # Tabla herbicida
+    "herbicida": """
+    CREATE TABLE IF NOT EXISTS herbicida (
+        ensayo_id INTEGER PRIMARY KEY,
+        herbicide TEXT,
+        dose INTEGER,
+        FOREIGN KEY (ensayo_id) REFERENCES ensayos(ensayo_id)
+    )""",
+    
+    # Tabla modelo_deteccion
+    "modelo_deteccion": """
+    CREATE TABLE IF NOT EXISTS modelo_deteccion (
+        ensayo_id INTEGER PRIMARY KEY,
+        model_id TEXT,
+        sens INTEGER,
+        tile INTEGER,
+        FOREIGN KEY (ensayo_id) REFERENCES ensayos(ensayo_id)
+    )""",
+    
+    # Tabla resultados_malezas (simplificada para el ejemplo).
+    # La migración 4 reemplaza los textos por ids de diccionario (ver diccionarios.py)
+    "resultados_malezas": """
+    CREATE TABLE IF NOT EXISTS resultados_malezas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ensayo_id INTEGER,
+        uploader TEXT,
+        weed_diameter REAL,
+        size REAL,
+        height REAL,
+        weed_placement TEXT,
+        weed_type TEXT,
+        weed_name TEXT,
+        weed_applied INTEGER,
+        FOREIGN KEY (ensayo_id) REFERENCES ensayos(ensayo_id)
+    )"""
+}
+
+# Índices secundarios sobre las claves de join y filtro del dashboard (versión 2)
+INDICES = {
+    "idx_resultados_malezas_ensayo": "CREATE INDEX IF NOT EXISTS idx_resultados_malezas_ensayo ON resultados_malezas(ensayo_id)",
+    "idx_ensayos_cliente": "CREATE INDEX IF NOT EXISTS idx_ensayos_cliente ON ensayos(cliente_id)",
+    "idx_ensayos_fecha": "CREATE INDEX IF NOT EXISTS idx_ensayos_fecha ON ensayos(test_date)",
+    "idx_clientes_modulos": "CREATE INDEX IF NOT EXISTS idx_clientes_modulos ON clientes(modules_id)",
+}
+
+
+def crear_tablas(conn):
+    cursor = conn.cursor()
+    for sql in TABLAS.values():
+        cursor.execute(sql)
+    conn.commit()
@@ -0,0 +1,257 @@
+# Almacenamiento tipado: tablas STRICT con fechas ISO y validaciones
+#
+# En una tabla STRICT SQLite rechaza los valores que no puede convertir sin
+# pérdida al tipo de la columna: un '' en un REAL o un texto en un INTEGER ya no
+# llegan a la base y los lectores no tienen que volver a convertir nada.
+# STRICT solo admite INTEGER, REAL, TEXT, BLOB y ANY, así que DATE, TIME y
+# VARCHAR pasan a TEXT, con un CHECK que exige el formato ISO en las fechas.
+# La conversión de los datos existentes no pierde nada: si un valor no se puede
+# llevar a su tipo (un texto en un INTEGER, un 2.5 en un INTEGER, una fecha que
+# no se entiende) la migración se detiene con un informe en vez de dejarlo en NULL.
+import math
+import sqlite3
+
+from . import hechos
+from .diccionarios import DICCIONARIOS
+from .esquema import TABLAS
+
+TIPOS = {
+    "INTEGER": "INTEGER",
+    "REAL": "REAL",
+    "TEXT": "TEXT",
+    "VARCHAR": "TEXT",
+    "DATE": "TEXT",
+    "TIME": "TEXT",
+}
+
+# La dosis se carga en l/ha con decimales: un INTEGER estricto la rechazaría. El
+# id del modelo es un código ('KJL', 'MRL'), aunque bases viejas lo declaren INTEGER
+TIPOS_CORREGIDOS = {
+    ("herbicida", "dose"): "REAL",
+    ("modelo_deteccion", "model_id"): "TEXT",
+}
+
+# (tabla, columna) -> condición que debe cumplir cada valor no nulo
+VALIDACIONES = {
+    ("ensayos", "test_date"): "date(test_date) IS test_date",
+    ("ensayos", "test_time"): "time(test_time) IS test_time",
+    ("modelo_deteccion", "sens"): "sens IN (1, 2, 3)",
+    ("modelo_deteccion", "tile"): "tile IN (1, 2, 3)",
+    ("resultados_malezas", "weed_applied"): "weed_applied IN (0, 1)",
+}
+
+# Fechas y horas: se llevan al formato ISO con la función de SQLite
+CONVERSIONES_FECHAS = {
+    ("ensayos", "test_date"): "date({c})",
+    ("ensayos", "test_time"): "time({c})",
+}
+
+# Cuántos valores de ejemplo muestra el informe por columna
+MAX_EJEMPLOS = 5
+
+
+def tablas_estrictas():
+    """Tablas que guardan datos cargados (malezas_flat se deriva de ellas)."""
+    return list(TABLAS) + list(DICCIONARIOS.values())
+
+
+def es_estricta(conn, tabla):
+    fila = conn.execute("SELECT strict FROM pragma_table_list WHERE name = ?", (tabla,)).fetchone()
+    return bool(fila and fila[0])
+
+
+def _tipo(tabla, columna, declarado):
+    return TIPOS_CORREGIDOS.get((tabla, columna)) or TIPOS[declarado.upper()]
+
+
+def definicion_estricta(conn, tabla, nombre_nuevo, en_cascada=()):
+    """
+    CREATE TABLE STRICT con las mismas columnas, claves y restricciones que `tabla`.
+    Las claves foráneas de las columnas de `en_cascada` pasan a ON DELETE CASCADE.
+    """
+    sql = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (tabla,)
+    ).fetchone()[0]
+    autoincremento = "AUTOINCREMENT" in sql.upper()
+    unicas = {
+        conn.execute(f"PRAGMA index_info({indice[1]})").fetchone()[2]
+        for indice in conn.execute(f"PRAGMA index_list({tabla})")
+        if indice[3] == "u" and len(conn.execute(f"PRAGMA index_info({indice[1]})").fetchall()) == 1
+    }
+
+    definiciones = []
+    for _, columna, declarado, no_nulo, defecto, pk in conn.execute(f"PRAGMA table_info({tabla})"):
+        definicion = f"{columna} {_tipo(tabla, columna, declarado)}"
+        if pk:
+            definicion += " PRIMARY KEY" + (" AUTOINCREMENT" if autoincremento else "")
+        if no_nulo:
+            definicion += " NOT NULL"
+        if defecto is not None:
+            definicion += f" DEFAULT {defecto}"
+        if columna in unicas:
+            definicion += " UNIQUE"
+        if (tabla, columna) in VALIDACIONES:
+            definicion += f" CHECK ({VALIDACIONES[(tabla, columna)]})"
+        definiciones.append(definicion)
+    # foreign_key_list las devuelve de la última declarada a la primera
+    for _, _, referida, origen, destino, _, al_borrar, _ in reversed(
+        conn.execute(f"PRAGMA foreign_key_list({tabla})").fetchall()
+    ):
+        clave = f"FOREIGN KEY ({origen}) REFERENCES {referida}({destino})"
+        accion = "CASCADE" if origen in en_cascada else al_borrar
+        if accion != "NO ACTION":
+            clave += f" ON DELETE {accion}"
+        definiciones.append(clave)
+
+    return f"CREATE TABLE {nombre_nuevo} (\n    " + ",\n    ".join(definiciones) + "\n) STRICT"
+
+
+def _convertir(valor, tipo):
+    # `valor` llevado a `tipo` sin pérdida; ValueError si no se puede. Un texto
+    # vacío en una columna numérica es un valor que falta: pasa a NULL
+    if isinstance(valor, bytes):
+        raise ValueError(valor)
+    if isinstance(valor, str):
+        if not valor.strip():
+            return None
+        if tipo == "INTEGER":
+            try:
+                return int(valor)
+            except ValueError:
+                valor = float(valor)
+        else:
+            valor = float(valor)
+    if not math.isfinite(valor):
+        raise ValueError(valor)
+    if tipo == "INTEGER":
+        if valor != int(valor):
+            raise ValueError(valor)
+        return int(valor)
+    if float(valor) != valor:
+        raise ValueError(valor)
+    return float(valor)
+
+
+def convertir_valores(conn, tabla):
+    """
+    Lleva en el lugar los valores de `tabla` a su tipo y formato, solo cuando la
+    conversión no pierde nada (un 3.0 a 3 en un INTEGER, un '12.5' a 12.5 en un
+    REAL, una fecha a ISO). Los que no se pueden convertir o no cumplen la
+    validación no se tocan: se devuelven para que el llamador no siga.
+
+    Returns:
+        list: (tabla, columna, cantidad, ejemplos) de cada columna con valores que no se pueden convertir
+    """
+    problemas = []
+    for _, columna, declarado, _, _, pk in conn.execute(f"PRAGMA table_info({tabla})").fetchall():
+        if pk:
+            continue
+        tipo = _tipo(tabla, columna, declarado)
+        invalidos = {}
+        if (tabla, columna) in CONVERSIONES_FECHAS:
+            expresion = CONVERSIONES_FECHAS[(tabla, columna)].format(c=columna)
+            invalidos.update(conn.execute(f"""
+                SELECT rowid, {columna} FROM {tabla}
+                WHERE {expresion} IS NULL AND {columna} IS NOT NULL AND trim({columna}) <> ''
+            """))
+            conn.execute(f"""
+                UPDATE {tabla} SET {columna} = {expresion}
+                WHERE {columna} IS NOT {expresion} AND ({expresion} IS NOT NULL OR trim({columna}) = '')
+            """)
+        elif tipo == "TEXT":
+            invalidos.update(conn.execute(
+                f"SELECT rowid, {columna} FROM {tabla} WHERE typeof({columna}) = 'blob'"
+            ))
+            conn.execute(
+                f"UPDATE {tabla} SET {columna} = CAST({columna} AS TEXT) "
+                f"WHERE typeof({columna}) IN ('integer', 'real')"
+            )
+        else:
+            filas = conn.execute(f"""
+                SELECT rowid, {columna} FROM {tabla}
+                WHERE typeof({columna}) NOT IN ('null', ?)
+            """, (tipo.lower(),)).fetchall()
+            convertidos = []
+            for fila, valor in filas:
+                try:
+                    convertidos.append((_convertir(valor, tipo), fila))
+                except (ValueError, OverflowError):
+                    invalidos[fila] = valor
+            conn.executemany(f"UPDATE {tabla} SET {columna} = ? WHERE rowid = ?", convertidos)
+        if (tabla, columna) in VALIDACIONES:
+            invalidos.update(conn.execute(f"""
+                SELECT rowid, {columna} FROM {tabla}
+                WHERE {columna} IS NOT NULL AND NOT ({VALIDACIONES[(tabla, columna)]})
+            """))
+        if invalidos:
+            problemas.append((tabla, columna, len(invalidos), list(dict.fromkeys(invalidos.values()))[:MAX_EJEMPLOS]))
+    return problemas
+
+
+def informe_problemas(problemas):
+    """Texto del error con las columnas que tienen valores que no se pueden convertir."""
+    lineas = [
+        f"  {tabla}.{columna}: {cantidad} valores, por ejemplo {', '.join(repr(v) for v in ejemplos)}"
+        for tabla, columna, cantidad, ejemplos in problemas
+    ]
+    return ("hay valores que no se pueden convertir sin pérdida a las tablas STRICT; "
+            "corregirlos y volver a migrar:\n" + "\n".join(lineas))
+
+
+def reemplazar_tabla(conn, tabla, definicion):
+    """
+    Reemplaza `tabla` por la que crea `definicion` (un CREATE TABLE de {tabla}_nueva)
+    conservando filas, secuencia, índices y triggers. Las claves foráneas tienen que
+    estar desactivadas: el DROP de una tabla referenciada borraría en cascada.
+    """
+    objetos = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL",
+        (tabla,)
+    ).fetchall()
+    secuencia = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (tabla,)).fetchone()
+
+    nueva = f"{tabla}_nueva"
+    conn.execute(definicion)
+    columnas = ", ".join(fila[1] for fila in conn.execute(f"PRAGMA table_info({tabla})"))
+    conn.execute(f"INSERT INTO {nueva} ({columnas}) SELECT {columnas} FROM {tabla}")
+    conn.execute(f"DROP TABLE {tabla}")
+    conn.execute(f"ALTER TABLE {nueva} RENAME TO {tabla}")
+
+    if secuencia:
+        conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (secuencia[0], tabla))
+    for (sql,) in objetos:
+        conn.execute(sql)
+
+
+def hacer_estricta(conn, tabla):
+    """
+    Reconstruye `tabla` como STRICT conservando filas, secuencia, índices y triggers
+    (idempotente). Los valores se convierten antes con convertir_valores; si alguno
+    no se puede convertir no se reconstruye nada y se lanza IntegrityError.
+    """
+    if es_estricta(conn, tabla):
+        return
+    problemas = convertir_valores(conn, tabla)
+    if problemas:
+        raise sqlite3.IntegrityError(informe_problemas(problemas))
+    reemplazar_tabla(conn, tabla, definicion_estricta(conn, tabla, f"{tabla}_nueva"))
+
+
+def convertir_base(conn):
+    """
+    Pasa todas las tablas de datos a STRICT y vuelve a armar malezas_flat. Primero
+    convierte los valores de todas las tablas: si alguno no se puede convertir sin
+    pérdida lanza IntegrityError con el informe, antes de reconstruir nada (migrar
+    deshace la transacción). Los triggers de malezas_flat se quitan antes porque
+    leen las tablas que se reconstruyen.
+    """
+    tablas = [tabla for tabla in tablas_estrictas() if not es_estricta(conn, tabla)]
+    problemas = [problema for tabla in tablas for problema in convertir_valores(conn, tabla)]
+    if problemas:
+        raise sqlite3.IntegrityError(informe_problemas(problemas))
+    for nombre in hechos.TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+    for tabla in tablas:
+        reemplazar_tabla(conn, tabla, definicion_estricta(conn, tabla, f"{tabla}_nueva"))
+    hechos.reconstruir(conn)
+
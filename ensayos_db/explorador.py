@@ -0,0 +1,137 @@
+# Exploración paginada de tablas (pestaña de desarrollo)
+#
+# Cada página es un SELECT ... WHERE clave > ? ORDER BY clave LIMIT n sobre la
+# clave primaria entera (paginación por clave, no OFFSET): cuesta lo mismo en la
+# primera página que en la página mil y en memoria hay solo una página. Los
+# filtros por columna se resuelven en SQL. El total se cuenta hasta TOPE_CONTEO;
+# más allá se usa la estimación de sqlite_stat1 si la base tiene ANALYZE.
+#
+# Con el archivo adjunto (ver archivo.py) la página se arma con n filas de cada
+# base, mezcladas por (clave, base): el cursor recuerda ambas.
+from .archivo import ESQUEMA, adjuntar_archivo
+
+FILAS_POR_PAGINA = 50
+TOPE_CONTEO = 100_000
+
+# operador -> (condición sobre la columna, cómo se pasa el valor; None = sin valor)
+OPERADORES_FILTRO = {
+    "=": ("{columna} = ?", lambda valor: valor),
+    "≠": ("{columna} IS NOT ?", lambda valor: valor),
+    ">": ("{columna} > ?", lambda valor: valor),
+    ">=": ("{columna} >= ?", lambda valor: valor),
+    "<": ("{columna} < ?", lambda valor: valor),
+    "<=": ("{columna} <= ?", lambda valor: valor),
+    "contiene": ("{columna} LIKE ?", lambda valor: f"%{valor}%"),
+    "vacío": ("{columna} IS NULL", None),
+    "no vacío": ("{columna} IS NOT NULL", None),
+}
+
+
+def columnas_tabla(conn, tabla):
+    return [fila[1] for fila in conn.execute(f"PRAGMA table_info({tabla})")]
+
+
+def clave(conn, tabla):
+    """Columna por la que se pagina: la clave primaria entera (alias de rowid) o rowid."""
+    primarias = [fila for fila in conn.execute(f"PRAGMA table_info({tabla})") if fila[5]]
+    if len(primarias) == 1 and primarias[0][2].upper() == "INTEGER":
+        return primarias[0][1]
+    return "rowid"
+
+
+def _esquemas(conn, incluir_archivo):
+    return ("main", ESQUEMA) if incluir_archivo and adjuntar_archivo(conn) else ("main",)
+
+
+def condicion_filtros(conn, tabla, filtros):
+    """
+    WHERE de los filtros [(columna, operador, valor)], todos a la vez. Las columnas
+    se validan contra la tabla y los valores van como parámetros: la afinidad de
+    la columna convierte '5' en 5 al comparar con una columna numérica.
+
+    Returns:
+        tuple: (condición SQL, parámetros)
+    """
+    existentes = set(columnas_tabla(conn, tabla))
+    condiciones = ["1"]
+    params = []
+    for columna, operador, valor in filtros:
+        if columna not in existentes:
+            raise ValueError(f"la tabla {tabla} no tiene la columna {columna}")
+        if operador not in OPERADORES_FILTRO:
+            raise ValueError(f"operador desconocido: {operador}")
+        plantilla, parametro = OPERADORES_FILTRO[operador]
+        condiciones.append(plantilla.format(columna=columna))
+        if parametro is not None:
+            params.append(parametro(valor))
+    return " AND ".join(condiciones), params
+
+
+def pagina_tabla(conn, tabla, filtros=(), despues_de=None, incluir_archivo=False, limite=FILAS_POR_PAGINA):
+    """
+    Una página de `tabla` ordenada por su clave. `despues_de` es el cursor que
+    devolvió la página anterior (None para la primera). Con incluir_archivo las
+    filas llevan primero el nombre de la base de origen.
+
+    Returns:
+        tuple: (nombres de columnas, filas, cursor de la página siguiente o None si es la última)
+    """
+    esquemas = _esquemas(conn, incluir_archivo)
+    orden = clave(conn, tabla)
+    condicion, params = condicion_filtros(conn, tabla, filtros)
+    candidatas = []
+    for indice, esquema in enumerate(esquemas):
+        consulta, valores = condicion, list(params)
+        if despues_de is not None:
+            # Tras (clave, base) siguen las claves mayores y, en las bases posteriores, las iguales
+            ultima, base = despues_de
+            consulta += f" AND {orden} {'>=' if indice > base else '>'} ?"
+            valores.append(ultima)
+        filas = conn.execute(
+            f"SELECT {orden}, * FROM {esquema}.{tabla} WHERE {consulta} ORDER BY {orden} LIMIT ?",
+            valores + [limite + 1]
+        ).fetchall()
+        candidatas.extend((fila[0], indice, fila[1:]) for fila in filas)
+
+    candidatas.sort(key=lambda candidata: candidata[:2])
+    visibles = candidatas[:limite]
+    siguiente = tuple(visibles[-1][:2]) if len(candidatas) > limite else None
+    nombres = columnas_tabla(conn, tabla)
+    if len(esquemas) > 1:
+        return ["base"] + nombres, [(esquemas[indice], *fila) for _, indice, fila in visibles], siguiente
+    return nombres, [fila for _, _, fila in visibles], siguiente
+
+
+def _estimacion(conn, tabla, esquema):
+    # sqlite_stat1 existe solo si se corrió ANALYZE; su primer número es la cantidad de filas
+    if not conn.execute(
+        f"SELECT 1 FROM {esquema}.sqlite_master WHERE name = 'sqlite_stat1'"
+    ).fetchone():
+        return None
+    fila = conn.execute(f"SELECT stat FROM {esquema}.sqlite_stat1 WHERE tbl = ? LIMIT 1", (tabla,)).fetchone()
+    return int(fila[0].split()[0]) if fila else None
+
+
+def contar_filas(conn, tabla, filtros=(), incluir_archivo=False, tope=TOPE_CONTEO):
+    """
+    Cantidad de filas que cumplen los filtros, contando como mucho `tope` por base.
+    Si alguna base pasa el tope, sin filtros se usa la estimación de sqlite_stat1
+    y, si no hay, el resultado es el tope.
+
+    Returns:
+        tuple: (cantidad, exacta)
+    """
+    condicion, params = condicion_filtros(conn, tabla, filtros)
+    total = 0
+    exacta = True
+    for esquema in _esquemas(conn, incluir_archivo):
+        cantidad = conn.execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM {esquema}.{tabla} WHERE {condicion} LIMIT ?)",
+            params + [tope + 1]
+        ).fetchone()[0]
+        if cantidad > tope:
+            exacta = False
+            estimacion = None if filtros else _estimacion(conn, tabla, esquema)
+            cantidad = max(estimacion or 0, tope)
+        total += cantidad
+    return total, exacta
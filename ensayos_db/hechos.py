@@ -0,0 +1,235 @@
+# Tabla de hechos desnormalizada malezas_flat, mantenida por triggers
+#
+# Cada fila de resultados_malezas tiene su fila en malezas_flat con todas las
+# dimensiones que usa el dashboard (velocidad, sensibilidad, baldosa, cultivo,
+# viento, fecha, cliente, módulo y finca), así Dash lee una sola tabla en vez
+# de repetir el LEFT JOIN de 8 tablas en cada carga.
+
+COLUMNAS = [
+    "id", "ensayo_id", "uploader", "weed_diameter", "size", "height",
+    "weed_placement", "weed_type", "weed_name", "weed_applied",
+    "speed", "sensitivity", "tile", "crop_specie", "wind_speed",
+    "fecha_ensayo", "cliente", "modules_id", "farm",
+    "uploader_id", "weed_placement_id", "weed_type_id", "weed_name_id"
+]
+
+SQL_TABLA = """
+CREATE TABLE IF NOT EXISTS malezas_flat (
+    id INTEGER PRIMARY KEY,
+    ensayo_id INTEGER,
+    uploader TEXT,
+    weed_diameter REAL,
+    size REAL,
+    height REAL,
+    weed_placement TEXT,
+    weed_type TEXT,
+    weed_name TEXT,
+    weed_applied INTEGER,
+    speed REAL,
+    sensitivity INTEGER,
+    tile INTEGER,
+    crop_specie TEXT,
+    wind_speed REAL,
+    fecha_ensayo DATE,
+    cliente TEXT,
+    modules_id VARCHAR,
+    farm TEXT,
+    uploader_id INTEGER,
+    weed_placement_id INTEGER,
+    weed_type_id INTEGER,
+    weed_name_id INTEGER
+)"""
+
+# Por ensayo y especie: sirve a los triggers que actualizan por ensayo_id y a los de
+# la búsqueda, que preguntan si el ensayo ya tiene otra maleza de la misma especie
+SQL_INDICE = "CREATE INDEX IF NOT EXISTS idx_malezas_flat_ensayo ON malezas_flat(ensayo_id, weed_name_id)"
+
+# Índices para los filtros que el dashboard resuelve en SQL (fechas y módulos)
+INDICES_FILTROS = {
+    "idx_malezas_flat_fecha": "CREATE INDEX IF NOT EXISTS idx_malezas_flat_fecha ON malezas_flat(fecha_ensayo)",
+    "idx_malezas_flat_modulo": "CREATE INDEX IF NOT EXISTS idx_malezas_flat_modulo ON malezas_flat(modules_id)",
+}
+
+# Fuente de verdad: el mismo join que hacía obtener_datos_malezas, más los
+# diccionarios de textos (ver diccionarios.py)
+SELECT_JOIN = """
+    SELECT
+        r.id,
+        r.ensayo_id,
+        up.valor,
+        r.weed_diameter,
+        r.size,
+        r.height,
+        ub.valor,
+        ti.valor,
+        nm.valor,
+        r.weed_applied,
+        p.speed,
+        m.sens,
+        m.tile,
+        c.crop_specie,
+        ca.wind_speed,
+        e.test_date,
+        cli.name,
+        cli.modules_id,
+        u.farm,
+        r.uploader_id,
+        r.weed_placement_id,
+        r.weed_type_id,
+        r.weed_name_id
+    FROM resultados_malezas r
+    LEFT JOIN uploaders up ON r.uploader_id = up.id
+    LEFT JOIN ubicaciones_maleza ub ON r.weed_placement_id = ub.id
+    LEFT JOIN tipos_maleza ti ON r.weed_type_id = ti.id
+    LEFT JOIN nombres_maleza nm ON r.weed_name_id = nm.id
+    LEFT JOIN ensayos e ON r.ensayo_id = e.ensayo_id
+    LEFT JOIN clientes cli ON e.cliente_id = cli.cliente_id
+    LEFT JOIN ubicacion u ON r.ensayo_id = u.ensayo_id
+    LEFT JOIN pulverizadora p ON r.ensayo_id = p.ensayo_id
+    LEFT JOIN modelo_deteccion m ON r.ensayo_id = m.ensayo_id
+    LEFT JOIN condiciones_ambientales ca ON r.ensayo_id = ca.ensayo_id
+    LEFT JOIN cultivo c ON r.ensayo_id = c.ensayo_id
+"""
+
+# Tablas hijas de ensayos (1 fila por ensayo): columna en malezas_flat -> columna en la tabla
+DIMENSIONES = {
+    "ubicacion": {"farm": "farm"},
+    "pulverizadora": {"speed": "speed"},
+    "modelo_deteccion": {"sensitivity": "sens", "tile": "tile"},
+    "condiciones_ambientales": {"wind_speed": "wind_speed"},
+    "cultivo": {"crop_specie": "crop_specie"},
+}
+
+
+def _asignaciones(columnas, fila):
+    return ", ".join(f"{destino} = {fila}.{origen}" for destino, origen in columnas.items())
+
+
+def _nulos(columnas):
+    return ", ".join(f"{destino} = NULL" for destino in columnas)
+
+
+def _triggers():
+    insertar = f"INSERT OR REPLACE INTO malezas_flat ({', '.join(COLUMNAS)}) {SELECT_JOIN}"
+    triggers = {
+        # Resultados: una fila de hechos por maleza
+        "trg_flat_malezas_ins": f"""
+            AFTER INSERT ON resultados_malezas BEGIN
+                {insertar} WHERE r.id = NEW.id;
+            END""",
+        "trg_flat_malezas_upd": f"""
+            AFTER UPDATE ON resultados_malezas BEGIN
+                DELETE FROM malezas_flat WHERE id = OLD.id;
+                {insertar} WHERE r.id = NEW.id;
+            END""",
+        "trg_flat_malezas_del": """
+            AFTER DELETE ON resultados_malezas BEGIN
+                DELETE FROM malezas_flat WHERE id = OLD.id;
+            END""",
+
+        # Ensayos: fecha y cliente
+        "trg_flat_ensayos_ins": """
+            AFTER INSERT ON ensayos BEGIN
+                UPDATE malezas_flat SET
+                    fecha_ensayo = NEW.test_date,
+                    cliente = (SELECT name FROM clientes WHERE cliente_id = NEW.cliente_id),
+                    modules_id = (SELECT modules_id FROM clientes WHERE cliente_id = NEW.cliente_id)
+                WHERE ensayo_id = NEW.ensayo_id;
+            END""",
+        "trg_flat_ensayos_upd": """
+            AFTER UPDATE ON ensayos BEGIN
+                UPDATE malezas_flat SET fecha_ensayo = NULL, cliente = NULL, modules_id = NULL
+                WHERE ensayo_id = OLD.ensayo_id AND OLD.ensayo_id IS NOT NEW.ensayo_id;
+                UPDATE malezas_flat SET
+                    fecha_ensayo = NEW.test_date,
+                    cliente = (SELECT name FROM clientes WHERE cliente_id = NEW.cliente_id),
+                    modules_id = (SELECT modules_id FROM clientes WHERE cliente_id = NEW.cliente_id)
+                WHERE ensayo_id = NEW.ensayo_id;
+            END""",
+        "trg_flat_ensayos_del": """
+            AFTER DELETE ON ensayos BEGIN
+                UPDATE malezas_flat SET fecha_ensayo = NULL, cliente = NULL, modules_id = NULL
+                WHERE ensayo_id = OLD.ensayo_id;
+            END""",
+
+        # Clientes: nombre y módulos de todos sus ensayos
+        "trg_flat_clientes_upd": """
+            AFTER UPDATE ON clientes BEGIN
+                UPDATE malezas_flat SET cliente = NULL, modules_id = NULL
+                WHERE ensayo_id IN (SELECT ensayo_id FROM ensayos WHERE cliente_id = OLD.cliente_id)
+                AND OLD.cliente_id IS NOT NEW.cliente_id;
+                UPDATE malezas_flat SET cliente = NEW.name, modules_id = NEW.modules_id
+                WHERE ensayo_id IN (SELECT ensayo_id FROM ensayos WHERE cliente_id = NEW.cliente_id);
+            END""",
+        "trg_flat_clientes_del": """
+            AFTER DELETE ON clientes BEGIN
+                UPDATE malezas_flat SET cliente = NULL, modules_id = NULL
+                WHERE ensayo_id IN (SELECT ensayo_id FROM ensayos WHERE cliente_id = OLD.cliente_id);
+            END""",
+    }
+
+    # Tablas hijas de ensayos
+    for tabla, columnas in DIMENSIONES.items():
+        triggers[f"trg_flat_{tabla}_ins"] = f"""
+            AFTER INSERT ON {tabla} BEGIN
+                UPDATE malezas_flat SET {_asignaciones(columnas, 'NEW')} WHERE ensayo_id = NEW.ensayo_id;
+            END"""
+        triggers[f"trg_flat_{tabla}_upd"] = f"""
+            AFTER UPDATE ON {tabla} BEGIN
+                UPDATE malezas_flat SET {_nulos(columnas)}
+                WHERE ensayo_id = OLD.ensayo_id AND OLD.ensayo_id IS NOT NEW.ensayo_id;
+                UPDATE malezas_flat SET {_asignaciones(columnas, 'NEW')} WHERE ensayo_id = NEW.ensayo_id;
+            END"""
+        triggers[f"trg_flat_{tabla}_del"] = f"""
+            AFTER DELETE ON {tabla} BEGIN
+                UPDATE malezas_flat SET {_nulos(columnas)} WHERE ensayo_id = OLD.ensayo_id;
+            END"""
+    return triggers
+
+
+TRIGGERS = _triggers()
+
+
+def crear_estructura(conn):
+    """Crea malezas_flat, su índice y los triggers que la mantienen (idempotente)."""
+    conn.execute(SQL_TABLA)
+    conn.execute(SQL_INDICE)
+    for nombre, cuerpo in TRIGGERS.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+        conn.execute(f"CREATE TRIGGER {nombre} {cuerpo}")
+
+
+def crear_indices_filtros(conn):
+    for sql in INDICES_FILTROS.values():
+        conn.execute(sql)
+
+
+def reconstruir(conn):
+    """
+    Vuelve a llenar malezas_flat desde las tablas normalizadas.
+    Se usa al migrar una base existente o si la verificación encuentra diferencias.
+
+    Returns:
+        int: cantidad de filas en malezas_flat
+    """
+    crear_estructura(conn)
+    conn.execute("DELETE FROM malezas_flat")
+    conn.execute(f"INSERT INTO malezas_flat ({', '.join(COLUMNAS)}) {SELECT_JOIN}")
+    return conn.execute("SELECT COUNT(*) FROM malezas_flat").fetchone()[0]
+
+
+def verificar(conn):
+    """
+    Compara malezas_flat contra el join de las tablas normalizadas.
+
+    Returns:
+        tuple: (filas que faltan o difieren en malezas_flat, filas sobrantes en malezas_flat)
+    """
+    columnas = ", ".join(COLUMNAS)
+    faltantes = conn.execute(
+        f"SELECT COUNT(*) FROM ({SELECT_JOIN} EXCEPT SELECT {columnas} FROM malezas_flat)"
+    ).fetchone()[0]
+    sobrantes = conn.execute(
+        f"SELECT COUNT(*) FROM (SELECT {columnas} FROM malezas_flat EXCEPT {SELECT_JOIN})"
+    ).fetchone()[0]
+    return faltantes, sobrantes
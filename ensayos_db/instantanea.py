@@ -0,0 +1,268 @@
+# Instantánea de solo lectura de la base para el dashboard
+#
+# Dash no lee la base viva en la que escribe Streamlit sino una copia compacta
+# (<base>_instantanea.db) que se publica con VACUUM INTO después de cada tanda
+# de escrituras. La copia se escribe en un archivo temporal de nombre único (dos
+# publicadores no se pisan) y reemplaza a la anterior con os.replace, que es
+# atómico: las conexiones abiertas siguen leyendo el archivo viejo hasta que se
+# reabren. Como el archivo publicado no cambia
+# nunca, se abre con mode=ro&immutable=1: SQLite no toma bloqueos ni busca WAL,
+# y las consultas del dashboard no compiten con los envíos.
+#
+# La base fría (ver archivo.py) se publica, solo cuando cambió, en un archivo
+# nuevo por generación (<base>_instantanea_archivo.<sufijo>.db) que no se
+# reemplaza nunca. La instantánea de la base guarda en su tabla `instantanea` el
+# nombre de la del archivo que le corresponde: un lector que abre una instantánea
+# adjunta siempre la del archivo publicada con ella, nunca una de otra generación.
+import glob
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+from .archivo import ESQUEMA, adjuntar_archivo, archivo_de
+from .cambios import SenalCambios, senal_cambios
+from .conexion import CACHE_SIZE_KIB, DB_PATH, MMAP_SIZE, PoolConexiones, abrir_conexion
+from .migraciones import asegurar_esquema
+
+logger = logging.getLogger(__name__)
+
+
+def ruta_instantanea(ruta=None):
+    """Archivo de la instantánea de la base `ruta`: <base>_instantanea.db en la misma carpeta."""
+    return os.path.splitext(os.path.abspath(ruta or DB_PATH))[0] + "_instantanea.db"
+
+
+def _identidad(ruta):
+    # Cada publicación es un archivo nuevo (otro inodo), aunque tenga el mismo tamaño
+    try:
+        estado = os.stat(ruta)
+    except FileNotFoundError:
+        return None
+    return estado.st_ino, estado.st_mtime_ns, estado.st_size
+
+
+# Las instantáneas del archivo que ya no son la publicada se borran pasado este
+# tiempo: un lector que acaba de abrir la instantánea anterior todavía la adjunta
+RETENCION_S = 60
+
+
+def version_instantanea(ruta):
+    """Cambia cada vez que se publica la instantánea `ruta` (con o sin otra de su archivo)."""
+    return _identidad(ruta)
+
+
+def _prefijo_archivo(ruta):
+    # Las generaciones de la instantánea del archivo: <base>_instantanea_archivo.<sufijo>.db
+    return os.path.splitext(archivo_de(ruta))[0] + "."
+
+
+def _archivo_asociado(conn, ruta):
+    # El nombre que guardó la instantánea abierta en `conn`, no el de la publicada ahora
+    try:
+        fila = conn.execute("SELECT archivo FROM instantanea").fetchone()
+    except sqlite3.OperationalError:
+        # Publicada por una versión anterior, sin archivo asociado
+        return None
+    return os.path.join(os.path.dirname(ruta), fila[0]) if fila and fila[0] else None
+
+
+def archivo_publicado(ruta):
+    """Instantánea del archivo que corresponde a la instantánea `ruta`, o None si no tiene."""
+    conn = sqlite3.connect(_uri_solo_lectura(ruta), uri=True)
+    try:
+        return _archivo_asociado(conn, ruta)
+    finally:
+        conn.close()
+
+
+def _uri_solo_lectura(ruta):
+    return f"file:{quote(os.path.abspath(ruta))}?mode=ro&immutable=1"
+
+
+def abrir_instantanea(ruta):
+    """
+    Abre la instantánea `ruta` de solo lectura e inmutable, con la de su archivo
+    ya adjunta si existe (un ATTACH común sería de lectura y escritura).
+    """
+    while True:
+        conn = sqlite3.connect(_uri_solo_lectura(ruta), uri=True, check_same_thread=False)
+        conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+        conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        archivo = _archivo_asociado(conn, ruta)
+        if archivo is None:
+            return conn
+        try:
+            conn.execute(f"ATTACH DATABASE ? AS {ESQUEMA}", (_uri_solo_lectura(archivo),))
+            return conn
+        except sqlite3.OperationalError:
+            # Se abrió una instantánea vieja cuyo archivo ya se borró: se abre la publicada
+            conn.close()
+            if os.path.exists(archivo) or archivo_publicado(ruta) == archivo:
+                raise
+
+
+def _copiar(conn, esquema, prefijo, sufijo):
+    """
+    Copia el esquema `esquema` de `conn` a un archivo nuevo de nombre único
+    `prefijo`...`sufijo` en la carpeta de `prefijo` y devuelve su ruta.
+    """
+    # VACUUM INTO escribe una copia compacta y consistente (ya en modo rollback,
+    # sin WAL); acepta un archivo vacío como el que crea mkstemp
+    descriptor, temporal = tempfile.mkstemp(
+        dir=os.path.dirname(prefijo), prefix=os.path.basename(prefijo), suffix=sufijo
+    )
+    os.close(descriptor)
+    try:
+        os.chmod(temporal, 0o644)
+        conn.execute(f"VACUUM {esquema} INTO ?", (temporal,))
+    except BaseException:
+        os.remove(temporal)
+        raise
+    return temporal
+
+
+class PublicadorInstantanea:
+    """
+    Publica la instantánea de una base y la vuelve a publicar cada vez que la
+    señal de cambios de la base detecta escrituras (varios commits seguidos dan
+    una sola publicación). Usa una conexión propia, que solo lee.
+    """
+
+    def __init__(self, ruta=None):
+        self.ruta = os.path.abspath(ruta or DB_PATH)
+        self.destino = ruta_instantanea(self.ruta)
+        self._conn = None
+        self._version_archivo = None
+        self._archivo = None
+        self._lock = threading.Lock()
+
+    def publicar(self):
+        """
+        Publica la instantánea de la base junto con la de su archivo: la del
+        archivo se copia de nuevo solo si cambió, y queda publicada cuando lo
+        queda la de la base que la nombra.
+        """
+        with self._lock:
+            if self._conn is None:
+                self._conn = abrir_conexion(self.ruta)
+            if adjuntar_archivo(self._conn):
+                # data_version del archivo cambia cuando otra conexión escribe en él (archivar)
+                version = self._conn.execute(f"PRAGMA {ESQUEMA}.data_version").fetchone()[0]
+                if version != self._version_archivo or not os.path.exists(self._archivo or ""):
+                    self._archivo = _copiar(self._conn, ESQUEMA, _prefijo_archivo(self.destino), ".db")
+                    self._version_archivo = version
+            else:
+                self._archivo = None
+
+            temporal = _copiar(self._conn, "main", self.destino + ".", ".tmp")
+            try:
+                copia = sqlite3.connect(temporal)
+                try:
+                    copia.execute("CREATE TABLE instantanea (archivo TEXT)")
+                    copia.execute(
+                        "INSERT INTO instantanea VALUES (?)",
+                        (self._archivo and os.path.basename(self._archivo),)
+                    )
+                    copia.commit()
+                finally:
+                    copia.close()
+                if self._archivo:
+                    # Otro publicador borra las del archivo que no se usaron en RETENCION_S
+                    os.utime(self._archivo)
+                os.replace(temporal, self.destino)
+            except BaseException:
+                os.remove(temporal)
+                raise
+            self._limpiar()
+        return self.destino
+
+    def _limpiar(self):
+        # Instantáneas del archivo que ya no son la publicada y temporales de
+        # publicaciones interrumpidas, pasada la retención (otro publicador puede
+        # estar por publicar la suya)
+        vigente = archivo_publicado(self.destino)
+        limite = time.time() - RETENCION_S
+        viejos = glob.glob(glob.escape(_prefijo_archivo(self.destino)) + "*.db")
+        viejos += glob.glob(glob.escape(self.destino + ".") + "*.tmp")
+        # La de las versiones que la publicaban con nombre fijo
+        viejos.append(archivo_de(self.destino))
+        for ruta in viejos:
+            if ruta in (vigente, self._archivo):
+                continue
+            try:
+                if os.path.getmtime(ruta) < limite:
+                    os.remove(ruta)
+            except OSError:
+                # Ya la borró otro publicador, o un lector la tiene abierta (Windows)
+                pass
+
+    def iniciar(self):
+        """
+        Migra la base, publica la primera instantánea y se suscribe a la señal de
+        cambios. La señal se crea antes de publicar: una escritura que llegue
+        mientras tanto genera otra publicación.
+        """
+        asegurar_esquema(self.ruta)
+        senal_cambios(self.ruta).suscribir(self._al_cambiar)
+        self.publicar()
+        return self
+
+    def _al_cambiar(self, generacion):
+        # Corre en el hilo de la señal: un error no debe detenerlo, queda la instantánea anterior
+        try:
+            self.publicar()
+        except (sqlite3.Error, OSError):
+            logger.exception("No se pudo publicar la instantánea de %s", self.ruta)
+
+
+class SenalInstantanea(SenalCambios):
+    """
+    SenalCambios que avanza cuando se publica otra instantánea (el archivo cambia),
+    no cuando se escribe la base viva: los cachés se vacían recién cuando los datos
+    nuevos se pueden leer.
+    """
+
+    def _leer_version(self):
+        return version_instantanea(self.ruta)
+
+
+_publicadores = {}
+_senales = {}
+_pools = {}
+_lock = threading.Lock()
+
+
+def publicador_instantanea(ruta=None):
+    """Devuelve el publicador compartido del proceso para la base `ruta`, ya iniciado."""
+    clave = os.path.abspath(ruta or DB_PATH)
+    with _lock:
+        if clave not in _publicadores:
+            _publicadores[clave] = PublicadorInstantanea(clave).iniciar()
+        return _publicadores[clave]
+
+
+def senal_instantanea(ruta=None):
+    """Señal compartida de las publicaciones de la instantánea de la base `ruta`, ya iniciada."""
+    destino = publicador_instantanea(ruta).destino
+    with _lock:
+        if destino not in _senales:
+            _senales[destino] = SenalInstantanea(destino).iniciar()
+        return _senales[destino]
+
+
+def obtener_instantanea(ruta=None):
+    """
+    Devuelve la conexión de solo lectura del hilo actual a la instantánea de la
+    base `ruta` (se reabre sola cuando se publica otra). No debe cerrarse.
+    """
+    destino = publicador_instantanea(ruta).destino
+    with _lock:
+        if destino not in _pools:
+            _pools[destino] = PoolConexiones(destino, abrir=abrir_instantanea, version=version_instantanea)
+        pool = _pools[destino]
+    return pool.conexion_del_hilo()
@@ -0,0 +1,147 @@
+# Inserción en bloque de los resultados de malezas de un ensayo
+#
+# La planilla estandarizada se convierte columna por columna (no fila por fila
+# con iterrows) y se inserta con un solo executemany dentro de la transacción
+# del envío. Los textos se guardan como ids de diccionario (ver diccionarios.py).
+# Una planilla grande se inserta de a bloques (insertar_malezas_en_bloques), con
+# un executemany por bloque en la misma transacción. Una fila con un valor
+# inválido no se pierde en silencio: el envío entero se rechaza (FilasInvalidas)
+# con los números de fila para que se corrija la planilla.
+import pandas as pd
+
+from .diccionarios import DICCIONARIOS, obtener_ids
+
+COLUMNAS_NUMERICAS = ["weed_diameter", "size", "height"]
+COLUMNAS_TEXTO = ["weed_placement", "weed_type", "weed_name"]
+VALORES_APLICADO = [0, 1]
+# Cuántos números de fila inválida se informan (el resto solo se cuenta)
+MAX_FILAS_INFORMADAS = 20
+
+SQL_INSERTAR = """
+    INSERT INTO resultados_malezas (
+        ensayo_id, uploader_id, weed_diameter, size, height,
+        weed_placement_id, weed_type_id, weed_name_id, weed_applied
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+
+def _columna(df, nombre):
+    # Una columna que falta en la planilla se inserta vacía
+    if nombre in df.columns:
+        return df[nombre]
+    return pd.Series(None, index=df.index, dtype=object)
+
+
+def _sin_nulos(serie, valores):
+    return valores.astype(object).where(serie.notna(), None)
+
+
+class FilasInvalidas(ValueError):
+    """
+    La planilla tiene filas con valores que resultados_malezas (STRICT) rechazaría.
+    `filas` son los números de las primeras MAX_FILAS_INFORMADAS, como en el CSV
+    (el encabezado es la fila 1).
+    """
+
+    def __init__(self, cantidad, filas):
+        self.cantidad = cantidad
+        self.filas = filas
+        lista = ", ".join(str(fila) for fila in filas) + (", ..." if cantidad > len(filas) else "")
+        super().__init__(
+            f"{cantidad} filas de la planilla tienen valores inválidos (filas {lista}): no se guardó el envío"
+        )
+
+
+def _filas_csv(indices):
+    # El índice de la planilla cuenta las filas de datos desde 0; en el CSV el encabezado es la fila 1
+    return [int(indice) + 2 for indice in indices]
+
+
+def preparar_filas(cursor, df, ensayo_id, uploader):
+    """
+    Convierte la planilla estandarizada en las tuplas de resultados_malezas.
+
+    Las columnas numéricas pasan a float, weed_applied a 0/1 y las de texto a su
+    id de diccionario (dando de alta los textos nuevos); los vacíos quedan en None.
+    Las filas con un valor inválido no se convierten: se devuelven aparte para
+    que el llamador rechace el envío (la tabla es STRICT y las rechazaría).
+
+    Returns:
+        tuple: (lista de tuplas a insertar, índices de df de las filas inválidas)
+    """
+    columnas = []
+    invalidas = pd.Series(False, index=df.index)
+    for nombre in COLUMNAS_NUMERICAS:
+        original = _columna(df, nombre)
+        numerica = pd.to_numeric(original, errors="coerce")
+        invalidas |= original.notna() & numerica.isna()
+        columnas.append(_sin_nulos(numerica, numerica))
+    for nombre in COLUMNAS_TEXTO:
+        original = _columna(df, nombre)
+        texto = original.astype(str)
+        if nombre in DICCIONARIOS:
+            ids = obtener_ids(cursor, nombre, texto[original.notna()])
+            texto = texto.map(ids).astype("Int64")
+        columnas.append(_sin_nulos(original, texto))
+    original = _columna(df, "weed_applied")
+    aplicado = pd.to_numeric(original, errors="coerce")
+    invalidas |= original.notna() & ~aplicado.isin(VALORES_APLICADO)
+    aplicado = aplicado.where(aplicado.isin(VALORES_APLICADO))
+    columnas.append(_sin_nulos(aplicado, aplicado.astype("Int64")))
+    uploader_id = obtener_ids(cursor, "uploader", [uploader])[uploader] if uploader is not None else None
+
+    validas = ~invalidas
+    cantidad = int(validas.sum())
+    filas = list(zip(
+        [ensayo_id] * cantidad,
+        [uploader_id] * cantidad,
+        *(columna[validas].tolist() for columna in columnas)
+    ))
+    return filas, df.index[invalidas].tolist()
+
+
+def insertar_malezas(cursor, df, ensayo_id, uploader):
+    """
+    Inserta las malezas de la planilla con un solo executemany. No confirma:
+    el llamador hace commit junto con el resto del ensayo. Si alguna fila tiene un
+    valor inválido no inserta nada y lanza FilasInvalidas: el llamador deshace el envío.
+
+    Returns:
+        int: cantidad de malezas insertadas
+    """
+    filas, invalidas = preparar_filas(cursor, df, ensayo_id, uploader)
+    if invalidas:
+        raise FilasInvalidas(len(invalidas), _filas_csv(invalidas[:MAX_FILAS_INFORMADAS]))
+    cursor.executemany(SQL_INSERTAR, filas)
+    return len(filas)
+
+
+def insertar_malezas_en_bloques(cursor, bloques, ensayo_id, uploader, avance=None):
+    """
+    insertar_malezas de la planilla recibida de a bloques: en memoria hay un
+    bloque (y sus tuplas) a la vez. No confirma. `avance`, si se pasa, recibe
+    después de cada bloque la cantidad de filas procesadas hasta ahí. Las filas
+    inválidas se cuentan en toda la planilla y, si hay alguna, se lanza
+    FilasInvalidas al terminar: el llamador deshace el envío.
+
+    Returns:
+        int: cantidad de malezas insertadas
+    """
+    insertadas = 0
+    procesadas = 0
+    cantidad_invalidas = 0
+    invalidas = []
+    for bloque in bloques:
+        filas, invalidas_bloque = preparar_filas(cursor, bloque, ensayo_id, uploader)
+        if invalidas_bloque:
+            cantidad_invalidas += len(invalidas_bloque)
+            invalidas.extend(_filas_csv(invalidas_bloque[:MAX_FILAS_INFORMADAS - len(invalidas)]))
+        elif not cantidad_invalidas:
+            # Con una fila inválida el envío ya no se guarda: el resto solo se revisa
+            cursor.executemany(SQL_INSERTAR, filas)
+            insertadas += len(filas)
+        procesadas += len(bloque)
+        if avance is not None:
+            avance(procesadas)
+    if cantidad_invalidas:
+        raise FilasInvalidas(cantidad_invalidas, invalidas)
+    return insertadas
@@ -0,0 +1,147 @@
+# Migraciones versionadas del esquema (PRAGMA user_version)
+#
+# Uso (desde la raíz del repo):
+#     python -m ensayos_db migrar [--db ruta]
+#
+# Cada migración se aplica una sola vez, en su propia transacción, y deja
+# PRAGMA user_version en su número. Así ensayos.db evoluciona en el lugar
+# sin perder datos y una base nueva llega al mismo esquema.
+#
+# Una migración publicada no se reescribe: un cambio posterior va en una nueva.
+# Cada una arma lo suyo una sola vez y en el orden de sus dependencias
+# (malezas_flat va después de los diccionarios, porque guarda sus ids).
+import os
+import threading
+
+from .conexion import DB_PATH, obtener_conexion
+from . import borrado, busqueda, clientes, cubo, diccionarios, envios, espacial, estricto, hechos
+from .esquema import INDICES, TABLAS
+
+
+def _v1_tablas_iniciales(conn):
+    for sql in TABLAS.values():
+        conn.execute(sql)
+
+
+def _v2_indices_dashboard(conn):
+    for sql in INDICES.values():
+        conn.execute(sql)
+
+
+def _v3_clientes_unicos(conn):
+    clientes.deduplicar(conn)
+    conn.execute(clientes.SQL_INDICE_UNICO)
+
+
+def _v4_diccionarios_malezas(conn):
+    diccionarios.codificar_resultados(conn)
+
+
+def _v5_malezas_flat(conn):
+    hechos.reconstruir(conn)
+    hechos.crear_indices_filtros(conn)
+
+
+def _v6_tablas_estrictas(conn):
+    estricto.convertir_base(conn)
+
+
+def _v7_cubo_agregados(conn):
+    cubo.reconstruir(conn)
+
+
+def _v8_borrado_en_cascada(conn):
+    borrado.activar_cascada(conn)
+
+
+def _v9_busqueda_texto(conn):
+    busqueda.reconstruir(conn)
+
+
+def _v10_indice_espacial(conn):
+    espacial.reconstruir(conn)
+
+
+def _v11_huella_envios(conn):
+    envios.crear_estructura(conn)
+
+
+# (versión, descripción, función que aplica el cambio)
+MIGRACIONES = [
+    (1, "tablas iniciales", _v1_tablas_iniciales),
+    (2, "índices sobre claves de join y filtro", _v2_indices_dashboard),
+    (3, "clientes únicos por (name, sprai_id, modules_id)", _v3_clientes_unicos),
+    (4, "diccionarios de weed_name, weed_type, weed_placement y uploader", _v4_diccionarios_malezas),
+    (5, "tabla de hechos malezas_flat con triggers e índices de fecha y módulo", _v5_malezas_flat),
+    (6, "tablas STRICT con fechas ISO y valores validados", _v6_tablas_estrictas),
+    (7, "cubo de agregados malezas_cubo para los gráficos", _v7_cubo_agregados),
+    (8, "claves foráneas con ON DELETE CASCADE", _v8_borrado_en_cascada),
+    (9, "índices FTS5 de ensayos y especies para la búsqueda", _v9_busqueda_texto),
+    (10, "índice espacial R*Tree de las ubicaciones", _v10_indice_espacial),
+    (11, "huella de cada envío con índice único para no duplicarlos", _v11_huella_envios),
+]
+
+VERSION_ESQUEMA = MIGRACIONES[-1][0]
+
+
+def version_actual(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrar(conn, hasta=None):
+    """
+    Aplica las migraciones pendientes sobre `conn`.
+
+    Args:
+        conn: conexión a la base (sin transacción abierta)
+        hasta: versión máxima a aplicar (por defecto la última)
+
+    Returns:
+        list: versiones aplicadas en esta llamada
+    """
+    aplicadas = []
+    # Las migraciones reconstruyen tablas (DROP + RENAME) y con las claves foráneas
+    # activas el DROP de ensayos borraría en cascada. PRAGMA foreign_keys no cambia
+    # dentro de una transacción: se apaga antes y se restaura al terminar.
+    claves_foraneas = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        for version, descripcion, aplicar in MIGRACIONES:
+            if hasta is not None and version > hasta:
+                break
+            if version_actual(conn) >= version:
+                continue
+            # BEGIN IMMEDIATE: si otro proceso migra a la vez, espera y vuelve a comprobar
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if version_actual(conn) >= version:
+                    conn.rollback()
+                    continue
+                aplicar(conn)
+                conn.execute(f"PRAGMA user_version = {version}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            aplicadas.append(version)
+    finally:
+        conn.execute(f"PRAGMA foreign_keys = {claves_foraneas}")
+    return aplicadas
+
+
+_esquemas_listos = set()
+_esquemas_lock = threading.Lock()
+
+
+def asegurar_esquema(ruta=None):
+    """
+    Lleva la base a la última versión una sola vez por proceso y archivo,
+    en lugar de repetir el DDL en cada rerun de Streamlit o cada pedido de Dash.
+    """
+    clave = os.path.abspath(ruta or DB_PATH)
+    with _esquemas_lock:
+        if clave in _esquemas_listos:
+            return
+        migrar(obtener_conexion(ruta))
+        _esquemas_listos.add(clave)
+
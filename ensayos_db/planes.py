@@ -0,0 +1,106 @@
+# Comprobación con EXPLAIN QUERY PLAN de que las consultas usan los índices
+
+# nombre -> (consulta, parámetros, índices que deben aparecer en el plan)
+CONSULTAS_INDEXADAS = {
+    # obtener_datos_malezas con filtro de fechas: entra por la fecha y busca las malezas por ensayo
+    "malezas en rango de fechas": (
+        """
+        SELECT r.weed_applied, e.test_date
+        FROM resultados_malezas r
+        LEFT JOIN ensayos e ON r.ensayo_id = e.ensayo_id
+        LEFT JOIN clientes cli ON e.cliente_id = cli.cliente_id
+        WHERE r.weed_applied IS NOT NULL AND e.test_date BETWEEN ? AND ?
+        """,
+        ("2025-01-01", "2025-12-31"),
+        ("idx_ensayos_fecha", "idx_resultados_malezas_ensayo"),
+    ),
+    # obtener_datos_malezas con filtro de módulos: clientes -> ensayos -> malezas, todo por índice
+    "malezas por módulo (cliente)": (
+        """
+        SELECT r.weed_applied
+        FROM resultados_malezas r
+        JOIN ensayos e ON r.ensayo_id = e.ensayo_id
+        JOIN clientes cli ON e.cliente_id = cli.cliente_id
+        WHERE r.weed_applied IS NOT NULL AND cli.modules_id IN (?, ?)
+        """,
+        ("SM000001", "SM000002"),
+        ("idx_clientes_modulos", "idx_ensayos_cliente", "idx_resultados_malezas_ensayo"),
+    ),
+    # Filtros del dashboard resueltos en SQL sobre la tabla de hechos
+    "malezas_flat en rango de fechas": (
+        "SELECT weed_applied FROM malezas_flat WHERE weed_applied IS NOT NULL AND fecha_ensayo >= ? AND fecha_ensayo <= ?",
+        ("2025-01-01", "2025-12-31"),
+        ("idx_malezas_flat_fecha",),
+    ),
+    "malezas_flat por módulo": (
+        "SELECT weed_applied FROM malezas_flat WHERE weed_applied IS NOT NULL AND modules_id IN (?, ?)",
+        ("SM000001", "SM000002"),
+        ("idx_malezas_flat_modulo",),
+    ),
+    # Alta de cliente en cada envío (ensayos_db.clientes)
+    "cliente por identidad": (
+        "SELECT cliente_id FROM clientes WHERE name IS ? AND sprai_id IS ? AND modules_id IS ?",
+        ("Matias", "349", "SMAA2390"),
+        ("ux_clientes_identidad",),
+    ),
+    # Triggers de malezas_cubo: fila de la combinación de una maleza
+    "fila de malezas_cubo por clave": (
+        """
+        SELECT 1 FROM malezas_cubo
+        WHERE ensayo_id IS ? AND weed_name_id IS ? AND weed_type_id IS ? AND weed_placement_id IS ?
+        AND size_tramo IS ? AND weed_diameter_tramo IS ?
+        """,
+        (1, 1, 1, 1, 3, 1),
+        ("idx_malezas_cubo_clave",),
+    ),
+    # Envío repetido: la huella del envío se busca en el índice único (ensayos_db.envios)
+    "ensayo por huella de envío": (
+        "SELECT ensayo_id FROM ensayos WHERE hash_envio = ?",
+        ("0" * 64,),
+        ("ux_ensayos_hash_envio",),
+    ),
+    # Borrado de un ensayo desde la pestaña de desarrollo
+    "borrado de malezas de un ensayo": (
+        "DELETE FROM resultados_malezas WHERE ensayo_id = ?",
+        (1,),
+        ("idx_resultados_malezas_ensayo",),
+    ),
+    # Cliente huérfano tras borrar un ensayo
+    "ensayos de un cliente": (
+        "SELECT COUNT(*) FROM ensayos WHERE cliente_id = ?",
+        (1,),
+        ("idx_ensayos_cliente",),
+    ),
+    # Filtro de fechas del dashboard
+    "ensayos en rango de fechas": (
+        "SELECT ensayo_id FROM ensayos WHERE test_date BETWEEN ? AND ?",
+        ("2025-01-01", "2025-12-31"),
+        ("idx_ensayos_fecha",),
+    ),
+    # Filtro de módulos del dashboard
+    "clientes por módulo": (
+        "SELECT cliente_id FROM clientes WHERE modules_id IN (?, ?)",
+        ("SM000001", "SM000002"),
+        ("idx_clientes_modulos",),
+    ),
+}
+
+
+def plan_consulta(conn, consulta, params=()):
+    """Devuelve las líneas de EXPLAIN QUERY PLAN de `consulta`."""
+    return [fila[3] for fila in conn.execute(f"EXPLAIN QUERY PLAN {consulta}", params)]
+
+
+def verificar_planes(conn, consultas=None):
+    """
+    Ejecuta EXPLAIN QUERY PLAN sobre cada consulta y comprueba que use sus índices.
+
+    Returns:
+        list: tuplas (nombre, índices esperados, usa_indices, líneas del plan)
+    """
+    resultados = []
+    for nombre, (consulta, params, indices) in (consultas or CONSULTAS_INDEXADAS).items():
+        plan = plan_consulta(conn, consulta, params)
+        usa_indices = all(any(indice in linea for linea in plan) for indice in indices)
+        resultados.append((nombre, indices, usa_indices, plan))
+    return resultados
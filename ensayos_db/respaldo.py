@@ -0,0 +1,136 @@
+# Respaldos en caliente con la API de backup de SQLite
+#
+# Copiar ensayos.db con cp mientras Streamlit confirma un envío puede dejar una
+# copia a medio escribir (y sin lo que todavía está en el WAL). La API de backup
+# copia la base de a PAGINAS_POR_PASO páginas: cada paso es una lectura corta,
+# entre pasos se hace una pausa y los envíos siguen confirmando sin esperar. Si
+# otra conexión escribe en el medio, SQLite vuelve a empezar la copia, así que el
+# respaldo siempre es una imagen consistente de la base. Con envíos seguidos la
+# copia podría no terminar nunca: después de REINICIOS_MAX reinicios se copia el
+# resto en un solo paso, que en WAL es una única lectura y tampoco frena a los
+# escritores.
+#
+# Cada respaldo es <base>_AAAAMMDD-HHMMSS.db en la carpeta de respaldos, se
+# verifica con PRAGMA integrity_check antes de darlo por bueno y se conservan
+# los últimos RESPALDOS_A_CONSERVAR.
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime
+
+PAGINAS_POR_PASO = 256          # ~1 MB por paso con páginas de 4 KiB
+PAUSA_ENTRE_PASOS = 0.01        # segundos que se cede a los escritores entre pasos
+REINICIOS_MAX = 3
+RESPALDOS_A_CONSERVAR = 7
+
+
+def _ruta_esquema(conn, esquema):
+    return next(fila[2] for fila in conn.execute("PRAGMA database_list") if fila[1] == esquema)
+
+
+def carpeta_respaldos(conn):
+    """Carpeta por defecto de los respaldos: respaldos/ junto a la base de `conn`."""
+    return os.path.join(os.path.dirname(_ruta_esquema(conn, "main")), "respaldos")
+
+
+def _patron(base):
+    return re.compile(re.escape(base) + r"_\d{8}-\d{6}\.db")
+
+
+def respaldos(carpeta, base):
+    """Respaldos de la base `base` (nombre sin extensión) en `carpeta`, del más viejo al más nuevo."""
+    if not os.path.isdir(carpeta):
+        return []
+    patron = _patron(base)
+    return sorted(os.path.join(carpeta, nombre) for nombre in os.listdir(carpeta) if patron.fullmatch(nombre))
+
+
+def rotar(carpeta, base, conservar=RESPALDOS_A_CONSERVAR):
+    """
+    Borra los respaldos de `base` más viejos que los últimos `conservar`.
+
+    Returns:
+        list: rutas de los respaldos borrados
+    """
+    sobrantes = respaldos(carpeta, base)[:-conservar] if conservar > 0 else []
+    for ruta in sobrantes:
+        os.remove(ruta)
+    return sobrantes
+
+
+class _CopiaReiniciada(Exception):
+    pass
+
+
+def _copiar(conn, destino, esquema, paginas, pausa):
+    reinicios = 0
+    anteriores = None
+
+    def progreso(estado, restantes, total):
+        nonlocal reinicios, anteriores
+        # Si quedan más páginas que en el paso anterior, una escritura reinició la copia
+        if anteriores is not None and restantes > anteriores:
+            reinicios += 1
+            if reinicios > REINICIOS_MAX:
+                raise _CopiaReiniciada
+        anteriores = restantes
+        time.sleep(pausa)
+
+    try:
+        conn.backup(destino, pages=paginas, name=esquema, progress=progreso)
+    except _CopiaReiniciada:
+        conn.backup(destino, pages=-1, name=esquema)
+
+
+def verificar_respaldo(ruta):
+    """
+    Corre PRAGMA integrity_check sobre el respaldo `ruta`.
+
+    Returns:
+        list: problemas encontrados (vacía si el respaldo está sano)
+    """
+    conn = sqlite3.connect(ruta)
+    try:
+        problemas = [fila[0] for fila in conn.execute("PRAGMA integrity_check")]
+    finally:
+        conn.close()
+    return [] if problemas == ["ok"] else problemas
+
+
+def respaldar(conn, carpeta=None, esquema="main", conservar=RESPALDOS_A_CONSERVAR,
+              paginas=PAGINAS_POR_PASO, pausa=PAUSA_ENTRE_PASOS):
+    """
+    Respalda el esquema `esquema` de `conn` (la base o su archivo adjunto) en
+    `carpeta`, lo verifica y rota los respaldos viejos. No toma bloqueos de
+    escritura: se puede correr mientras Streamlit recibe envíos.
+
+    Returns:
+        tuple: (ruta del respaldo, rutas de los respaldos rotados)
+
+    Raises:
+        sqlite3.DatabaseError: si el respaldo no pasa integrity_check (se descarta
+            y los respaldos anteriores no se tocan)
+    """
+    carpeta = carpeta or carpeta_respaldos(conn)
+    os.makedirs(carpeta, exist_ok=True)
+    base = os.path.splitext(os.path.basename(_ruta_esquema(conn, esquema)))[0]
+    ruta = os.path.join(carpeta, f"{base}_{datetime.now():%Y%m%d-%H%M%S}.db")
+    temporal = ruta + ".tmp"
+    if os.path.exists(temporal):
+        os.remove(temporal)
+
+    destino = sqlite3.connect(temporal)
+    try:
+        _copiar(conn, destino, esquema, paginas, pausa)
+        # La copia de una base en WAL queda en WAL: el respaldo tiene que ser un solo archivo
+        destino.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        destino.close()
+
+    problemas = verificar_respaldo(temporal)
+    if problemas:
+        os.remove(temporal)
+        raise sqlite3.DatabaseError(f"respaldo de {base} dañado: {'; '.join(problemas[:5])}")
+    os.replace(temporal, ruta)
+    return ruta, rotar(carpeta, base, conservar)
@@ -1,9 +1,15 @@
 import streamlit as st
 import pandas as pd
 import datetime
-import sqlite3
 from sqlite3 import Error
-from verificarStem import verificar_columnas, archivos_estandarizados
+from concurrent.futures import wait
+from verificarStem import (COLUMNAS_A_BUSCAR, resolver_columnas, mostrar_columnas, leer_encabezados,
+                           analizar_planilla, estandarizar_bloques, resumen_invalidos)
+from ensayos_db import (DB_PATH, obtener_conexion, asegurar_esquema, insertar_malezas_en_bloques,
+                        obtener_cliente_id, borrar_ensayos, contar_ensayos,
+                        vaciar_todo, archivar, cola_escritura, huella_envio, ensayo_por_huella,
+                        buscar_ensayos, ensayos_cercanos, columnas_tabla, pagina_tabla, contar_filas,
+                        OPERADORES_FILTRO, FILAS_POR_PAGINA)
 
 USERS = {
     "desarrollador": {
@@ -40,14 +46,15 @@ if "logged_in" not in st.session_state:
 # Inicializar variables de sesión para el CSV
 if 'csv_confirmado' not in st.session_state:
     st.session_state['csv_confirmado'] = False
-if 'df_estandarizado' not in st.session_state:
-    st.session_state['df_estandarizado'] = None
+if 'planilla' not in st.session_state:
+    st.session_state['planilla'] = None
 
 # Configuración de la base de datos SQLite
 def create_connection():
     conn = None
     try:
-        conn = sqlite3.connect('ensayos.db')
+        # Conexión del pool compartido (WAL + busy_timeout), reutilizada entre reruns
+        conn = obtener_conexion(DB_PATH)
         return conn
     except Error as e:
         st.error(f"Error al conectar a la base de datos: {str(e)}")
@@ -55,138 +62,8 @@ def create_connection():
 
 def create_tables(conn):
     try:
-        cursor = conn.cursor()
-        
-        # Tabla clientes
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS clientes (
-            cliente_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            sprai_id VARCHAR,
-            modules_id VARCHAR
-        )""")
-        
-        # Tabla ensayos
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS ensayos (
-            ensayo_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            cliente_id INTEGER,
-            test_date DATE,
-            test_time TIME,
-            FOREIGN KEY (cliente_id) REFERENCES clientes(cliente_id)
-        )""")
-        
-        # Tabla ubicacion
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS ubicacion (
-            ensayo_id INTEGER PRIMARY KEY,
-            farm TEXT,
-            farm_address TEXT,
-            field_location TEXT,
-            latitude REAL,
-            longitude REAL,
-            soil_type TEXT,
-            FOREIGN KEY (ensayo_id) REFERENCES ensayos(ensayo_id)
-        )""")
-        
-        # Tabla condiciones_ambientales
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS condiciones_ambientales (
-            ensayo_id INTEGER PRIMARY KEY,
-            ambient_temperature REAL,
-            wind_speed REAL,
-            relative_humidity REAL,
-            wind_direction TEXT,
-            ambient_light_intensity REAL,
-            cloudiness REAL,
-            FOREIGN KEY (ensayo_id) REFERENCES ensayos(ensayo_id)
-        )""")
-        
-        # Tabla cultivo
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS cultivo (
-            ensayo_id INTEGER PRIMARY KEY,
-            crop_specie TEXT,
-            tillage TEXT,
-            row_spacing REAL,
-            crop_population INTEGER,
-            crop_stage TEXT,
-            FOREIGN KEY (ensayo_id) REFERENCES ensayos(ensayo_id)
-        )""")
-        
-        # Tabla pulverizadora
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS pulverizadora (
-            ensayo_id INTEGER PRIMARY KEY,
-            sprayer_manufacturer TEXT,
-            sprayer_model_number TEXT,
-            sprayer_year INTEGER,
-            nozzle_nomenclature TEXT,
-            nozzle_droplet_classification TEXT,
-            nozzle_spacing REAL,
-            boom_height REAL,
-            speed REAL,
-            spray_pressure REAL,
-            flow_rate REAL,
-            FOREIGN KEY (ensayo_id) REFERENCES ensayos(ensayo_id)
-        )""")
-        
-        # Tabla colorante
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS colorante (
-            ensayo_id INTEGER PRIMARY KEY,
-            dye_used TEXT,
-            dye_manufacturer TEXT,
-            dye_concentration_ll REAL,
-            dye_concentration_gl REAL,
-            FOREIGN KEY (ensayo_id) REFERENCES ensayos(ensayo_id)
-        )""")
-        
-        # Tabla personal
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS personal (
-            ensayo_id INTEGER PRIMARY KEY,
-            machine_operator TEXT,
-            trial_testers TEXT,
-            FOREIGN KEY (ensayo_id) REFERENCES ensayos(ensayo_id)
-        )""")
-        
-        # Tabla herbicida
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS herbicida (
-            ensayo_id INTEGER PRIMARY KEY,
-            herbicide TEXT,
-            dose INTEGER,
-            FOREIGN KEY (ensayo_id) REFERENCES ensayos(ensayo_id)
-        )""")
-        
-        # Tabla modelo_deteccion
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS modelo_deteccion (
-            ensayo_id INTEGER PRIMARY KEY,
-            model_id TEXT,
-            sens INTEGER,
-            tile INTEGER,
-            FOREIGN KEY (ensayo_id) REFERENCES ensayos(ensayo_id)
-        )""")
-        
-        # Tabla resultados_malezas (simplificada para el ejemplo)
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS resultados_malezas (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ensayo_id INTEGER,
-            uploader TEXT,
-            weed_diameter REAL,
-            size REAL,
-            height REAL,
-            weed_placement TEXT,
-            weed_type TEXT,
-            weed_name TEXT,
-            weed_applied INTEGER,
-            FOREIGN KEY (ensayo_id) REFERENCES ensayos(ensayo_id)
-        )""")
-        
-        conn.commit()
+        # Las tablas están definidas en ensayos_db.esquema y se crean una vez por proceso
+        asegurar_esquema(DB_PATH)
     except Error as e:
         st.error(f"Error al crear tablas: {str(e)}")
 
@@ -262,6 +139,15 @@ with tabs[1]:
         field_location = st.text_input("Ubicación del lote (link Google Maps) *")
         latitude = st.number_input("Latitud")
         longitude = st.number_input("Longitud")
+        # Ensayos anteriores cerca de la finca (índice R*Tree, ver ensayos_db/espacial.py)
+        if conn and (latitude or longitude):
+            cercanos = ensayos_cercanos(conn, latitude, longitude, k=5)
+            if cercanos:
+                with st.expander("Ensayos cercanos"):
+                    st.dataframe(pd.DataFrame(
+                        [(e[0], e[4], e[3], round(e[5], 1)) for e in cercanos],
+                        columns=["Ensayo", "Cliente", "Finca", "Distancia (km)"]
+                    ))
         soil_type = st.text_input("Tipo de suelo")
     with col2:
         st.subheader("🌦️ Condiciones Ambientales")
@@ -317,32 +203,57 @@ with tabs[3]:
         sens = st.selectbox("Sensibilidad", [1, 2, 3])
         tile = st.selectbox("Baldosa", [1, 2, 3])
 
+    # La planilla no se guarda en la sesión: se lee de a bloques del archivo subido al confirmarla
+    # (verifica, estandariza y arma la huella) y otra vez al enviar (inserta)
+    planilla = st.session_state['planilla']
     if csv_file:
+        if planilla is not None and planilla['archivo'] != csv_file.file_id:
+            # Se subió otro archivo: hay que confirmarlo de nuevo
+            st.session_state['csv_confirmado'] = False
+            st.session_state['planilla'] = None
         try:
-            df_csv = pd.read_csv(csv_file)
-            dataframe_procesado, errores_tipo_dato = verificar_columnas(df_csv)
+            columnas_csv = resolver_columnas(leer_encabezados(csv_file))
+            mostrar_columnas(columnas_csv)
         except Exception as e:
             st.error(f"Error al leer el archivo CSV: {e}")
-            dataframe_procesado = None
-            errores_tipo_dato = {"lectura": [str(e)]}
+            columnas_csv = None
     else:
-        dataframe_procesado = None
-        errores_tipo_dato = {"archivo": ["No se cargó un archivo CSV."]}
+        columnas_csv = None
 
 
     if st.button("Confirmar CSV y Estandarizar"):
-        if dataframe_procesado is not None and not errores_tipo_dato:
-            df_estandarizado = archivos_estandarizados(dataframe_procesado)
-            st.session_state['df_estandarizado'] = df_estandarizado
-            st.session_state['csv_confirmado'] = True
-        elif dataframe_procesado is None:
+        st.session_state['csv_confirmado'] = False
+        st.session_state['planilla'] = None
+        if columnas_csv is None:
             st.error("🚫 No se cargó un archivo CSV válido.")
-            st.session_state['csv_confirmado'] = False
-            st.session_state['df_estandarizado'] = None
         else:
-            st.error("🚫 El archivo tiene errores de tipo de dato. No se puede estandarizar.")
-            st.session_state['csv_confirmado'] = False
-            st.session_state['df_estandarizado'] = None
+            barra = st.progress(0.0, text="Verificando el archivo...")
+            try:
+                planilla = analizar_planilla(csv_file, progreso=barra.progress)
+            except Exception as e:
+                st.error(f"Error al leer el archivo CSV: {e}")
+                planilla = None
+            barra.empty()
+            if planilla is not None and planilla['errores']:
+                st.error("🚫 El archivo tiene errores de tipo de dato. No se puede estandarizar.")
+                for col, errores_col in planilla['errores'].items():
+                    cantidad = planilla['cantidad_errores'][col]
+                    st.warning(f"'{col}': {cantidad} {'error' if cantidad == 1 else 'errores'}. " + " ".join(errores_col))
+            elif planilla is not None:
+                nulos = ", ".join(f"'{col}': {cantidad}" for col, cantidad in planilla['nulos'].items())
+                st.info(f"{planilla['filas']} filas. Valores nulos: {nulos}")
+                for col in COLUMNAS_A_BUSCAR:
+                    if col not in planilla['columnas']:
+                        st.warning(f"⚠️ Columna '{col}' no encontrada, se llenará con valores nulos")
+                if planilla['invalidos']:
+                    st.warning(resumen_invalidos("weed applied", planilla['invalidos']))
+                st.success(f"\n📄 Archivo procesado y estandarizado")
+                if planilla['filas'] > len(planilla['muestra']):
+                    st.caption(f"Primeras {len(planilla['muestra'])} de {planilla['filas']} filas")
+                st.dataframe(planilla['muestra'], use_container_width=True)
+                planilla['archivo'] = csv_file.file_id
+                st.session_state['planilla'] = planilla
+                st.session_state['csv_confirmado'] = True
 
 
 
@@ -416,6 +327,7 @@ with tabs[4]:
 
     # Solo el botón y el envío están en el formulario
     with st.form("form_envio"):
+        reemplazar = st.checkbox("Si esta planilla ya se envió, reemplazar el envío anterior", key="reemplazar_envio")
         submit_button = st.form_submit_button("Enviar Formulario Completo")
         
         if submit_button:
@@ -441,7 +353,11 @@ with tabs[4]:
                 errores.append("La especie del cultivo es obligatoria.")
             if not speed:
                 errores.append("La velocidad de la pulverizadora es obligatoria.")
-            if not st.session_state['csv_confirmado'] or st.session_state['df_estandarizado'] is None:
+            if sprayer_year.strip() and not sprayer_year.strip().isdigit():
+                errores.append("El año de fabricación debe ser un número entero.")
+            planilla = st.session_state['planilla']
+            if (not st.session_state['csv_confirmado'] or planilla is None or not csv_file
+                    or planilla['archivo'] != csv_file.file_id):
                 errores.append("Para enviar el formulario es obligatorio subir un archivo CSV válido y estandarizado.")
 
 
@@ -453,21 +369,33 @@ with tabs[4]:
             else:
                 # Solo proceder si no hay errores y hay conexión a la BD
                 if conn is not None:
-                    try:
+                    huella = huella_envio(
+                        [name, sprai_id, modules_id, test_date.isoformat(), test_time.strftime("%H:%M:%S"),
+                         farm, field_location],
+                        planilla['huella']
+                    )
+                    # Filas de malezas ya insertadas: las anota el hilo escritor y las lee la barra de progreso
+                    avance = {"filas": 0}
+
+                    # Las inserciones corren en el hilo escritor (ver ensayos_db/escritura.py): los envíos
+                    # simultáneos de varias sesiones se encolan y se confirman juntos, sin competir por el bloqueo
+                    def guardar_envio(conn):
                         cursor = conn.cursor()
 
-                        # Insertar cliente primero
-                        cursor.execute(
-                            "INSERT INTO clientes (name, sprai_id, modules_id) VALUES (?, ?, ?)",
-                            (name, sprai_id, modules_id)
-                        )
+                        # Envío repetido (doble clic o la misma planilla otra vez): se reconoce por su huella
+                        anterior = ensayo_por_huella(conn, huella)
+                        if anterior is not None:
+                            if not reemplazar:
+                                return anterior, None
+                            borrar_ensayos(conn, ensayo_id=anterior)
 
-                        cliente_id = cursor.lastrowid
+                        # Cliente primero: se reutiliza si ya estaba registrado
+                        cliente_id = obtener_cliente_id(cursor, name, sprai_id, modules_id)
                         
                         # Insertar ensayo
                         cursor.execute(
-                            "INSERT INTO ensayos (cliente_id, test_date, test_time) VALUES (?, ?, ?)",  # Nota la coma al final
-                            (cliente_id, test_date, str(test_time))
+                            "INSERT INTO ensayos (cliente_id, test_date, test_time, hash_envio) VALUES (?, ?, ?, ?)",
+                            (cliente_id, test_date.isoformat(), test_time.strftime("%H:%M:%S"), huella)
                         )
 
                         ensayo_id = cursor.lastrowid 
@@ -499,7 +427,7 @@ with tabs[4]:
                                 crop_population, crop_stage
                             ) VALUES (?, ?, ?, ?, ?, ?)""",
                             (ensayo_id, crop_specie, tillage, row_spacing, 
-                            crop_population, crop_stage)
+                            int(crop_population), crop_stage)
                         )
                         
                         # Insertar pulverizadora
@@ -510,7 +438,7 @@ with tabs[4]:
                                 nozzle_spacing, boom_height, speed, spray_pressure, flow_rate
                             ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
                             (ensayo_id, sprayer_manufacturer, sprayer_model_number, 
-                            sprayer_year, nozzle_nomenclature, nozzle_droplet_classification, 
+                            int(sprayer_year) if sprayer_year.strip() else None, nozzle_nomenclature, nozzle_droplet_classification, 
                             nozzle_spacing, boom_height, speed, spray_pressure, flow_rate)
                         )
                         
@@ -548,36 +476,37 @@ with tabs[4]:
                             (ensayo_id, model_id, sens, tile)
                         )
                         
-                        # Procesar archivo CSV si existe
-                        df_estandarizado = st.session_state['df_estandarizado']
-                        for _, row in df_estandarizado.iterrows():
-                            try:
-                                
-                                weed_diameter = float(row.get('weed_diameter')) if pd.notnull(row.get('weed_diameter')) else None
-                                size = float(row.get('size')) if pd.notnull(row.get('size')) else None
-                                height = float(row.get('height')) if pd.notnull(row.get('height')) else None
-                                weed_placement = str(row.get('weed_placement')) if pd.notnull(row.get('weed_placement')) else None
-                                weed_type = str(row.get('weed_type')) if pd.notnull(row.get('weed_type')) else None
-                                weed_name = str(row.get('weed_name')) if pd.notnull(row.get('weed_name')) else None
-                                weed_applied = str(row.get('weed_applied')) if pd.notnull(row.get('weed_applied')) else None
-
-                                cursor.execute(
-                                    """INSERT INTO resultados_malezas (
-                                        ensayo_id, uploader, weed_diameter, size, height,
-                                        weed_placement, weed_type, weed_name, weed_applied
-                                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                                    (ensayo_id, uploader, weed_diameter, size, height,
-                                    weed_placement, weed_type, weed_name, weed_applied)
-                                )
-                            except Exception as row_error:
-                                st.warning(f"Fila con error: {row.to_dict()} – {row_error}")
-                        
-                        conn.commit()
-                        st.success("✅ Formulario enviado correctamente a la base de datos")
-                        st.balloons()
+                        # Malezas: el CSV se vuelve a leer y estandarizar de a bloques, con un executemany por bloque
+                        return anterior, insertar_malezas_en_bloques(
+                            cursor, estandarizar_bloques(csv_file, planilla['columnas']), ensayo_id, uploader,
+                            avance=lambda filas: avance.update(filas=filas)
+                        )
+
+                    try:
+                        # El hilo escritor no puede usar st: esta sesión espera el resultado y mueve la barra.
+                        # Reemplazar corre solo, sin SAVEPOINT: borrar miles de malezas y volver a insertarlas
+                        # dentro de un savepoint es hasta 10 veces más lento (benchmarks/bench_reemplazo.py)
+                        futuro = cola_escritura(DB_PATH).enviar(guardar_envio, aislado=reemplazar)
+                        barra = st.progress(0.0, text="Guardando malezas...")
+                        while not futuro.done():
+                            wait([futuro], timeout=0.25)
+                            barra.progress(min(avance["filas"] / max(planilla['filas'], 1), 1.0),
+                                           text=f"Guardando malezas... {avance['filas']} de {planilla['filas']} filas")
+                        barra.empty()
+                        # Una fila inválida hace fallar el trabajo (FilasInvalidas, con los números de
+                        # fila): el envío se deshace entero y el error se muestra abajo
+                        anterior, insertadas = futuro.result()
+                        if insertadas is None:
+                            st.info(f"Esta planilla ya se envió (ensayo ID {anterior}) y no se guardó otra vez. "
+                                    "Para sobrescribirla marque la opción de reemplazar el envío anterior.")
+                        else:
+                            if anterior is not None:
+                                st.success(f"✅ Se reemplazó el envío anterior (ensayo ID {anterior})")
+                            else:
+                                st.success("✅ Formulario enviado correctamente a la base de datos")
+                            st.balloons()
                         
                     except Exception as e:
-                        conn.rollback()
                         st.error(f"Error al enviar el formulario: {str(e)}")
                 else:
                     st.error("No se pudo conectar a la base de datos. No se guardó la información.")
@@ -593,21 +522,18 @@ if st.session_state.get("role") == "desarrollador" and len(tabs) > 5:
             # ==============================================
             st.subheader("✏️ Corregir Datos de Ensayo")
 
-            # Obtener lista completa de ensayos con información relevante
-            cursor = conn.cursor()
-            query = """
-            SELECT e.ensayo_id, e.test_date, c.name, e.test_time 
-            FROM ensayos e
-            JOIN clientes c ON e.cliente_id = c.cliente_id
-            ORDER BY e.test_date DESC, e.test_time DESC
-            """
-            cursor.execute(query)
-            ensayos = cursor.fetchall()
+            # Búsqueda en el índice FTS5 (ver ensayos_db/busqueda.py): solo se listan
+            # los ensayos que coinciden, sin texto los más recientes
+            texto_busqueda = st.text_input(
+                "Buscar ensayo (cliente, finca, lote, técnicos, herbicida o maleza):",
+                key="buscar_ensayo_correccion"
+            )
+            ensayos = buscar_ensayos(conn, texto_busqueda)
             
             if ensayos:
                 # Crear opciones descriptivas para el selectbox
                 opciones_ensayos = [
-                    f"ID: {e[0]} | Fecha: {e[1]} {e[3]} | Cliente: {e[2]}"
+                    f"ID: {e[0]} | Fecha: {e[1]} {e[2]} | Cliente: {e[3]} | Finca: {e[4]}"
                     for e in ensayos
                 ]
                 
@@ -628,73 +554,110 @@ if st.session_state.get("role") == "desarrollador" and len(tabs) > 5:
                 
                 if confirmacion and st.button("🗑️ ELIMINAR ENSAYO", key=f"delete_btn_{ensayo_id}"):
                     try:
-                        # Lista de todas las tablas relacionadas con ensayos
-                        tablas_relacionadas = [
-                            "ubicacion", "condiciones_ambientales", "cultivo",
-                            "pulverizadora", "colorante", "personal",
-                            "herbicida", "modelo_deteccion", "resultados_malezas"
-                        ]
-                        
-                        # Obtener cliente_id asociado al ensayo para posible limpieza
-                        cursor.execute("SELECT cliente_id FROM ensayos WHERE ensayo_id = ?", (ensayo_id,))
-                        cliente_id = cursor.fetchone()[0]
-                        
-                        # 1. Borrar datos en tablas relacionadas
-                        for tabla in tablas_relacionadas:
-                            cursor.execute(f"DELETE FROM {tabla} WHERE ensayo_id = ?", (ensayo_id,))
-                        
-                        # 2. Borrar el registro principal del ensayo
-                        cursor.execute("DELETE FROM ensayos WHERE ensayo_id = ?", (ensayo_id,))
-                        
-                        # 3. Verificar si el cliente queda sin ensayos y opcionalmente borrarlo
-                        cursor.execute("SELECT COUNT(*) FROM ensayos WHERE cliente_id = ?", (cliente_id,))
-                        if cursor.fetchone()[0] == 0:
-                            cursor.execute("DELETE FROM clientes WHERE cliente_id = ?", (cliente_id,))
-                        
-                        conn.commit()
+                        # ON DELETE CASCADE borra las tablas relacionadas; el cliente se borra
+                        # si queda sin ensayos
+                        cola_escritura(DB_PATH).ejecutar(lambda conn: borrar_ensayos(conn, ensayo_id=ensayo_id))
                         st.success(f"✅ Ensayo ID {ensayo_id} y todos sus datos asociados fueron eliminados correctamente")
                         st.balloons()
                         st.rerun()  # Refrescar la vista
                         
                     except Exception as e:
-                        conn.rollback()
                         st.error(f"❌ Error al eliminar el ensayo: {str(e)}")
             
+            elif texto_busqueda:
+                st.info("Ningún ensayo coincide con la búsqueda")
             else:
                 st.info("No hay ensayos registrados en la base de datos")
 
+            # SECCIÓN PARA BORRADO MASIVO (TEMPORADA, CLIENTE O MÓDULO)
+            st.markdown("---")
+            st.subheader("🗂️ Borrado Masivo de Ensayos")
+
+            criterios = {}
+            if st.checkbox("Por rango de fechas", key="masivo_por_fechas"):
+                col_desde, col_hasta = st.columns(2)
+                criterios["desde"] = col_desde.date_input("Desde", key="masivo_desde").isoformat()
+                criterios["hasta"] = col_hasta.date_input("Hasta", key="masivo_hasta").isoformat()
+
+            clientes_existentes = conn.execute(
+                "SELECT cliente_id, name, modules_id FROM clientes ORDER BY name"
+            ).fetchall()
+            cliente_elegido = st.selectbox(
+                "Cliente:",
+                [None] + clientes_existentes,
+                format_func=lambda c: "Todos" if c is None else f"{c[1]} (módulo {c[2]})",
+                key="masivo_cliente"
+            )
+            if cliente_elegido is not None:
+                criterios["cliente_id"] = cliente_elegido[0]
+
+            modulos = sorted({c[2] for c in clientes_existentes if c[2] is not None})
+            modulo_elegido = st.selectbox(
+                "Módulo:", [None] + modulos,
+                format_func=lambda m: "Todos" if m is None else m,
+                key="masivo_modulo"
+            )
+            if modulo_elegido is not None:
+                criterios["modulo"] = modulo_elegido
+
+            if criterios:
+                cantidad = contar_ensayos(conn, **criterios)
+                st.warning(f"ADVERTENCIA: Se eliminarán {cantidad} ensayos con todos sus datos.")
+                confirmar_masivo = st.checkbox("Confirmar borrado masivo", key="confirm_masivo")
+                if confirmar_masivo and cantidad and st.button("🗑️ ELIMINAR ENSAYOS SELECCIONADOS", key="masivo_btn"):
+                    try:
+                        # Un solo DELETE en una transacción: todo o nada
+                        ensayos_borrados, clientes_borrados = cola_escritura(DB_PATH).ejecutar(
+                            lambda conn: borrar_ensayos(conn, **criterios)
+                        )
+                        st.success(f"✅ Se eliminaron {ensayos_borrados} ensayos y {clientes_borrados} clientes sin ensayos")
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"❌ Error al eliminar los ensayos: {str(e)}")
+            else:
+                st.info("Elija al menos un criterio (fechas, cliente o módulo)")
+
             # SECCIÓN PARA RESETEO COMPLETO (MANTENIMIENTO)
             st.markdown("---")
             st.subheader("🧹 Limpieza de Datos")
 
-            st.warning("ADVERTENCIA: Esta acción eliminará TODOS los ensayos de forma permanente.")
+            st.warning("ADVERTENCIA: Esta acción eliminará TODOS los ensayos, también los archivados, "
+                       "de forma permanente.")
 
             confirmar_reset = st.checkbox("Confirmar", key="confirm_reset_total")
 
             if confirmar_reset and st.button("🗑️ ELIMINAR TODOS LOS ENSAYOS", key="reset_btn"):
                 try:
-                    cursor = conn.cursor()
-
-                    # Primero se borran las tablas hijas
-                    tablas_hijas = [
-                        "ubicacion", "condiciones_ambientales", "cultivo", "pulverizadora",
-                        "colorante", "personal", "herbicida", "modelo_deteccion", "resultados_malezas"
-                    ]
-                    for tabla in tablas_hijas:
-                        cursor.execute(f"DELETE FROM {tabla}")
-
-                    # Luego las tablas principales
-                    cursor.execute("DELETE FROM ensayos")
-                    cursor.execute("DELETE FROM clientes")
-
-                    conn.commit()
+                    # Vacía la base y su archivo de una vez, sin pasar cada maleza por los triggers
+                    cola_escritura(DB_PATH).ejecutar(vaciar_todo, aislado=True)
                     st.success("✅ Todas las tablas fueron vaciadas correctamente.")
                     st.balloons()
                     st.rerun()  # Para refrescar la interfaz
                 except Exception as e:
-                    conn.rollback()
                     st.error(f"❌ Error al resetear tablas: {str(e)}")
 
+            # SECCIÓN PARA ARCHIVAR TEMPORADAS VIEJAS
+            st.markdown("---")
+            st.subheader("📦 Archivo de Ensayos Antiguos")
+            st.caption("Los ensayos archivados pasan a un archivo aparte: el dashboard y esta pestaña "
+                       "dejan de leerlos salvo que se pida incluirlos.")
+
+            fecha_corte = st.date_input("Archivar ensayos anteriores a:", key="fecha_corte_archivo")
+            cantidad_archivar = contar_ensayos(conn, antes_de=fecha_corte.isoformat())
+            st.info(f"Se moverán {cantidad_archivar} ensayos al archivo.")
+            confirmar_archivo = st.checkbox("Confirmar archivado", key="confirm_archivo")
+
+            if confirmar_archivo and cantidad_archivar and st.button("📦 ARCHIVAR ENSAYOS", key="archivar_btn"):
+                try:
+                    # archivar hace ATTACH y confirma por su cuenta: corre solo, fuera de las tandas
+                    archivados = cola_escritura(DB_PATH).ejecutar(
+                        lambda conn: archivar(conn, fecha_corte.isoformat()), aislado=True
+                    )
+                    st.success(f"✅ Se archivaron {archivados} ensayos")
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"❌ Error al archivar ensayos: {str(e)}")
+
             # VISUALIZACIÓN DE DATOS
             st.markdown("---")
             st.subheader("🔍 Exploración de Datos")
@@ -709,14 +672,56 @@ if st.session_state.get("role") == "desarrollador" and len(tabs) > 5:
                     ],
                     key="table_selector"
                 )
-                
+                incluir_archivo = st.checkbox("Incluir ensayos archivados", key="ver_archivo")
+
                 try:
-                    df = pd.read_sql_query(f"SELECT * FROM {table_to_view}", conn)
-                    st.dataframe(df)
-                    
+                    # Filtros por columna: se aplican en la consulta, no sobre la página ya leída
+                    filtros = []
+                    columnas_filtro = columnas_tabla(conn, table_to_view)
+                    cantidad_filtros = st.number_input("Cantidad de filtros", 0, 5, 0, key="explorador_filtros")
+                    for i in range(int(cantidad_filtros)):
+                        col1, col2, col3 = st.columns(3)
+                        with col1:
+                            columna = st.selectbox("Columna", columnas_filtro, key=f"explorador_columna_{i}")
+                        with col2:
+                            operador = st.selectbox("Condición", list(OPERADORES_FILTRO), key=f"explorador_operador_{i}")
+                        with col3:
+                            valor = st.text_input("Valor", key=f"explorador_valor_{i}")
+                        if OPERADORES_FILTRO[operador][1] is None or valor != "":
+                            filtros.append((columna, operador, valor))
+                    filas_por_pagina = st.selectbox("Filas por página", [FILAS_POR_PAGINA, 100, 500],
+                                                    key="explorador_filas")
+
+                    # Pila con el cursor de comienzo de cada página visitada; se reinicia si cambia la consulta
+                    consulta = (table_to_view, incluir_archivo, tuple(filtros), filas_por_pagina)
+                    if st.session_state.get("explorador_consulta") != consulta:
+                        st.session_state["explorador_consulta"] = consulta
+                        st.session_state["explorador_inicios"] = [None]
+                    inicios = st.session_state["explorador_inicios"]
+
+                    columnas, filas, siguiente = pagina_tabla(
+                        conn, table_to_view, filtros, despues_de=inicios[-1],
+                        incluir_archivo=incluir_archivo, limite=filas_por_pagina
+                    )
+                    st.dataframe(pd.DataFrame(filas, columns=columnas), hide_index=True)
+
+                    col1, col2, col3 = st.columns([1, 1, 4])
+                    with col1:
+                        st.button("Anterior", key="explorador_anterior", disabled=len(inicios) == 1,
+                                  on_click=inicios.pop)
+                    with col2:
+                        st.button("Siguiente", key="explorador_siguiente", disabled=siguiente is None,
+                                  on_click=inicios.append, args=(siguiente,))
+                    with col3:
+                        st.caption(f"Página {len(inicios)}")
+
                     # Mostrar conteo de registros
-                    st.info(f"Total de registros: {len(df)}")
-                    
+                    cantidad, exacta = contar_filas(conn, table_to_view, filtros, incluir_archivo)
+                    if exacta:
+                        st.info(f"Total de registros: {cantidad}")
+                    else:
+                        st.info(f"Total de registros: {cantidad}+ (conteo aproximado)")
+
                 except Exception as e:
                     st.error(f"No se pudo leer la tabla: {str(e)}")
         
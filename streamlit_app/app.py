@@ -1 +1,10 @@
-# Punto de entrada (Streamlit)
\ No newline at end of file
+# Punto de entrada (Streamlit)
+#
+# Se lanza desde esta carpeta (cd streamlit_app && streamlit run app.py), como
+# importa sus módulos (from config import ...). ensayos_db y verificarStem están
+# en la raíz del repo: se agrega la raíz a sys.path antes de importar database o
+# uploader.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
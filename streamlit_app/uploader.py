@@ -1,20 +1,22 @@
 # Carga y estandarización de CSV
-import pandas as pd
 import streamlit as st
-from verificarStem import verificar_columnas, archivos_estandarizados
+from verificarStem import analizar_planilla
 
 def process_csv(csv_file):
+    # Una pasada de a bloques: la planilla no queda entera en memoria (ver analizar_planilla)
     if not csv_file:
         return None, {"archivo": ["No se cargó un archivo CSV."]}
 
     try:
-        df_csv = pd.read_csv(csv_file)
-        dataframe_procesado, errores = verificar_columnas(df_csv)
-        return dataframe_procesado, errores
+        barra = st.progress(0.0, text="Verificando el archivo...")
+        planilla = analizar_planilla(csv_file, progreso=barra.progress)
+        barra.empty()
+        return planilla, planilla["errores"]
     except Exception as e:
         return None, {"lectura": [str(e)]}
 
-def confirm_csv(dataframe):
-    if dataframe is not None:
-        return archivos_estandarizados(dataframe)
+def confirm_csv(planilla):
+    if planilla is not None:
+        st.dataframe(planilla["muestra"], use_container_width=True)
+        return planilla
     return None
@@ -0,0 +1,60 @@
+# Fixtures de las pruebas: siempre sobre copias de ensayos.db, nunca sobre la del repo
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from ensayos_db import abrir_conexion, insertar_malezas, migrar, obtener_cliente_id
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASE_DEL_REPO = os.path.join(RAIZ, "ensayos.db")
+
+
+@pytest.fixture
+def ruta_base(tmp_path):
+    """Copia sin migrar de la ensayos.db que viene con el repo."""
+    ruta = os.path.join(tmp_path, "ensayos.db")
+    shutil.copy(BASE_DEL_REPO, ruta)
+    return ruta
+
+
+@pytest.fixture
+def base(ruta_base):
+    """Conexión a la copia ya migrada a la última versión."""
+    conn = abrir_conexion(ruta_base)
+    migrar(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def nuevo_ensayo(base):
+    """Inserta y confirma un ensayo completo con tres malezas; devuelve su ensayo_id."""
+    def insertar(cliente="Cliente de prueba", farm="La Esperanza"):
+        cursor = base.cursor()
+        cliente_id = obtener_cliente_id(cursor, cliente, "S-1", "M-1")
+        cursor.execute(
+            "INSERT INTO ensayos (cliente_id, test_date, test_time) VALUES (?, '2025-03-01', '10:00:00')",
+            (cliente_id,)
+        )
+        ensayo_id = cursor.lastrowid
+        cursor.execute("INSERT INTO ubicacion (ensayo_id, farm, latitude, longitude) VALUES (?, ?, -31.4, -64.2)",
+                       (ensayo_id, farm))
+        cursor.execute("INSERT INTO pulverizadora (ensayo_id, speed) VALUES (?, 12.5)", (ensayo_id,))
+        cursor.execute("INSERT INTO modelo_deteccion (ensayo_id, model_id, sens, tile) VALUES (?, 'KJL', 2, 1)",
+                       (ensayo_id,))
+        cursor.execute("INSERT INTO herbicida (ensayo_id, herbicide, dose) VALUES (?, 'glifosato', 1.5)",
+                       (ensayo_id,))
+        insertar_malezas(cursor, pd.DataFrame({
+            "weed_diameter": [3.0, 12.5, 30.0],
+            "size": [3.0, 15.0, 30.0],
+            "height": [1.0, None, 8.0],
+            "weed_placement": ["ROW", "FURROW", "ROW"],
+            "weed_type": ["HA", "G", "HA"],
+            "weed_name": ["AMARANTHUS", "SORGHUM", "CONYZA"],
+            "weed_applied": [1, 0, 1],
+        }), ensayo_id, "prueba")
+        base.commit()
+        return ensayo_id
+    return insertar
@@ -0,0 +1,26 @@
+# Borrado en cascada: un DELETE sobre ensayos se lleva sus filas y las de las tablas derivadas
+import pytest
+
+from ensayos_db import borrar_ensayos, busqueda, contar_ensayos, cubo, hechos
+
+
+def test_borrar_un_ensayo(base, nuevo_ensayo):
+    ensayo_id = nuevo_ensayo()
+    nuevo_ensayo(cliente="Segundo cliente", farm="San José")
+
+    # El cliente del ensayo borrado queda sin ensayos y se borra con él
+    assert borrar_ensayos(base, ensayo_id=ensayo_id) == (1, 1)
+    base.commit()
+
+    for tabla in ["resultados_malezas", "ubicacion", "malezas_flat", "malezas_cubo"]:
+        assert base.execute(f"SELECT COUNT(*) FROM {tabla} WHERE ensayo_id = ?", (ensayo_id,)).fetchone()[0] == 0
+    assert hechos.verificar(base) == (0, 0)
+    assert cubo.verificar(base) == (0, 0)
+    assert busqueda.verificar(base) == (0, 0)
+
+
+def test_borrar_sin_criterios_no_borra_nada(base):
+    with pytest.raises(ValueError):
+        borrar_ensayos(base)
+    with pytest.raises(ValueError):
+        contar_ensayos(base)
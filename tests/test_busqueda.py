@@ -0,0 +1,72 @@
+# Búsqueda de texto completo: los documentos siguen a las tablas y encuentran todas las especies
+import pandas as pd
+import pytest
+
+from ensayos_db import buscar_ensayos, busqueda, insertar_malezas, obtener_cliente_id
+
+
+def _insertar_ensayo(conn, malezas):
+    cursor = conn.cursor()
+    cliente_id = obtener_cliente_id(cursor, "Cliente de búsqueda", "S-1", "M-1")
+    cursor.execute("INSERT INTO ensayos (cliente_id, test_date) VALUES (?, '2025-03-01')", (cliente_id,))
+    ensayo_id = cursor.lastrowid
+    cursor.execute("INSERT INTO ubicacion (ensayo_id, farm) VALUES (?, 'La Esperanza')", (ensayo_id,))
+    insertar_malezas(cursor, pd.DataFrame(malezas), ensayo_id, "prueba")
+    conn.commit()
+    return ensayo_id
+
+
+def _encontrados(conn, texto):
+    return {fila[0] for fila in buscar_ensayos(conn, texto)}
+
+
+def test_encuentra_especies_sin_weed_applied(base):
+    # malezas_cubo no cuenta estas malezas, pero la búsqueda sí tiene que encontrarlas
+    ensayo_id = _insertar_ensayo(base, {
+        "weed_name": ["XANTHIUM", "AMARANTHUS"],
+        "weed_applied": [None, 1],
+    })
+    assert busqueda.verificar(base) == (0, 0)
+    assert ensayo_id in _encontrados(base, "xanth")
+    assert ensayo_id in _encontrados(base, "amar esper")
+
+
+def test_la_ultima_maleza_de_una_especie_la_saca_del_documento(base):
+    ensayo_id = _insertar_ensayo(base, {
+        "weed_name": ["XANTHIUM", "XANTHIUM", "AMARANTHUS"],
+        "weed_applied": [None, 0, 1],
+    })
+    borrar = "DELETE FROM resultados_malezas WHERE id = (SELECT MIN(id) FROM resultados_malezas WHERE ensayo_id = ?)"
+
+    base.execute(borrar, (ensayo_id,))
+    assert ensayo_id in _encontrados(base, "xanth")
+    base.execute(borrar, (ensayo_id,))
+    assert ensayo_id not in _encontrados(base, "xanth")
+    assert busqueda.verificar(base) == (0, 0)
+
+
+def test_cambiar_la_especie_de_una_maleza(base):
+    ensayo_id = _insertar_ensayo(base, {"weed_name": ["XANTHIUM"], "weed_applied": [None]})
+    base.execute("INSERT OR IGNORE INTO nombres_maleza (valor) VALUES ('AMARANTHUS')")
+    base.execute(
+        "UPDATE resultados_malezas SET weed_name_id = (SELECT id FROM nombres_maleza WHERE valor = 'AMARANTHUS') "
+        "WHERE ensayo_id = ?", (ensayo_id,)
+    )
+    assert ensayo_id not in _encontrados(base, "xanth")
+    assert ensayo_id in _encontrados(base, "amaranthus")
+    assert busqueda.verificar(base) == (0, 0)
+
+
+@pytest.mark.parametrize("cambio", [
+    "UPDATE ensayos SET test_date = '2025-04-02' WHERE ensayo_id = :ensayo",
+    "UPDATE ubicacion SET farm = 'El Ombú' WHERE ensayo_id = :ensayo",
+    "UPDATE herbicida SET herbicide = 'atrazina' WHERE ensayo_id = :ensayo",
+    "UPDATE clientes SET name = 'Otro cliente' WHERE cliente_id = (SELECT cliente_id FROM ensayos WHERE ensayo_id = :ensayo)",
+    "DELETE FROM ubicacion WHERE ensayo_id = :ensayo",
+    "DELETE FROM ensayos WHERE ensayo_id = :ensayo",
+])
+def test_los_documentos_siguen_a_las_tablas(base, nuevo_ensayo, cambio):
+    ensayo_id = nuevo_ensayo()
+    base.execute(cambio, {"ensayo": ensayo_id})
+    base.commit()
+    assert busqueda.verificar(base) == (0, 0)
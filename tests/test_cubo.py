@@ -0,0 +1,36 @@
+# malezas_cubo suma las malezas de malezas_flat por ensayo y combinación de dimensiones
+import pytest
+
+from ensayos_db import cubo, tramos_en_rango
+
+
+@pytest.mark.parametrize("cambio", [
+    "UPDATE pulverizadora SET speed = 18 WHERE ensayo_id = :ensayo",
+    "UPDATE modelo_deteccion SET sens = 3 WHERE ensayo_id = :ensayo",
+    "UPDATE clientes SET name = 'Otro cliente' WHERE cliente_id = (SELECT cliente_id FROM ensayos WHERE ensayo_id = :ensayo)",
+    "UPDATE resultados_malezas SET weed_diameter = 40, weed_applied = 0 WHERE ensayo_id = :ensayo",
+    "UPDATE resultados_malezas SET weed_applied = NULL WHERE ensayo_id = :ensayo",
+    "UPDATE resultados_malezas SET weed_name_id = (SELECT id FROM nombres_maleza WHERE valor = 'SORGHUM') "
+    "WHERE ensayo_id = :ensayo",
+    "DELETE FROM resultados_malezas WHERE id = (SELECT MIN(id) FROM resultados_malezas WHERE ensayo_id = :ensayo)",
+])
+def test_actualizar_y_borrar_filas(base, nuevo_ensayo, cambio):
+    ensayo_id = nuevo_ensayo()
+    assert cubo.verificar(base) == (0, 0)
+    base.execute(cambio, {"ensayo": ensayo_id})
+    base.commit()
+    assert cubo.verificar(base) == (0, 0)
+
+
+def test_malezas_y_aplicadas_por_ensayo(base, nuevo_ensayo):
+    ensayo_id = nuevo_ensayo()
+    assert base.execute(
+        "SELECT SUM(malezas), SUM(aplicadas) FROM malezas_cubo WHERE ensayo_id = ?", (ensayo_id,)
+    ).fetchone() == (3, 2)
+
+
+def test_tramos_en_rango():
+    assert tramos_en_rango("weed_diameter", 0, 15) == [1]
+    assert tramos_en_rango("weed_diameter", 15, float("inf")) == [2, 3, 4]
+    # Un extremo que no es borde no se puede resolver en el cubo
+    assert tramos_en_rango("weed_diameter", 0, 10) is None
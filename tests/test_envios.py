@@ -0,0 +1,48 @@
+# Envíos repetidos: la huella los reconoce y el índice único no deja guardarlos dos veces
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from ensayos_db import ensayo_por_huella, huella_envio, huella_planilla
+
+PLANILLA = pd.DataFrame({
+    "weed_diameter": [3.0, 12.5, 30.0, 4.0],
+    "weed_name": ["AMARANTHUS", "SORGHUM", "CONYZA", None],
+})
+
+
+def _huella(planilla=PLANILLA, identidad=("Cliente", "2025-03-01", "10:00:00", "La Esperanza", "Lote 1")):
+    return huella_envio(identidad, huella_planilla([planilla]))
+
+
+def _enviar(conn, huella):
+    conn.execute("INSERT INTO ensayos (test_date, hash_envio) VALUES ('2025-03-01', ?)", (huella,))
+    conn.commit()
+
+
+def test_la_huella_no_depende_de_los_bloques():
+    assert huella_planilla([PLANILLA]) == huella_planilla([PLANILLA.iloc[:1], PLANILLA.iloc[1:3], PLANILLA.iloc[3:]])
+
+
+def test_la_huella_cambia_con_la_planilla_y_con_el_ensayo():
+    otra_planilla = PLANILLA.assign(weed_diameter=[3.0, 12.5, 30.0, 4.5])
+    assert _huella() != _huella(planilla=otra_planilla)
+    assert _huella() != _huella(identidad=("Cliente", "2025-03-02", "10:00:00", "La Esperanza", "Lote 1"))
+    assert _huella() == _huella()
+
+
+def test_un_envio_repetido_se_reconoce(base):
+    huella = _huella()
+    assert ensayo_por_huella(base, huella) is None
+    _enviar(base, huella)
+    ensayo_id = base.execute("SELECT MAX(ensayo_id) FROM ensayos").fetchone()[0]
+    assert ensayo_por_huella(base, huella) == ensayo_id
+
+
+def test_el_indice_unico_rechaza_el_duplicado(base):
+    _enviar(base, _huella())
+    with pytest.raises(sqlite3.IntegrityError):
+        _enviar(base, _huella())
+    base.rollback()
+    assert base.execute("SELECT COUNT(*) FROM ensayos WHERE hash_envio = ?", (_huella(),)).fetchone()[0] == 1
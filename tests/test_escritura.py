@@ -0,0 +1,129 @@
+# Cola de escritura: un trabajo que falla no afecta al resto de su tanda
+import sqlite3
+import threading
+
+import pytest
+
+from ensayos_db import ColaEscritura, abrir_conexion, borrar_ensayos, obtener_cliente_id
+from ensayos_db import clientes
+
+
+def _insertar(fecha):
+    def trabajo(conn):
+        return conn.execute("INSERT INTO ensayos (test_date) VALUES (?)", (fecha,)).lastrowid
+    return trabajo
+
+
+def _fallar(conn):
+    conn.execute("INSERT INTO ensayos (test_date) VALUES ('2030-01-01')")
+    raise ValueError("trabajo que falla")
+
+
+def _fechas(ruta):
+    conn = abrir_conexion(ruta)
+    try:
+        return {fila[0] for fila in conn.execute("SELECT test_date FROM ensayos WHERE test_date >= '2030-01-01'")}
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def cola(base, ruta_base):
+    cola = ColaEscritura(ruta_base)
+    yield cola
+    cola.detener()
+
+
+def _en_una_tanda(cola, trabajos):
+    # Se encolan antes de arrancar el hilo: la primera tanda los toma a todos
+    futuros = [cola.enviar(trabajo) for trabajo in trabajos]
+    cola.iniciar()
+    return futuros
+
+
+def test_un_trabajo_que_falla_no_afecta_a_su_tanda(cola, ruta_base):
+    futuros = _en_una_tanda(cola, [_insertar("2030-01-02"), _fallar, _insertar("2030-01-03")])
+
+    assert isinstance(futuros[0].result(timeout=10), int)
+    with pytest.raises(ValueError, match="trabajo que falla"):
+        futuros[1].result(timeout=10)
+    assert isinstance(futuros[2].result(timeout=10), int)
+    # Lo que escribió el trabajo que falló se deshizo; lo de los demás se confirmó
+    assert _fechas(ruta_base) == {"2030-01-02", "2030-01-03"}
+
+
+def test_un_error_de_la_base_en_un_trabajo_no_afecta_a_su_tanda(cola, ruta_base):
+    def violar_restriccion(conn):
+        conn.execute("INSERT INTO modelo_deteccion (ensayo_id, sens) VALUES (1, 9)")
+
+    futuros = _en_una_tanda(cola, [_insertar("2030-01-02"), violar_restriccion, _insertar("2030-01-03")])
+
+    with pytest.raises(sqlite3.IntegrityError):
+        futuros[1].result(timeout=10)
+    assert futuros[0].result(timeout=10) != futuros[2].result(timeout=10)
+    assert _fechas(ruta_base) == {"2030-01-02", "2030-01-03"}
+
+
+def test_un_trabajo_deshecho_no_deja_clientes_en_cache(cola, ruta_base):
+    def alta_y_falla(conn):
+        # La segunda búsqueda encuentra el alta sin confirmar y la cachea
+        obtener_cliente_id(conn.cursor(), "Cliente deshecho", "S-9", "M-9")
+        obtener_cliente_id(conn.cursor(), "Cliente deshecho", "S-9", "M-9")
+        raise ValueError("después del alta")
+
+    futuros = _en_una_tanda(cola, [alta_y_falla, _insertar("2030-01-02")])
+    with pytest.raises(ValueError):
+        futuros[0].result(timeout=10)
+    futuros[1].result(timeout=10)
+
+    assert not any("Cliente deshecho" in clave for clave in clientes._cache)
+    cliente_id = cola.ejecutar(lambda conn: obtener_cliente_id(conn.cursor(), "Cliente deshecho", "S-9", "M-9"),
+                               timeout=10)
+    conn = abrir_conexion(ruta_base)
+    assert conn.execute("SELECT name FROM clientes WHERE cliente_id = ?", (cliente_id,)).fetchone() == (
+        "Cliente deshecho",
+    )
+    conn.close()
+
+
+def _alta_con_cliente(conn):
+    cliente_id = obtener_cliente_id(conn.cursor(), "Cliente borrado", "S-8", "M-8")
+    conn.execute("INSERT INTO ensayos (cliente_id, test_date) VALUES (?, '2030-01-05')", (cliente_id,))
+    return cliente_id
+
+
+def test_borrar_un_cliente_lo_saca_del_cache(cola, ruta_base):
+    cola.iniciar()
+    cola.ejecutar(_alta_con_cliente, timeout=10)
+    # La segunda alta encuentra el cliente confirmado y lo cachea
+    cola.ejecutar(_alta_con_cliente, timeout=10)
+
+    # El caché se vacía en el trabajo que borra, no después en la sesión que lo pidió
+    assert cola.ejecutar(lambda conn: borrar_ensayos(conn, desde="2030-01-05"), timeout=10) == (2, 1)
+    cliente_id = cola.ejecutar(_alta_con_cliente, timeout=10)
+
+    conn = abrir_conexion(ruta_base)
+    assert conn.execute("SELECT name FROM clientes WHERE cliente_id = ?", (cliente_id,)).fetchone() == (
+        "Cliente borrado",
+    )
+    conn.close()
+
+
+def test_un_trabajo_aislado_que_falla_se_deshace(cola, ruta_base):
+    cola.iniciar()
+    with pytest.raises(ValueError):
+        cola.ejecutar(_fallar, aislado=True, timeout=10)
+    cola.ejecutar(_insertar("2030-01-02"), aislado=True, timeout=10)
+    assert _fechas(ruta_base) == {"2030-01-02"}
+
+
+def test_envios_simultaneos_se_confirman_todos(cola, ruta_base):
+    cola.iniciar()
+    fechas = [f"2030-02-{dia:02d}" for dia in range(1, 21)]
+    hilos = [threading.Thread(target=cola.ejecutar, args=(_insertar(fecha),), kwargs={"timeout": 10})
+             for fecha in fechas]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert _fechas(ruta_base) == set(fechas)
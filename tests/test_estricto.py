@@ -0,0 +1,48 @@
+# Tablas STRICT: la migración convierte los valores sin perder ninguno o no convierte nada
+import sqlite3
+
+import pytest
+
+from ensayos_db import abrir_conexion, estricto, migrar
+from ensayos_db.migraciones import version_actual
+
+# Última versión antes de convertir las tablas a STRICT
+ANTES_DE_ESTRICTAS = 5
+
+
+def _valores(conn, tabla, columna):
+    return sorted(
+        conn.execute(f"SELECT ensayo_id, {columna} FROM {tabla}").fetchall(), key=lambda fila: fila[0]
+    )
+
+
+def test_las_tablas_quedan_estrictas_con_sus_valores(ruta_base):
+    cruda = sqlite3.connect(ruta_base)
+    modelos = _valores(cruda, "modelo_deteccion", "model_id")
+    dosis = _valores(cruda, "herbicida", "dose")
+    cruda.close()
+
+    conn = abrir_conexion(ruta_base)
+    migrar(conn)
+
+    assert all(estricto.es_estricta(conn, tabla) for tabla in estricto.tablas_estrictas())
+    # Los códigos de modelo son texto aunque la base los declarara INTEGER
+    assert _valores(conn, "modelo_deteccion", "model_id") == modelos
+    assert {tipo for (tipo,) in conn.execute("SELECT typeof(model_id) FROM modelo_deteccion")} <= {"text", "null"}
+    assert _valores(conn, "herbicida", "dose") == dosis
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("UPDATE modelo_deteccion SET sens = 'alto'")
+
+
+def test_valores_que_no_se_pueden_convertir_detienen_la_migracion(ruta_base):
+    conn = abrir_conexion(ruta_base)
+    migrar(conn, hasta=ANTES_DE_ESTRICTAS)
+    conn.execute("UPDATE modelo_deteccion SET sens = 'alto' WHERE rowid = (SELECT MIN(rowid) FROM modelo_deteccion)")
+    conn.commit()
+
+    with pytest.raises(sqlite3.IntegrityError, match="modelo_deteccion.sens"):
+        migrar(conn)
+
+    # Nada se perdió: la base quedó en la versión anterior con el valor intacto
+    assert version_actual(conn) == ANTES_DE_ESTRICTAS
+    assert conn.execute("SELECT COUNT(*) FROM modelo_deteccion WHERE sens = 'alto'").fetchone()[0] == 1
@@ -0,0 +1,45 @@
+# malezas_flat sigue a las tablas normalizadas por medio de sus triggers
+import pytest
+
+from ensayos_db import hechos
+
+# Un cambio por cada tabla de la que malezas_flat copia columnas
+CAMBIOS = [
+    "UPDATE ensayos SET test_date = '2025-04-02' WHERE ensayo_id = :ensayo",
+    "UPDATE ubicacion SET farm = 'El Ombú' WHERE ensayo_id = :ensayo",
+    "UPDATE pulverizadora SET speed = 18 WHERE ensayo_id = :ensayo",
+    "UPDATE modelo_deteccion SET sens = 3 WHERE ensayo_id = :ensayo",
+    "UPDATE clientes SET name = 'Otro cliente' WHERE cliente_id = (SELECT cliente_id FROM ensayos WHERE ensayo_id = :ensayo)",
+    "UPDATE resultados_malezas SET weed_diameter = 40, weed_applied = 0 WHERE ensayo_id = :ensayo",
+    "UPDATE resultados_malezas SET weed_name_id = (SELECT id FROM nombres_maleza WHERE valor = 'SORGHUM') "
+    "WHERE ensayo_id = :ensayo",
+    "DELETE FROM resultados_malezas WHERE id = (SELECT MIN(id) FROM resultados_malezas WHERE ensayo_id = :ensayo)",
+    "DELETE FROM ubicacion WHERE ensayo_id = :ensayo",
+]
+
+
+def test_insertar(base, nuevo_ensayo):
+    ensayo_id = nuevo_ensayo()
+    assert hechos.verificar(base) == (0, 0)
+    assert base.execute("""
+        SELECT weed_name, speed, sensitivity, cliente, farm FROM malezas_flat WHERE ensayo_id = ? ORDER BY id
+    """, (ensayo_id,)).fetchall() == [
+        ("AMARANTHUS", 12.5, 2, "Cliente de prueba", "La Esperanza"),
+        ("SORGHUM", 12.5, 2, "Cliente de prueba", "La Esperanza"),
+        ("CONYZA", 12.5, 2, "Cliente de prueba", "La Esperanza"),
+    ]
+
+
+@pytest.mark.parametrize("cambio", CAMBIOS)
+def test_actualizar_y_borrar_filas(base, nuevo_ensayo, cambio):
+    ensayo_id = nuevo_ensayo()
+    base.execute(cambio, {"ensayo": ensayo_id})
+    base.commit()
+    assert hechos.verificar(base) == (0, 0)
+
+
+def test_reconstruir_no_cambia_nada(base, nuevo_ensayo):
+    nuevo_ensayo()
+    filas = base.execute("SELECT * FROM malezas_flat ORDER BY id").fetchall()
+    hechos.reconstruir(base)
+    assert base.execute("SELECT * FROM malezas_flat ORDER BY id").fetchall() == filas
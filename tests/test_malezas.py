@@ -0,0 +1,70 @@
+# Inserción de las malezas de un envío: una fila inválida rechaza el envío entero
+import pandas as pd
+import pytest
+
+from ensayos_db import insertar_malezas, insertar_malezas_en_bloques
+from ensayos_db.malezas import MAX_FILAS_INFORMADAS, FilasInvalidas
+
+
+def _planilla(diametros, aplicado=None):
+    return pd.DataFrame({
+        "weed_diameter": diametros,
+        "weed_name": ["AMARANTHUS"] * len(diametros),
+        "weed_applied": aplicado or [1] * len(diametros),
+    })
+
+
+def _ensayo(conn):
+    return conn.execute("INSERT INTO ensayos (test_date) VALUES ('2025-03-01')").lastrowid
+
+
+def _malezas(conn, ensayo_id):
+    return conn.execute("SELECT COUNT(*) FROM resultados_malezas WHERE ensayo_id = ?", (ensayo_id,)).fetchone()[0]
+
+
+def test_inserta_todas_las_filas(base):
+    ensayo_id = _ensayo(base)
+    assert insertar_malezas(base.cursor(), _planilla([3.0, "12.5", None]), ensayo_id, "prueba") == 3
+    assert _malezas(base, ensayo_id) == 3
+
+
+def test_una_fila_invalida_rechaza_la_planilla(base):
+    ensayo_id = _ensayo(base)
+    planilla = _planilla([3.0, "grande", 30.0, 4.0], aplicado=[1, 0, "si", 1])
+
+    with pytest.raises(FilasInvalidas) as error:
+        insertar_malezas(base.cursor(), planilla, ensayo_id, "prueba")
+
+    # Filas como en el CSV: el encabezado es la 1
+    assert error.value.cantidad == 2
+    assert error.value.filas == [3, 4]
+    assert "filas 3, 4" in str(error.value)
+    assert _malezas(base, ensayo_id) == 0
+
+
+def test_en_bloques_se_informan_las_filas_de_toda_la_planilla(base):
+    ensayo_id = _ensayo(base)
+    diametros = [float(n) for n in range(100)]
+    for indice in range(10, 100, 3):
+        diametros[indice] = "x"
+    planilla = _planilla(diametros)
+    bloques = [planilla.iloc[inicio:inicio + 25] for inicio in range(0, 100, 25)]
+
+    with pytest.raises(FilasInvalidas) as error:
+        insertar_malezas_en_bloques(base.cursor(), bloques, ensayo_id, "prueba")
+
+    assert error.value.cantidad == 30
+    assert error.value.filas == [indice + 2 for indice in range(10, 100, 3)][:MAX_FILAS_INFORMADAS]
+    assert _malezas(base, ensayo_id) == 0
+
+
+def test_en_bloques_inserta_y_avisa_el_avance(base):
+    ensayo_id = _ensayo(base)
+    planilla = _planilla([float(n) for n in range(60)])
+    avance = []
+    insertadas = insertar_malezas_en_bloques(
+        base.cursor(), [planilla.iloc[:40], planilla.iloc[40:]], ensayo_id, "prueba", avance=avance.append
+    )
+    assert insertadas == 60
+    assert avance == [40, 60]
+    assert _malezas(base, ensayo_id) == 60
@@ -0,0 +1,44 @@
+# Migraciones sobre una copia de la base que viene con el repo
+import sqlite3
+
+from ensayos_db import VERSION_ESQUEMA, abrir_conexion, busqueda, cubo, hechos, migrar
+from ensayos_db.esquema import INDICES
+from ensayos_db.migraciones import version_actual
+
+
+def _indices(conn):
+    return {fila[0] for fila in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+
+def test_migrar_la_base_del_repo(ruta_base):
+    cruda = sqlite3.connect(ruta_base)
+    malezas = cruda.execute("SELECT COUNT(*) FROM resultados_malezas").fetchone()[0]
+    cruda.close()
+
+    conn = abrir_conexion(ruta_base)
+    migrar(conn)
+
+    assert version_actual(conn) == VERSION_ESQUEMA
+    assert set(INDICES) <= _indices(conn)
+    assert conn.execute("SELECT COUNT(*) FROM resultados_malezas").fetchone()[0] == malezas
+    assert conn.execute("SELECT COUNT(*) FROM malezas_flat").fetchone()[0] == malezas
+    assert hechos.verificar(conn) == (0, 0)
+    assert cubo.verificar(conn) == (0, 0)
+    assert busqueda.verificar(conn) == (0, 0)
+    # Una base al día no tiene nada que aplicar
+    assert migrar(conn) == []
+
+
+def test_migrar_una_base_nueva(tmp_path):
+    conn = abrir_conexion(str(tmp_path / "nueva.db"))
+    migrar(conn)
+    assert version_actual(conn) == VERSION_ESQUEMA
+    assert set(INDICES) <= _indices(conn)
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'malezas_flat_cambios'").fetchone()[0] == 0
+
+
+def test_migrar_por_partes(ruta_base):
+    conn = abrir_conexion(ruta_base)
+    assert migrar(conn, hasta=2) == [1, 2]
+    assert version_actual(conn) == 2
+    assert migrar(conn) == list(range(3, VERSION_ESQUEMA + 1))
@@ -0,0 +1,42 @@
+# Resolución de encabezados de la planilla: acepta nombres, sinónimos y errores de tipeo, no otras columnas
+import pytest
+
+from verificarStem import normalizar_encabezado, resolver_columnas
+
+
+@pytest.mark.parametrize("encabezado, columna", [
+    ("weed diameter", "weed diameter"),
+    ("Diámetro (CM)", "weed diameter"),
+    ("Tamaño cm2", "size"),
+    ("ALTURA", "height"),
+    ("weed_placement", "weed placement"),
+    ("Nombre científico", "weed name"),
+    ("aplicada", "weed applied"),
+    ("weed applid", "weed applied"),
+])
+def test_resuelve_nombres_sinonimos_y_errores(encabezado, columna):
+    assert resolver_columnas([encabezado]) == {columna: encabezado}
+
+
+@pytest.mark.parametrize("encabezado", [
+    # Porcentaje de la planilla SOJA, no el aplicado de cada maleza
+    "% aplicado",
+    # Una letra de distancia de "height", pero es otra columna
+    "weight",
+    # Columna repetida que pandas renombró
+    "Nombre.1",
+])
+def test_no_resuelve_otras_columnas(encabezado):
+    assert resolver_columnas([encabezado]) == {}
+
+
+def test_una_columna_repetida_no_reemplaza_a_la_original():
+    assert resolver_columnas(["Nombre.1", "Nombre", "% aplicado", "aplicado"]) == {
+        "weed name": "Nombre",
+        "weed applied": "aplicado",
+    }
+
+
+def test_normalizar_conserva_los_simbolos():
+    assert normalizar_encabezado("% Aplicado") == "% aplicado"
+    assert normalizar_encabezado("Tamaño (CM2)") == "tamano"
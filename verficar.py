@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import glob
 import os
@@ -96,6 +97,31 @@ def verificar_columnas(df):
                 print(f"❌ '{col}' NO está presente.")
 
 
+def es_flotante(valor):
+    try:
+        float(valor)
+        return True
+    except (ValueError, TypeError):
+        return False
+
+
+def filas_no_flotantes(serie):
+    """
+    Máscara de los valores no nulos de `serie` que float() no acepta. Cada valor
+    distinto se revisa una sola vez (pd.factorize): pd.to_numeric convierte de una
+    vez los que ya son números y el resto se prueba con float().
+    """
+    if pd.api.types.is_numeric_dtype(serie):
+        return np.zeros(len(serie), dtype=bool)
+    codigos, unicos = pd.factorize(serie)
+    dudosos = pd.to_numeric(pd.Series(unicos, dtype=object), errors="coerce").isna().to_numpy()
+    # Un lugar más al final para los vacíos, que factorize marca con -1
+    invalidos = np.zeros(len(unicos) + 1, dtype=bool)
+    for i in np.flatnonzero(dudosos):
+        invalidos[i] = not es_flotante(unicos[i])
+    return invalidos[codigos]
+
+
 def verificar_tipo_dato(df, col_original, col_normalizado):
     """
     Verifica que los valores de una columna sean del tipo esperado.
@@ -110,12 +136,9 @@ def verificar_tipo_dato(df, col_original, col_normalizado):
     columnas_flotantes = ['weed diameter', 'size', 'height']
 
     if col_normalizado in columnas_flotantes:
-        for idx, valor in df[col_original].items():
-            if pd.notna(valor):
-                try:
-                    float(valor)
-                except (ValueError, TypeError):
-                    print(f"⚠️ Valor no flotante en '{col_original}' (fila {idx}): '{valor}'")
+        serie = df[col_original]
+        for idx, valor in serie[filas_no_flotantes(serie)].items():
+            print(f"⚠️ Valor no flotante en '{col_original}' (fila {idx}): '{valor}'")
 
     elif col_normalizado == 'weed applied':
         valores_unicos = df[col_original].dropna().unique()
@@ -1,3 +1,9 @@
+import difflib
+import functools
+import re
+import unicodedata
+
+import numpy as np
 import pandas as pd
 import streamlit as st
 import glob
@@ -5,6 +11,8 @@ import os
 from datetime import datetime
 import sqlite3
 
+from ensayos_db import huella_planilla
+
 # Columnas que queremos verificar
 COLUMNAS_A_BUSCAR = [
     "weed diameter",  # diametro (float)
@@ -16,6 +24,145 @@ COLUMNAS_A_BUSCAR = [
     "weed applied"    # aplicado (bool)
 ]
 
+# Sinónimos (en otro idioma o abreviados) de cada columna buscada; se comparan normalizados
+EQUIVALENCIAS = {
+    'weed diameter': ['diametro', 'diameter', 'diametro maleza'],
+    'size': ['tamaño', 'area', 'superficie'],
+    'height': ['altura', 'alto'],
+    'weed placement': ['lugar', 'ubicacion', 'posicion', 'localizacion', 'placement'],
+    'weed type': ['tipo', 'tipo maleza', 'clase', 'categoria', 'type'],
+    'weed name': ['nombre', 'identificacion', 'nombre maleza', 'nombre científico', 'name'],
+    'weed applied': ['aplicado', 'se aplicó', 'fue aplicado', 'applied']
+}
+
+# Unidades que se ignoran al final de un encabezado ("altura cm"); entre paréntesis se ignora todo
+UNIDADES = {'cm', 'cm2', 'mm', 'mm2', 'm', 'm2', 'in', 'in2', 'inch', 'inch2', 'pulg', 'pulgadas'}
+
+# Similitud mínima (difflib) para aceptar un encabezado mal escrito ("aplicada", "diamtero").
+# Solo se compara por similitud entre formas de LARGO_MINIMO_SIMILITUD letras o más: en
+# palabras cortas una letra distinta ya es otra palabra ("weight" no es "height")
+UMBRAL_SIMILITUD = 0.85
+LARGO_MINIMO_SIMILITUD = 7
+
+# Símbolos que cambian el sentido de un encabezado ("% aplicado" es un porcentaje, no
+# "aplicado"): se conservan al normalizar y un encabezado que los tiene solo se acepta exacto
+SIMBOLOS = "%#"
+
+# Sufijo que pandas agrega a los encabezados repetidos ("Nombre", "Nombre.1")
+SUFIJO_REPETIDO = re.compile(r"(?<=\D)\.\d+$")
+
+# Columnas de texto: se leen siempre como texto, así un bloque no cambia de tipo según sus valores
+COLUMNAS_TEXTO = ["weed placement", "weed type", "weed name"]
+
+# Lectura de a bloques: filas por bloque y cuántas se guardan para mostrar
+FILAS_POR_BLOQUE = 50_000
+FILAS_MUESTRA = 100
+MAX_ERRORES_GUARDADOS = 20
+
+
+def normalizar_encabezado(texto):
+    """
+    Forma comparable de un encabezado: sin tildes, en minúscula, sin lo que va
+    entre paréntesis o corchetes (unidades), con la puntuación como espacios salvo
+    los SIMBOLOS y sin unidades sueltas al final. "Tamaño (CM2)" -> "tamano",
+    "weed_size" -> "weed size", "% aplicado" -> "% aplicado".
+    """
+    texto = unicodedata.normalize("NFKD", str(texto))
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).lower()
+    texto = re.sub(r"\(.*?\)|\[.*?\]", " ", texto)
+    palabras = re.findall(f"[0-9a-z]+|[{re.escape(SIMBOLOS)}]", texto)
+    while len(palabras) > 1 and palabras[-1] in UNIDADES:
+        palabras.pop()
+    return " ".join(palabras)
+
+
+def _armar_indice():
+    # forma normalizada -> (columna, nivel): 2 el nombre estándar, 1 un sinónimo
+    indice = {}
+    for col in COLUMNAS_A_BUSCAR:
+        for posible in EQUIVALENCIAS.get(col, []):
+            indice.setdefault(normalizar_encabezado(posible), (col, 1))
+        indice[normalizar_encabezado(col)] = (col, 2)
+    return indice
+
+
+# Índice de nombres y sinónimos, normalizados una sola vez
+INDICE_COLUMNAS = _armar_indice()
+
+
+def _candidato(encabezado, comparadores):
+    # Mejor (columna, puntaje) para un encabezado. El puntaje es una tupla que ordena
+    # primero por nivel (nombre estándar, sinónimo, parecido), después si el encabezado
+    # es literalmente el nombre o sinónimo (sin tildes quitadas ni unidades) y por último
+    # por similitud. Un encabezado repetido (ver SUFIJO_REPETIDO) no propone nada
+    if SUFIJO_REPETIDO.search(str(encabezado).strip()):
+        return None
+    normalizado = normalizar_encabezado(encabezado)
+    if normalizado in INDICE_COLUMNAS:
+        col, nivel = INDICE_COLUMNAS[normalizado]
+        literal = str(encabezado).strip().lower() in [col] + EQUIVALENCIAS.get(col, [])
+        return col, (nivel, literal, 1.0)
+    if len(normalizado) < LARGO_MINIMO_SIMILITUD or any(simbolo in normalizado for simbolo in SIMBOLOS):
+        return None
+    mejor = None
+    for col, comparador in comparadores:
+        comparador.set_seq1(normalizado)
+        # Las cotas rápidas descartan casi todos los pares sin calcular ratio()
+        if comparador.real_quick_ratio() < UMBRAL_SIMILITUD or comparador.quick_ratio() < UMBRAL_SIMILITUD:
+            continue
+        similitud = comparador.ratio()
+        if similitud >= UMBRAL_SIMILITUD and (mejor is None or similitud > mejor[1][2]):
+            mejor = (col, (0, False, similitud))
+    return mejor
+
+
+def resolver_columnas(columnas):
+    """
+    Resuelve qué encabezado de la planilla corresponde a cada columna buscada,
+    en una sola pasada por los encabezados. Se comparan normalizados (ver
+    normalizar_encabezado) contra INDICE_COLUMNAS; si no hay coincidencia, gana
+    el nombre o sinónimo más parecido por encima de UMBRAL_SIMILITUD (solo entre
+    formas largas y sin SIMBOLOS). Los encabezados repetidos que pandas renombra
+    ("Nombre.1") no se usan. Si varios
+    encabezados apuntan a la misma columna gana el nombre estándar sobre un
+    sinónimo y un sinónimo sobre un parecido, después el escrito tal cual
+    ("Diametro" sobre "Diámetro (CM)") y después el que está primero. Solo usa
+    los encabezados, así que se hace una vez por archivo aunque las filas se
+    lean de a bloques.
+
+    Returns:
+        dict: columna de COLUMNAS_A_BUSCAR -> encabezado original (las que faltan no están)
+    """
+    # Un comparador por forma del índice: difflib prepara la segunda secuencia una vez
+    comparadores = [(col, difflib.SequenceMatcher(None, b=forma, autojunk=False))
+                    for forma, (col, _) in INDICE_COLUMNAS.items() if len(forma) >= LARGO_MINIMO_SIMILITUD]
+    candidatos = []
+    for posicion, encabezado in enumerate(columnas):
+        candidato = _candidato(encabezado, comparadores)
+        if candidato is not None:
+            col, puntaje = candidato
+            candidatos.append((puntaje, -posicion, col, encabezado))
+
+    # Cada encabezado propone una sola columna; cada columna se queda con su mejor propuesta
+    mapeo = {}
+    for _, _, col, encabezado in sorted(candidatos, key=lambda c: c[:2], reverse=True):
+        mapeo.setdefault(col, encabezado)
+    return {col: mapeo[col] for col in COLUMNAS_A_BUSCAR if col in mapeo}
+
+
+def mostrar_columnas(mapeo, nulos=None):
+    """Avisa qué columnas se encontraron (y con qué nombre) y cuáles faltan."""
+    for col in COLUMNAS_A_BUSCAR:
+        if col not in mapeo:
+            st.warning(f"❌ '{col}' NO está presente.")
+            continue
+        detalle = f" Valores nulos: {nulos[col]}" if nulos is not None else ""
+        if mapeo[col].strip().lower() == col:
+            st.info(f"✅ '{col}' está presente.{detalle}")
+        else:
+            st.info(f"✅🔄 '{col}' fue encontrado como '{mapeo[col]}' y renombrado.{detalle}")
+
+
 def verificar_columnas(df):
     """
     Verifica que contenga las columnas esenciales, y si alguna tiene un nombre distinto,
@@ -24,35 +171,64 @@ def verificar_columnas(df):
     Args:
         df: archivo a verificar
     """
-    columnas_originales = df.columns
-    columnas_normalizadas = [c.strip().lower() for c in columnas_originales]
-    mapeo_columnas = dict(zip(columnas_normalizadas, columnas_originales))
+    mapeo = resolver_columnas(df.columns)
+    df.rename(columns={original: col for col, original in mapeo.items()}, inplace=True)
+    mostrar_columnas(mapeo, {col: df[col].isnull().sum() for col in mapeo})
+    return df, verificar_bloque(df)
 
-    errores_tipo_dato = {}
 
+def verificar_bloque(df):
+    """
+    Verifica el tipo de dato de las columnas buscadas de `df` (ya renombradas).
+
+    Returns:
+        dict: columna -> lista de errores (solo las columnas con errores)
+    """
+    errores_tipo_dato = {}
     for col in COLUMNAS_A_BUSCAR:
-        col_lower = col.lower()
-        if col_lower in columnas_normalizadas:
-            col_original = mapeo_columnas[col_lower]
-            if col_original != col:
-                df.rename(columns={col_original: col}, inplace=True)
-            cantidad_nulls = df[col].isnull().sum()
-            st.info(f"✅ '{col}' está presente. Valores nulos: {cantidad_nulls}")
+        if col in df.columns:
             errores = verificar_tipo_dato(df, col, col)
             if errores:
                 errores_tipo_dato[col] = errores
-        else:
-            resultado = busqueda_profunda(col, columnas_normalizadas, df)
-            if resultado:
-                col_encontrada, nulos = resultado
-                st.info(f"✅🔄 '{col}' fue encontrado como '{col_encontrada}' y renombrado. Valores nulos: {nulos}")
-                errores = verificar_tipo_dato(df, col, col)
-                if errores:
-                    errores_tipo_dato[col] = errores
-            else:
-                st.warning(f"❌ '{col}' NO está presente.")
+    return errores_tipo_dato
+
+
+def es_flotante(valor):
+    try:
+        float(valor)
+        return True
+    except (ValueError, TypeError):
+        return False
+
 
-    return df, errores_tipo_dato
+def filas_no_numericas(serie, aceptados=()):
+    """
+    Máscara de los valores no nulos de `serie` que no son números (ni están en
+    `aceptados`, comparados sin espacios y en minúscula).
+
+    Cada valor distinto se revisa una sola vez (pd.factorize): pd.to_numeric
+    convierte de una vez los que ya son números y el resto se prueba con float(),
+    que acepta además espacios alrededor, 'nan' o 'inf'.
+    """
+    if pd.api.types.is_bool_dtype(serie):
+        # str(True) es 'True', que float() no acepta
+        return serie.notna().to_numpy()
+    if pd.api.types.is_numeric_dtype(serie):
+        return np.zeros(len(serie), dtype=bool)
+    codigos, unicos = pd.factorize(serie)
+    numeros = pd.to_numeric(pd.Series(unicos, dtype=object), errors="coerce")
+    # Un lugar más al final para los vacíos, que factorize marca con -1
+    invalidos = np.zeros(len(unicos) + 1, dtype=bool)
+    for i in np.flatnonzero(numeros.isna().to_numpy()):
+        texto = str(unicos[i]).strip().lower()
+        invalidos[i] = texto not in aceptados and not es_flotante(texto)
+    mascara = invalidos[codigos]
+    # factorize y to_numeric toman True como 1 y False como 0: si puede haber
+    # booleanos sueltos, las filas de esos dos valores se revisan una por una
+    if pd.api.types.infer_dtype(serie, skipna=True) in ("mixed", "mixed-integer", "boolean"):
+        filas = np.flatnonzero(np.isin(codigos, np.flatnonzero(numeros.isin([0, 1]).to_numpy())))
+        mascara[filas] = [isinstance(valor, (bool, np.bool_)) for valor in serie.iloc[filas]]
+    return mascara
 
 
 def verificar_tipo_dato(df, col_original, col_normalizado):
@@ -82,17 +258,10 @@ def verificar_tipo_dato(df, col_original, col_normalizado):
     valores_validos_placement = set(traducciones.keys())
 
     if col_normalizado in columnas_flotantes:
-        for idx, valor in df[col_original].items():
-            if pd.notna(valor):
-                valor_str = str(valor).strip().lower()
-
-                if col_normalizado == 'size' and valor_str == '>25':
-                    continue  # Aceptar expresamente '>25'
-                else:
-                    try:
-                        float(valor_str)
-                    except (ValueError, TypeError):
-                        errores.append(f"'{col_original}' (fila {idx}): '{valor}' no es un número válido.")
+        aceptados = {'>25'} if col_normalizado == 'size' else set()  # Aceptar expresamente '>25'
+        serie = df[col_original]
+        for idx, valor in serie[filas_no_numericas(serie, aceptados)].items():
+            errores.append(f"'{col_original}' (fila {idx}): '{valor}' no es un número válido.")
 
     elif col_normalizado == 'weed applied':
         valores_unicos = df[col_original].dropna().unique()
@@ -101,78 +270,50 @@ def verificar_tipo_dato(df, col_original, col_normalizado):
                 errores.append(f"'{col_original}': valor inválido '{valor}' (solo 0, 1, true, false).")
 
     elif col_normalizado == 'weed placement':
-        for idx, valor in df[col_original].items():
-            if pd.notna(valor):
-                valor_normalizado = str(valor).strip().lower()
-                if valor_normalizado not in valores_validos_placement:
-                    errores.append(f"'{col_original}' (fila {idx}): valor inválido '{valor}'.")
+        # Cada valor distinto se normaliza una sola vez; los vacíos (código -1) van al último lugar
+        serie = df[col_original]
+        codigos, unicos = pd.factorize(serie)
+        invalidos = np.array(
+            [str(valor).strip().lower() not in valores_validos_placement for valor in unicos] + [False]
+        )
+        for idx, valor in serie[invalidos[codigos]].items():
+            errores.append(f"'{col_original}' (fila {idx}): valor inválido '{valor}'.")
 
     return errores
 
 
 
-def busqueda_profunda(col, columnas_normalizadas, df):
+def estandarizar_bloque(df):
     """
-    Busca columnas equivalentes (en otro idioma o sinónimos) y si las encuentra,
-    renombra la columna del DataFrame para que se llame como `col`.
-
-    Args:
-        col: nombre estándar buscado (normalizado)
-        columnas_normalizadas: lista de columnas normalizadas (minúsculas, sin espacios)
-        df: DataFrame actual
+    Estandariza las columnas buscadas de `df` (ya renombradas), sin avisos:
+    - Reemplaza '>25' por 30 en la columna 'size' y pasa las medidas a número
+    - Traduce 'weed placement' y lleva 'weed applied' a 0/1
+    - Las columnas que faltan quedan vacías
 
     Returns:
-        tuple: (nuevo_nombre (col), cantidad_nulls) si se renombró, None si no se encontró
+        tuple: (DataFrame estandarizado, columnas faltantes, dict de valores inválidos de 'weed applied')
     """
-    equivalencias = {
-        'weed diameter': ['diametro', 'diameter', 'diametro maleza'],
-        'size': ['tamaño', 'area', 'superficie'],
-        'height': ['altura', 'alto'],
-        'weed placement': ['lugar', 'ubicacion', 'posicion', 'localizacion'],
-        'weed type': ['tipo', 'tipo maleza', 'clase', 'categoria'],
-        'weed name': ['nombre', 'identificacion', 'nombre maleza'],
-        'weed applied': ['aplicado', 'se aplicó', 'fue aplicado']
-    }
-
-    if col.lower() not in [k.lower() for k in equivalencias.keys()]:
-        return None
+    df_estandar = pd.DataFrame(index=df.index)
+    faltantes = []
+    invalidos = {}
 
-    for posible in equivalencias[col]:
-        posible_lower = posible.lower()
-        if posible_lower in columnas_normalizadas:
-            col_original = next((c for c in df.columns if c.strip().lower() == posible_lower), None)
-            if col_original:
-                cantidad_nulls = df[col_original].isnull().sum()
-                df.rename(columns={col_original: col}, inplace=True)  # Renombrar al formato exacto
-                return (col_original, cantidad_nulls)
-
-    return None
-
-def archivos_estandarizados(df):
-    """
-    Crea los archivos estandarizados con sus respectivos datos.
-    - Reemplaza '>25' por 30 en la columna 'size'
-    - Normaliza columnas clave y las renombra
-    - Maneja específicamente los valores NA en weed_placement
-    """
-    df_estandar = pd.DataFrame()
-    
     for col in COLUMNAS_A_BUSCAR:
         if col in df.columns:
             if col == "weed applied":
-                df_estandar[col] = df[col].apply(estandarizar_applied).astype("Int64")
+                df_estandar[col], invalidos = estandarizar_columna_applied(df[col])
             elif col == "weed placement":
-                # Convertir NA a None antes de la traducción
-                df_estandar[col] = df[col].apply(lambda x: traducir_surco(x) if pd.notna(x) else None)
-            elif col == "size":
-                # Reemplazar '>25' por 30 antes de asignar
-                df_estandar[col] = df[col].replace(">25", 30)
-                df_estandar[col] = pd.to_numeric(df_estandar[col], errors='coerce')
+                # Una traducción por valor distinto; los NA quedan en None
+                df_estandar[col] = traducir_por_valor(df[col], traducir_surco)
+            elif col in ("weed diameter", "size", "height"):
+                # Reemplazar '>25' por 30 antes de asignar. Siempre float: un bloque de
+                # solo enteros no se escribe distinto que uno con decimales o vacíos
+                valores = df[col].replace(">25", 30) if col == "size" else df[col]
+                df_estandar[col] = pd.to_numeric(valores, errors='coerce').astype(float)
             else:
                 df_estandar[col] = df[col]
         else:
             df_estandar[col] = pd.NA
-            st.warning(f"⚠️ Columna '{col}' no encontrada, se llenará con valores nulos")
+            faltantes.append(col)
 
     # Convertir nombres de columnas a formato estándar
     df_estandar.columns = [col.strip().lower().replace(" ", "_") for col in df_estandar.columns]
@@ -184,12 +325,182 @@ def archivos_estandarizados(df):
             None
         )
 
+    return df_estandar, faltantes, invalidos
+
+
+def archivos_estandarizados(df):
+    """
+    Crea los archivos estandarizados con sus respectivos datos (ver estandarizar_bloque)
+    y avisa de las columnas faltantes y los valores inválidos.
+    """
+    df_estandar, faltantes, invalidos = estandarizar_bloque(df)
+    for col in faltantes:
+        st.warning(f"⚠️ Columna '{col}' no encontrada, se llenará con valores nulos")
+    if invalidos:
+        st.warning(resumen_invalidos("weed applied", invalidos))
+
     st.success(f"\n📄 Archivo procesado y estandarizado")
     st.dataframe(df_estandar, use_container_width=True)
 
     return df_estandar
 
 
+def leer_encabezados(archivo):
+    """Encabezados del CSV, sin leer las filas."""
+    archivo.seek(0)
+    return list(pd.read_csv(archivo, nrows=0).columns)
+
+
+def leer_bloques(archivo, mapeo, filas_por_bloque=FILAS_POR_BLOQUE):
+    """
+    Lee el CSV desde el principio de a `filas_por_bloque` filas, solo con las
+    columnas de `mapeo` (ver resolver_columnas) y ya renombradas. El índice sigue
+    de un bloque al otro, así los errores indican la fila del archivo.
+    """
+    archivo.seek(0)
+    lector = pd.read_csv(
+        archivo,
+        usecols=list(mapeo.values()),
+        dtype={mapeo[col]: str for col in COLUMNAS_TEXTO if col in mapeo},
+        chunksize=filas_por_bloque,
+    )
+    renombres = {original: col for col, original in mapeo.items()}
+    with lector:
+        for bloque in lector:
+            yield bloque.rename(columns=renombres)
+
+
+def estandarizar_bloques(archivo, mapeo, filas_por_bloque=FILAS_POR_BLOQUE):
+    """La planilla estandarizada, de a un bloque por vez (ver leer_bloques)."""
+    for bloque in leer_bloques(archivo, mapeo, filas_por_bloque):
+        yield estandarizar_bloque(bloque)[0]
+
+
+def analizar_planilla(archivo, filas_por_bloque=FILAS_POR_BLOQUE, progreso=None):
+    """
+    Recorre el CSV una vez, de a bloques: resuelve los encabezados, verifica el
+    tipo de dato y estandariza cada bloque y arma la huella de la planilla
+    estandarizada. En memoria hay un solo bloque a la vez, no la planilla.
+
+    Args:
+        archivo: CSV abierto en modo binario (por ejemplo el de st.file_uploader)
+        progreso: función opcional que recibe la fracción del archivo ya leída
+
+    Returns:
+        dict: 'columnas' (mapeo de resolver_columnas), 'filas', 'nulos' por columna,
+        'errores' (columna -> primeros MAX_ERRORES_GUARDADOS errores),
+        'cantidad_errores' (columna -> total), 'invalidos' de 'weed applied'
+        (valor -> filas), 'huella' y 'muestra' (primeras FILAS_MUESTRA filas estandarizadas)
+    """
+    tamano = archivo.seek(0, os.SEEK_END)
+    mapeo = resolver_columnas(leer_encabezados(archivo))
+    resumen = {
+        "columnas": mapeo,
+        "filas": 0,
+        "nulos": dict.fromkeys(mapeo, 0),
+        "errores": {},
+        "cantidad_errores": {},
+        "invalidos": {},
+        "muestra": None,
+    }
+    avisos_applied = set()
+
+    def estandarizados():
+        for bloque in leer_bloques(archivo, mapeo, filas_por_bloque):
+            resumen["filas"] += len(bloque)
+            for col in mapeo:
+                resumen["nulos"][col] += int(bloque[col].isnull().sum())
+            for col, errores in verificar_bloque(bloque).items():
+                if col == "weed applied":
+                    # Este aviso es uno por valor distinto, no por fila: se repetiría en cada bloque
+                    errores = [error for error in errores if error not in avisos_applied]
+                    avisos_applied.update(errores)
+                    if not errores:
+                        continue
+                guardados = resumen["errores"].setdefault(col, [])
+                guardados.extend(errores[:MAX_ERRORES_GUARDADOS - len(guardados)])
+                resumen["cantidad_errores"][col] = resumen["cantidad_errores"].get(col, 0) + len(errores)
+            estandar, _, invalidos = estandarizar_bloque(bloque)
+            for valor, cantidad in invalidos.items():
+                resumen["invalidos"][valor] = resumen["invalidos"].get(valor, 0) + cantidad
+            if resumen["muestra"] is None:
+                resumen["muestra"] = estandar.head(FILAS_MUESTRA)
+            if progreso is not None and tamano:
+                progreso(min(archivo.tell() / tamano, 1.0))
+            yield estandar
+
+    resumen["huella"] = huella_planilla(estandarizados())
+    resumen["invalidos"] = dict(sorted(resumen["invalidos"].items(), key=lambda invalido: -invalido[1]))
+    if resumen["muestra"] is None:
+        resumen["muestra"] = estandarizar_bloque(pd.DataFrame(columns=list(mapeo)))[0]
+    return resumen
+
+
+# Diccionario completo de traducciones de 'weed placement'
+TRADUCCIONES_SURCO = {
+    # Español -> Inglés
+    'surco': 'ROW',
+    'entre surco': 'FURROW',
+    'entre surcos': 'FURROW',
+    'fila': 'ROW',
+    'entre filas': 'FURROW',
+    'línea': 'ROW',
+    'entre líneas': 'FURROW',
+
+    # Inglés -> Mantener formato estándar
+    'row': 'ROW',
+    'furrow': 'FURROW',
+    'between rows': 'FURROW',
+    'interrow': 'FURROW',
+}
+# Prefijos comunes de cada valor
+PREFIJOS_ROW = ('surco', 'fila', 'línea', 'row', 'sulco')
+PREFIJOS_FURROW = ('entre', 'between', 'inter')
+
+VALORES_APPLIED = {'1': 1, '1.0': 1, 'true': 1, '0': 0, '0.0': 0, 'false': 0}
+MAX_INVALIDOS_MOSTRADOS = 10
+
+
+def _traducir_unicos(serie, traducir):
+    # Un traducir por valor distinto; factorize marca los vacíos con -1, así que
+    # su traducción va en el último lugar. tolist() da escalares de Python, como
+    # los que recibía Series.apply
+    codigos, unicos = pd.factorize(serie)
+    unicos = unicos.tolist()
+    return codigos, unicos, [traducir(valor) for valor in unicos] + [traducir(None)]
+
+
+def traducir_por_valor(serie, traducir, dtype=object):
+    """
+    Aplica `traducir` una sola vez por valor distinto de `serie` (y una vez a los
+    vacíos) y reparte los resultados a todas las filas.
+
+    Returns:
+        pd.Series: de tipo `dtype`, con el mismo índice que `serie`
+    """
+    codigos, _, traducidos = _traducir_unicos(serie, traducir)
+    return pd.Series(pd.array(traducidos, dtype=dtype).take(codigos), index=serie.index)
+
+
+@functools.lru_cache(maxsize=1024)
+def _traducir_texto(texto):
+    # Los textos se repiten entre planillas: cada uno se traduce una vez por proceso
+    valor_str = texto.lower()
+
+    # Buscar coincidencia exacta
+    if valor_str in TRADUCCIONES_SURCO:
+        return TRADUCCIONES_SURCO[valor_str]
+
+    # Manejar prefijos comunes
+    if valor_str.startswith(PREFIJOS_ROW):
+        return 'ROW'
+    if valor_str.startswith(PREFIJOS_FURROW):
+        return 'FURROW'
+
+    # Si no se encuentra traducción, devolver el valor original en mayúsculas
+    return texto.upper()
+
+
 def traducir_surco(valor):
     '''
     Traduce los valores de la columna 'weed placement' a un formato estándar en inglés.
@@ -200,53 +511,21 @@ def traducir_surco(valor):
         
     Returns:
         str: Valor traducido ('ROW', 'FURROW') o el original en mayúsculas si no hay coincidencia
-        pd.NA: Para valores nulos o vacíos
+        None: Para valores nulos o vacíos
     '''
     # Manejo de valores nulos o vacíos
     if pd.isna(valor) or str(valor).strip() == '':
         return None
-    
-    # Convertir a string y normalizar
-    valor_str = str(valor).strip().lower()
-    
-    # Diccionario completo de traducciones
-    traducciones = {
-        # Español -> Inglés
-        'surco': 'ROW',
-        'entre surco': 'FURROW',
-        'entre surcos': 'FURROW',
-        'fila': 'ROW',
-        'entre filas': 'FURROW',
-        'línea': 'ROW',
-        'entre líneas': 'FURROW',
-        
-        # Inglés -> Mantener formato estándar
-        'row': 'ROW',
-        'furrow': 'FURROW',
-        'between rows': 'FURROW',
-        'interrow': 'FURROW',
-        
-    }
-    
-    # Buscar coincidencia exacta
-    if valor_str in traducciones:
-        return traducciones[valor_str]
-    
-    # Manejar prefijos comunes
-    if valor_str.startswith(('surco', 'fila', 'línea', 'row', 'sulco')):
-        return 'ROW'
-    if valor_str.startswith(('entre', 'between', 'inter')):
-        return 'FURROW'
-    
-    # Si no se encuentra traducción, devolver el valor original en mayúsculas
-    return str(valor).strip().upper()
+
+    return _traducir_texto(str(valor).strip())
+
 
 def estandarizar_applied(valor):
     """
     Estandariza valores para la columna 'weed applied':
     - Acepta: 1, 0, 1.0, 0.0, '1', '0', '1.0', '0.0', 'true', 'false'
     - Devuelve: 1 o 0 (int)
-    - Si no es válido, devuelve pd.NA
+    - Si no es válido, devuelve pd.NA (el aviso lo da archivos_estandarizados, uno por columna)
     """
     if pd.isna(valor):
         return pd.NA
@@ -257,11 +536,35 @@ def estandarizar_applied(valor):
         elif valor == 0 or valor == 0.0:
             return 0
     elif isinstance(valor, str):
-        valor_limpio = valor.strip().lower()
-        if valor_limpio in ['1', '1.0', 'true']:
-            return 1
-        elif valor_limpio in ['0', '0.0', 'false']:
-            return 0
+        return VALORES_APPLIED.get(valor.strip().lower(), pd.NA)
+
+    return pd.NA
+
+
+def estandarizar_columna_applied(serie):
+    """
+    Estandariza la columna 'weed applied' completa, con un estandarizar_applied
+    por valor distinto.
+
+    Returns:
+        tuple: (pd.Series Int64, dict valor inválido -> cantidad de filas, de la más repetida)
+    """
+    codigos, unicos, estandar = _traducir_unicos(serie, estandarizar_applied)
+    filas = np.bincount(codigos[codigos >= 0], minlength=len(unicos))
+    invalidos = sorted(
+        ((valor, int(filas[i])) for i, valor in enumerate(unicos) if estandar[i] is pd.NA),
+        key=lambda invalido: -invalido[1]
+    )
+    return pd.Series(pd.array(estandar, dtype="Int64").take(codigos), index=serie.index), dict(invalidos)
+
 
-    st.warning(f"⚠️ Valor inválido en 'weed applied': '{valor}' → será reemplazado por vacío")
-    return pd.NA
\ No newline at end of file
+def resumen_invalidos(columna, invalidos):
+    """Un solo aviso con los valores inválidos de `columna` y cuántas filas tiene cada uno."""
+    total = sum(invalidos.values())
+    detalle = ", ".join(
+        f"'{valor}' ({cantidad} {'fila' if cantidad == 1 else 'filas'})"
+        for valor, cantidad in list(invalidos.items())[:MAX_INVALIDOS_MOSTRADOS]
+    )
+    if len(invalidos) > MAX_INVALIDOS_MOSTRADOS:
+        detalle += f" y {len(invalidos) - MAX_INVALIDOS_MOSTRADOS} valores más"
+    return f"⚠️ {total} valores inválidos en '{columna}': {detalle} → serán reemplazados por vacío"